@@ -16,7 +16,7 @@ class TaskUpdateAdmin(admin.ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['title', 'recipient', 'notification_type', 'is_read', 'created_at']
+    list_display = ['title', 'recipient', 'notification_type', 'event_count', 'is_read', 'created_at']
     list_filter = ['notification_type', 'is_read', 'created_at']
     search_fields = ['title', 'message', 'recipient__username']
     readonly_fields = ['created_at']
\ No newline at end of file
@@ -0,0 +1,13 @@
+from functools import partial
+
+from .notifications import unread_count
+
+
+def notifications(request):
+    """
+    Cantidad de notificaciones no leídas para la insignia del menú. Se pasa
+    como función: solo se consulta si la plantilla la usa.
+    """
+    if not getattr(request, 'user', None) or not request.user.is_authenticated:
+        return {}
+    return {'unread_notifications': partial(unread_count, request)}
@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from apps.assignments.routing import distance_matrix, nearest_neighbour, solve_route
+
+
+class Command(BaseCommand):
+    help = 'Mide el planificador de rutas con paradas aleatorias (vecino más cercano + 2-opt)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stops', type=int, nargs='+', default=[50, 200, 1000],
+            help='Cantidades de paradas a evaluar'
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+
+        for stops in options['stops']:
+            # Paradas dentro de ~30 km alrededor de la Ciudad de Guatemala
+            coordinates = np.column_stack([
+                14.50 + rng.random(stops) * 0.30,
+                -90.70 + rng.random(stops) * 0.30,
+            ]).tolist()
+
+            best = None
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                order, legs = solve_route(coordinates)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            greedy_km = self._greedy_length(coordinates)
+            optimized_km = sum(legs)
+            self.stdout.write(
+                f"{stops:5} paradas: {best * 1000:8.1f} ms   "
+                f"vecino más cercano: {greedy_km:8.1f} km   "
+                f"con 2-opt: {optimized_km:8.1f} km "
+                f"({(1 - optimized_km / greedy_km) * 100:4.1f}% menos)"
+            )
+
+        self.stdout.write(self.style.SUCCESS('\nBenchmark completado'))
+
+    @staticmethod
+    def _greedy_length(coordinates):
+        """Longitud de la ruta solo con vecino más cercano (sin 2-opt)"""
+        size = len(coordinates) + 1
+        matrix = np.zeros((size, size))
+        matrix[:-1, :-1] = distance_matrix(coordinates)
+        route = nearest_neighbour(matrix, size - 1, size - 1)
+        return float(matrix[route[:-1], route[1:]].sum())
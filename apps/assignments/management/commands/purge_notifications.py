@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.assignments.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Elimina por lotes las notificaciones leídas más antiguas que el período de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+            help='Días que se conservan las notificaciones leídas'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo cuenta las notificaciones que se eliminarían'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by()
+
+        if options['dry_run']:
+            self.stdout.write(f'Notificaciones a eliminar: {expired.count()}')
+            return
+
+        # Lotes cortos: cada DELETE es una transacción breve y no bloquea la tabla
+        total = 0
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted, _ = Notification.objects.filter(pk__in=ids).delete()
+            total += deleted
+
+        self.stdout.write(self.style.SUCCESS(f'Notificaciones eliminadas: {total}'))
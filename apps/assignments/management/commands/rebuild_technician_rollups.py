@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from apps.assignments.models import TechnicianRollup
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen de asignaciones de cada técnico desde sus asignaciones'
+
+    def handle(self, *args, **options):
+        technicians = User.objects.filter(role='TECHNICIAN').values_list('pk', flat=True)
+        count = 0
+        for technician_id in technicians.iterator():
+            TechnicianRollup.rebuild(technician_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes recalculados: {count}'))
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    """Resumen inicial por técnico a partir de las asignaciones existentes"""
+    TaskAssignment = apps.get_model('assignments', 'TaskAssignment')
+    TechnicianRollup = apps.get_model('assignments', 'TechnicianRollup')
+    completed = models.Q(status='COMPLETED')
+    rows = TaskAssignment.objects.order_by().values('assigned_to_id').annotate(
+        total_assignments=models.Count('id'),
+        active_assignments=models.Count('id', filter=models.Q(
+            status__in=['ASSIGNED', 'ACCEPTED', 'IN_PROGRESS']
+        )),
+        completed_assignments=models.Count('id', filter=completed),
+        hours_count=models.Count('actual_hours', filter=completed),
+        total_hours=models.Sum('actual_hours', filter=completed),
+        total_cost=models.Sum('materials_cost', filter=completed),
+    )
+    TechnicianRollup.objects.bulk_create([
+        TechnicianRollup(
+            technician_id=row.pop('assigned_to_id'),
+            **dict(row, total_hours=row['total_hours'] or 0, total_cost=row['total_cost'] or 0)
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('assignments', '0002_taskassignment_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TechnicianRollup',
+            fields=[
+                ('technician', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='assignment_rollup', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Técnico')),
+                ('total_assignments', models.PositiveIntegerField(default=0, verbose_name='Asignaciones')),
+                ('active_assignments', models.PositiveIntegerField(default=0, verbose_name='Activas')),
+                ('completed_assignments', models.PositiveIntegerField(default=0, verbose_name='Completadas')),
+                ('hours_count', models.PositiveIntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Horas Trabajadas')),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Costo de Materiales')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Técnico',
+                'verbose_name_plural': 'Resúmenes de Técnicos',
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
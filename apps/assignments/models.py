@@ -1,13 +1,20 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
+from apps.core.utils.field_tracker import FieldTrackerMixin
 from apps.requests.models import ServiceRequest
 
 User = get_user_model()
 
-class TaskAssignment(models.Model):
+class TaskAssignment(FieldTrackerMixin, models.Model):
     """Asignación de tareas a técnicos"""
+
+    # Valores originales para actualizar TechnicianRollup (ver signals.py)
+    tracked_fields = ('assigned_to_id', 'status', 'actual_hours', 'materials_cost')
+    
+    ACTIVE_STATUSES = ['ASSIGNED', 'ACCEPTED', 'IN_PROGRESS']
     
     PRIORITY_CHOICES = [
         ('LOW', 'Baja'),
@@ -128,10 +135,18 @@ class TaskAssignment(models.Model):
         verbose_name='Costo de Materiales'
     )
     
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
+    
     class Meta:
         verbose_name = 'Asignación de Tarea'
         verbose_name_plural = 'Asignaciones de Tareas'
         ordering = ['-assigned_at']
+        indexes = [
+            models.Index(fields=['assigned_to', 'updated_at']),
+        ]
     
     def __str__(self):
         return f"Tarea: {self.request.ticket_number} - {self.assigned_to.get_full_name()}"
@@ -144,6 +159,148 @@ class TaskAssignment(models.Model):
             return timezone.now() > self.estimated_completion
         return False
 
+
+class TechnicianRollup(models.Model):
+    """
+    Resumen de carga y desempeño de un técnico. Se actualiza con la
+    diferencia de cada asignación que cambia (señales y transiciones), de
+    modo que la gestión de personal lee una fila por técnico en lugar de
+    agregar todas las asignaciones. rebuild_technician_rollups lo repara.
+    """
+    technician = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='assignment_rollup',
+        verbose_name='Técnico'
+    )
+    total_assignments = models.PositiveIntegerField(default=0, verbose_name='Asignaciones')
+    active_assignments = models.PositiveIntegerField(default=0, verbose_name='Activas')
+    completed_assignments = models.PositiveIntegerField(default=0, verbose_name='Completadas')
+    # Completadas con horas registradas (divisor del promedio)
+    hours_count = models.PositiveIntegerField(default=0)
+    total_hours = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name='Horas Trabajadas'
+    )
+    total_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Costo de Materiales'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
+
+    class Meta:
+        verbose_name = 'Resumen de Técnico'
+        verbose_name_plural = 'Resúmenes de Técnicos'
+
+    def __str__(self):
+        return f"Resumen: {self.technician}"
+
+    @property
+    def avg_hours(self):
+        """Promedio de horas por tarea completada"""
+        if not self.hours_count:
+            return None
+        return self.total_hours / self.hours_count
+
+    @classmethod
+    def contribution(cls, assignment):
+        """Aporte de una asignación: (técnico, {campo: valor})"""
+        completed = assignment.status == 'COMPLETED'
+        return assignment.assigned_to_id, {
+            'total_assignments': 1,
+            'active_assignments': int(assignment.status in TaskAssignment.ACTIVE_STATUSES),
+            'completed_assignments': int(completed),
+            'hours_count': int(completed and assignment.actual_hours is not None),
+            'total_hours': (assignment.actual_hours or 0) if completed else 0,
+            'total_cost': (assignment.materials_cost or 0) if completed else 0,
+        }
+
+    @classmethod
+    def apply_change(cls, original, current):
+        """
+        Aplica la diferencia entre dos aportes (None si la asignación no
+        existía o ya no existe). Un UPDATE por técnico afectado, ninguno si
+        el aporte no cambió.
+        """
+        deltas = {}
+        for contribution, sign in ((original, -1), (current, 1)):
+            if contribution is None:
+                continue
+            technician_id, values = contribution
+            technician_deltas = deltas.setdefault(technician_id, {})
+            for field, value in values.items():
+                technician_deltas[field] = technician_deltas.get(field, 0) + sign * value
+
+        for technician_id, changes in deltas.items():
+            changes = {field: delta for field, delta in changes.items() if delta}
+            if not changes:
+                continue
+            updated = cls.objects.filter(technician_id=technician_id).update(
+                updated_at=timezone.now(),
+                **{field: F(field) + delta for field, delta in changes.items()}
+            )
+            if updated:
+                continue
+            if any(delta < 0 for delta in changes.values()):
+                # Sin fila para descontar: se recalcula completo
+                cls.rebuild(technician_id)
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(technician_id=technician_id, **changes)
+            except IntegrityError:
+                # Otra transacción creó la fila al mismo tiempo
+                cls.apply_change(None, (technician_id, changes))
+
+    @classmethod
+    def rebuild(cls, technician_id):
+        """
+        Recalcula el resumen de un técnico desde sus asignaciones. La fila se
+        bloquea antes de sumar para que los aportes de otras transacciones
+        (apply_change o un rebuild simultáneo) esperen y no se pierdan.
+        """
+        with transaction.atomic():
+            rollup = cls.objects.select_for_update().filter(technician_id=technician_id).first()
+            totals = cls._totals(technician_id)
+            if rollup is None:
+                try:
+                    with transaction.atomic():
+                        return cls.objects.create(technician_id=technician_id, **totals)
+                except IntegrityError:
+                    # Otra transacción creó la fila al mismo tiempo: se recalcula con ella bloqueada
+                    return cls.rebuild(technician_id)
+            for field, value in totals.items():
+                setattr(rollup, field, value)
+            rollup.save()
+            return rollup
+
+    @staticmethod
+    def _totals(technician_id):
+        """Totales del resumen calculados desde las asignaciones"""
+        completed = models.Q(status='COMPLETED')
+        totals = TaskAssignment.objects.filter(assigned_to_id=technician_id).aggregate(
+            total_assignments=models.Count('id'),
+            active_assignments=models.Count('id', filter=models.Q(
+                status__in=TaskAssignment.ACTIVE_STATUSES
+            )),
+            completed_assignments=models.Count('id', filter=completed),
+            hours_count=models.Count('actual_hours', filter=completed),
+            total_hours=models.Sum('actual_hours', filter=completed),
+            total_cost=models.Sum('materials_cost', filter=completed),
+        )
+        totals['total_hours'] = totals['total_hours'] or 0
+        totals['total_cost'] = totals['total_cost'] or 0
+        return totals
+
+
 class TaskUpdate(models.Model):
     """Actualizaciones de progreso"""
     
@@ -246,11 +403,35 @@ class Notification(models.Model):
         auto_now_add=True,
         verbose_name='Fecha'
     )
+
+    # Resumen: eventos de la misma solicitud para el mismo destinatario dentro
+    # de una ventana de NOTIFICATION_DIGEST_WINDOW segundos se acumulan en
+    # esta fila (ver notifications.send_notifications)
+    event_count = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Eventos'
+    )
+
+    digest_key = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name='Clave de Resumen'
+    )
     
     class Meta:
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
         ordering = ['-created_at']
+        indexes = [
+            # Bandeja (paginación por cursor) y conteo de no leídas
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_inbox_idx'),
+            models.Index(fields=['recipient', 'is_read', '-created_at', '-id'], name='notification_unread_idx'),
+            # Limpieza de leídas antiguas (purge_notifications)
+            models.Index(fields=['created_at'], condition=models.Q(is_read=True), name='notification_read_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.recipient.username}"
\ No newline at end of file
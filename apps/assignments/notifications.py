@@ -0,0 +1,203 @@
+"""
+Creación de notificaciones en bloque y bandeja de entrada.
+
+Todas las filas de una operación se insertan con un solo bulk_create. Los
+destinatarios pueden ser instancias de User (ya cargadas), ids o un queryset;
+un queryset se resuelve con una sola consulta de ids, sin cargar usuarios.
+
+Las notificaciones de una solicitud se agrupan en resúmenes: una fila por
+destinatario, solicitud y ventana de NOTIFICATION_DIGEST_WINDOW segundos
+(digest_key). Se guardan con INSERT ... ON CONFLICT DO UPDATE, que suma
+event_count y deja la fila con el último evento, sin leer y al inicio de la
+bandeja. La sintaxis es la misma en PostgreSQL y SQLite.
+
+La cantidad de no leídas (insignia del menú) se guarda en caché con la
+política 'notifications.unread' y la etiqueta notifications:<usuario>, que
+se invalida al crear notificaciones y al marcarlas como leídas.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.core.utils.cache import get_policy, invalidate_tags_on_commit
+from apps.core.utils.pagination import paginate_by_cursor
+from .models import Notification
+
+BULK_BATCH_SIZE = 500
+
+INBOX_PAGE_SIZE = 20
+
+
+def recipient_ids(recipients):
+    """Ids únicos de los destinatarios, en el orden recibido"""
+    if isinstance(recipients, QuerySet):
+        recipients = recipients.order_by().values_list('pk', flat=True)
+
+    ids = []
+    seen = set()
+    for recipient in recipients:
+        pk = getattr(recipient, 'pk', recipient)
+        if pk is not None and pk not in seen:
+            seen.add(pk)
+            ids.append(pk)
+    return ids
+
+
+def build_notification(recipient, notification_type, title, message, related_request=None):
+    """Notificación sin guardar para un destinatario (User o id)"""
+    return Notification(
+        recipient_id=getattr(recipient, 'pk', recipient),
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        related_request=related_request,
+    )
+
+
+def send_notifications(notifications):
+    """
+    Guarda un conjunto de notificaciones: las de una solicitud se acumulan
+    en su resumen y el resto se inserta; un solo INSERT por lote en ambos
+    casos.
+    """
+    notifications = list(notifications)
+    if not notifications:
+        return []
+
+    window = getattr(settings, 'NOTIFICATION_DIGEST_WINDOW', 0)
+    digests = [n for n in notifications if window and n.related_request_id is not None]
+    singles = [n for n in notifications if not window or n.related_request_id is None]
+
+    saved = []
+    if singles:
+        saved += Notification.objects.bulk_create(singles, batch_size=BULK_BATCH_SIZE)
+    if digests:
+        saved += upsert_digests(digests, window)
+    invalidate_unread_count(*{notification.recipient_id for notification in saved})
+    return saved
+
+
+def digest_key(notification, window, now):
+    """Destinatario, solicitud y número de ventana de la notificación"""
+    bucket = int(now.timestamp()) // window
+    return f'{notification.recipient_id}:{notification.related_request_id}:{bucket}'
+
+
+def upsert_digests(notifications, window):
+    """Acumula las notificaciones en sus resúmenes (INSERT ... ON CONFLICT)"""
+    now = timezone.now()
+
+    # Una fila por clave: ON CONFLICT no puede tocar la misma fila dos veces
+    # en una sentencia. Queda el último evento con la suma de los conteos
+    merged = {}
+    for notification in notifications:
+        key = digest_key(notification, window, now)
+        previous = merged.pop(key, None)
+        notification.digest_key = key
+        notification.created_at = now
+        notification.event_count = (previous.event_count if previous else 0) + (notification.event_count or 1)
+        merged[key] = notification
+    rows = list(merged.values())
+
+    quote = connection.ops.quote_name
+    table = quote(Notification._meta.db_table)
+    columns = [
+        'recipient_id', 'notification_type', 'title', 'message', 'related_request_id',
+        'is_read', 'created_at', 'event_count', 'digest_key',
+    ]
+    sql_prefix = 'INSERT INTO {} ({}) VALUES '.format(table, ', '.join(quote(c) for c in columns))
+    sql_suffix = (
+        ' ON CONFLICT ({key}) DO UPDATE SET'
+        ' {type} = EXCLUDED.{type}, {title} = EXCLUDED.{title}, {message} = EXCLUDED.{message},'
+        ' {created} = EXCLUDED.{created},'
+        # Un resumen ya leído vuelve a empezar con los eventos nuevos
+        ' {count} = CASE WHEN {table}.{read} THEN EXCLUDED.{count} ELSE {table}.{count} + EXCLUDED.{count} END,'
+        ' {read} = EXCLUDED.{read}'
+        ' RETURNING {id}, {key}'
+    ).format(
+        table=table, key=quote('digest_key'), type=quote('notification_type'), title=quote('title'),
+        message=quote('message'), created=quote('created_at'), count=quote('event_count'),
+        read=quote('is_read'), id=quote('id'),
+    )
+    placeholders = '({})'.format(', '.join(['%s'] * len(columns)))
+
+    ids = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BULK_BATCH_SIZE):
+            batch = rows[start:start + BULK_BATCH_SIZE]
+            params = []
+            for notification in batch:
+                params += [
+                    notification.recipient_id, notification.notification_type, notification.title,
+                    notification.message, notification.related_request_id, False,
+                    connection.ops.adapt_datetimefield_value(now), notification.event_count,
+                    notification.digest_key,
+                ]
+            cursor.execute(sql_prefix + ', '.join([placeholders] * len(batch)) + sql_suffix, params)
+            ids.update((key, pk) for pk, key in cursor.fetchall())
+
+    for notification in rows:
+        notification.pk = ids[notification.digest_key]
+        notification._state.adding = False
+    return rows
+
+
+def notify(recipients, notification_type, title, message, related_request=None):
+    """Envía la misma notificación a todos los destinatarios"""
+    return send_notifications(
+        build_notification(pk, notification_type, title, message, related_request)
+        for pk in recipient_ids(recipients)
+    )
+
+
+def notify_area_managers(service_area, notification_type, title, message, related_request=None):
+    """Notifica a los encargados activos de un área (una consulta y un INSERT)"""
+    if service_area is None:
+        return []
+    managers = service_area.managers.filter(is_active=True)
+    return notify(managers, notification_type, title, message, related_request)
+
+
+def invalidate_unread_count(*user_ids):
+    """Invalida la cantidad de no leídas en caché de esos usuarios"""
+    if user_ids:
+        invalidate_tags_on_commit(*(f'notifications:{pk}' for pk in user_ids))
+
+
+def unread_count(request):
+    """
+    Notificaciones no leídas del usuario de la petición. Se calcula una vez
+    por petición y, fuera de la caché, con un COUNT sobre el índice de la
+    bandeja.
+    """
+    if not hasattr(request, '_unread_notifications'):
+        request._unread_notifications = get_policy('notifications.unread').get_or_set(
+            lambda: Notification.objects.filter(recipient=request.user, is_read=False).count(),
+            request=request,
+        )
+    return request._unread_notifications
+
+
+def inbox_page(user, cursor=None, unread_only=False, page_size=INBOX_PAGE_SIZE):
+    """Página de la bandeja del usuario, de la más reciente a la más antigua"""
+    queryset = Notification.objects.filter(recipient=user).select_related('related_request')
+    if unread_only:
+        queryset = queryset.filter(is_read=False)
+    return paginate_by_cursor(queryset, cursor, page_size)
+
+
+def mark_read(user, ids):
+    """Marca como leídas las notificaciones indicadas del usuario; retorna cuántas cambiaron"""
+    updated = Notification.objects.filter(recipient=user, pk__in=ids, is_read=False).update(is_read=True)
+    if updated:
+        invalidate_unread_count(user.pk)
+    return updated
+
+
+def mark_all_read(user):
+    """Marca como leídas todas las notificaciones del usuario con un solo UPDATE"""
+    updated = Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+    if updated:
+        invalidate_unread_count(user.pk)
+    return updated
@@ -0,0 +1,282 @@
+"""
+Recomendación de técnicos para una nueva asignación.
+
+El estado de carga de trabajo vive en memoria (WorkloadIndex): se carga
+completo una vez y luego se actualiza por asignación cuando se guarda o
+cambia de estado, así que recomendar no consulta la base de datos.
+
+Cada técnico activo recibe un puntaje (menor es mejor) que combina:
+- tareas abiertas,
+- horas estimadas pendientes,
+- tiempo que le tomó completar tareas del mismo tipo de servicio o área,
+- distancia a la solicitud desde sus tareas abiertas.
+
+El índice es por proceso; WORKLOAD_INDEX_TTL limita cuánto puede quedar
+desactualizado frente a cambios hechos por otros procesos.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, ExpressionWrapper, DurationField
+
+from .models import TaskAssignment
+
+User = get_user_model()
+
+OPEN_STATUSES = ('ASSIGNED', 'ACCEPTED', 'IN_PROGRESS', 'ON_HOLD')
+
+# Horas supuestas para tareas sin estimación
+DEFAULT_TASK_HOURS = 4.0
+
+# Peso de cada criterio en el puntaje
+WEIGHT_OPEN_TASKS = 1.0
+WEIGHT_REMAINING_HOURS = 1.0 / 8  # una jornada pendiente equivale a una tarea
+WEIGHT_COMPLETION_TIME = 1.0
+WEIGHT_DISTANCE = 1.0 / 5  # cada 5 km equivalen a una tarea
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia en kilómetros entre dos coordenadas"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+@dataclass
+class AssignmentRecord:
+    """Datos de una asignación que aportan al índice"""
+    technician_id: int
+    status: str
+    hours: float
+    location: tuple
+    service_type_id: int
+    service_area_id: int
+    completion_hours: float
+
+    @property
+    def is_open(self):
+        return self.status in OPEN_STATUSES
+
+    @property
+    def is_completed(self):
+        return self.status == 'COMPLETED' and self.completion_hours is not None
+
+
+@dataclass
+class TechnicianWorkload:
+    """Carga de trabajo acumulada de un técnico"""
+    name: str
+    open_tasks: int = 0
+    remaining_hours: float = 0.0
+    locations: dict = field(default_factory=dict)
+    # {('type', id) o ('area', id) o ('all', None): [cantidad, horas]}
+    completions: dict = field(default_factory=dict)
+
+    def add(self, assignment_id, record, sign):
+        if record.is_open:
+            self.open_tasks += sign
+            self.remaining_hours += sign * record.hours
+            if sign > 0 and record.location:
+                self.locations[assignment_id] = record.location
+            else:
+                self.locations.pop(assignment_id, None)
+        if record.is_completed:
+            for key in (('type', record.service_type_id), ('area', record.service_area_id), ('all', None)):
+                totals = self.completions.setdefault(key, [0, 0.0])
+                totals[0] += sign
+                totals[1] += sign * record.completion_hours
+
+    def average_completion(self, key):
+        count, hours = self.completions.get(key, (0, 0.0))
+        return hours / count if count > 0 else None
+
+    def distance_to(self, location):
+        """Distancia desde la tarea abierta más cercana, o None"""
+        if not location or not self.locations:
+            return None
+        return min(haversine_km(*location, *other) for other in self.locations.values())
+
+
+@dataclass
+class Recommendation:
+    technician_id: int
+    name: str
+    score: float
+    open_tasks: int
+    remaining_hours: float
+    average_completion_hours: float
+    distance_km: float
+
+
+class WorkloadIndex:
+    """Índice en memoria de la carga de trabajo de los técnicos activos"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._technicians = {}
+        self._records = {}
+
+    # Carga
+
+    @staticmethod
+    def _assignment_queryset():
+        return TaskAssignment.objects.annotate(
+            completion_time=ExpressionWrapper(
+                F('actual_completion') - F('assigned_at'), output_field=DurationField()
+            )
+        ).values_list(
+            'id', 'assigned_to_id', 'status', 'estimated_hours',
+            'request__latitude', 'request__longitude',
+            'request__service_type_id', 'request__service_area_id', 'completion_time',
+        )
+
+    @staticmethod
+    def _record(row):
+        (_, technician_id, status, hours, latitude, longitude,
+         service_type_id, service_area_id, completion_time) = row
+        location = None
+        if latitude is not None and longitude is not None:
+            location = (float(latitude), float(longitude))
+        return AssignmentRecord(
+            technician_id=technician_id,
+            status=status,
+            hours=float(hours) if hours is not None else DEFAULT_TASK_HOURS,
+            location=location,
+            service_type_id=service_type_id,
+            service_area_id=service_area_id,
+            completion_hours=completion_time.total_seconds() / 3600 if completion_time else None,
+        )
+
+    def load(self):
+        """Carga completa: técnicos activos y sus asignaciones abiertas o completadas"""
+        technicians = {
+            pk: TechnicianWorkload(name=(f'{first} {last}'.strip() or username))
+            for pk, username, first, last in User.objects.filter(
+                role='TECHNICIAN', is_active=True
+            ).values_list('pk', 'username', 'first_name', 'last_name')
+        }
+        records = {}
+        rows = self._assignment_queryset().filter(
+            assigned_to_id__in=list(technicians),
+            status__in=(*OPEN_STATUSES, 'COMPLETED'),
+        )
+        for row in rows.iterator(chunk_size=2000):
+            record = self._record(row)
+            records[row[0]] = record
+            technicians[record.technician_id].add(row[0], record, 1)
+
+        with self._lock:
+            self._technicians = technicians
+            self._records = records
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Obliga a recargar el índice en la próxima consulta"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        with self._lock:
+            expired = self._loaded_at is None or (
+                self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+            )
+        if expired:
+            self.load()
+
+    # Actualización incremental
+
+    def refresh_assignment(self, assignment_id):
+        """Vuelve a leer una asignación (una consulta) y ajusta el índice"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+        row = self._assignment_queryset().filter(pk=assignment_id).first()
+        new = self._record(row) if row else None
+
+        with self._lock:
+            old = self._records.pop(assignment_id, None)
+            if old is not None and old.technician_id in self._technicians:
+                self._technicians[old.technician_id].add(assignment_id, old, -1)
+            if new is not None and new.technician_id in self._technicians and (new.is_open or new.is_completed):
+                self._records[assignment_id] = new
+                self._technicians[new.technician_id].add(assignment_id, new, 1)
+
+    def refresh_on_commit(self, assignment_id):
+        transaction.on_commit(lambda: self.refresh_assignment(assignment_id))
+
+    # Consulta
+
+    def tracks(self, technician_id):
+        """Indica si el técnico está en el índice cargado (sin cargarlo)"""
+        with self._lock:
+            return technician_id in self._technicians
+
+    def workload(self, technician_id):
+        self._ensure_loaded()
+        with self._lock:
+            return self._technicians.get(technician_id)
+
+    def recommend(self, service_request, limit=5):
+        """Técnicos activos ordenados por puntaje (mejor primero)"""
+        self._ensure_loaded()
+        location = None
+        if service_request.latitude is not None and service_request.longitude is not None:
+            location = (float(service_request.latitude), float(service_request.longitude))
+
+        with self._lock:
+            technicians = list(self._technicians.items())
+            overall = [
+                workload.average_completion(('all', None)) for _, workload in technicians
+            ]
+            overall = [hours for hours in overall if hours]
+            baseline = sum(overall) / len(overall) if overall else None
+
+            recommendations = [
+                self._score(pk, workload, service_request, location, baseline)
+                for pk, workload in technicians
+            ]
+
+        recommendations.sort(key=lambda item: (item.score, item.open_tasks, item.name))
+        return recommendations[:limit]
+
+    @staticmethod
+    def _score(technician_id, workload, service_request, location, baseline):
+        average = (
+            workload.average_completion(('type', service_request.service_type_id))
+            or workload.average_completion(('area', service_request.service_area_id))
+            or workload.average_completion(('all', None))
+        )
+        distance = workload.distance_to(location)
+
+        score = WEIGHT_OPEN_TASKS * workload.open_tasks
+        score += WEIGHT_REMAINING_HOURS * workload.remaining_hours
+        if average is not None and baseline:
+            # Más rápido que el promedio resta; más lento suma
+            score += WEIGHT_COMPLETION_TIME * (average / baseline - 1)
+        if distance is not None:
+            score += WEIGHT_DISTANCE * distance
+
+        return Recommendation(
+            technician_id=technician_id,
+            name=workload.name,
+            score=round(score, 3),
+            open_tasks=workload.open_tasks,
+            remaining_hours=round(workload.remaining_hours, 1),
+            average_completion_hours=round(average, 1) if average is not None else None,
+            distance_km=round(distance, 1) if distance is not None else None,
+        )
+
+
+workload_index = WorkloadIndex(ttl=settings.WORKLOAD_INDEX_TTL)
@@ -0,0 +1,178 @@
+"""
+Planificación de la ruta diaria de un técnico.
+
+Las distancias se calculan con haversine sobre una matriz NumPy y el orden
+de visita se obtiene con vecino más cercano seguido de mejoras 2-opt
+(cada paso evalúa todos los intercambios de un tramo de forma vectorizada).
+
+La ruta es abierta: termina en la última parada. Para no fijar el punto de
+inicio se agrega un nodo ficticio a distancia cero de todas las paradas.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.urls import reverse
+
+from .models import TaskAssignment
+
+EARTH_RADIUS_KM = 6371.0
+
+ROUTE_STATUSES = ['ACCEPTED', 'IN_PROGRESS']
+
+
+def distance_matrix(coordinates):
+    """
+    Matriz de distancias haversine en kilómetros.
+
+    Args:
+        coordinates: Secuencia de (latitud, longitud) en grados
+    """
+    points = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2))
+    lat = points[:, 0][:, None]
+    lon = points[:, 1][:, None]
+    dlat = lat.T - lat
+    dlon = lon.T - lon
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_neighbour(matrix, start, end):
+    """Ruta inicial desde start visitando siempre la parada más cercana; termina en end"""
+    size = len(matrix)
+    visited = np.zeros(size, dtype=bool)
+    visited[start] = visited[end] = True
+    route = [start]
+    current = start
+    for _ in range(size - 2 if start != end else size - 1):
+        distances = np.where(visited, np.inf, matrix[current])
+        current = int(np.argmin(distances))
+        visited[current] = True
+        route.append(current)
+    route.append(end)
+    return np.array(route)
+
+
+def two_opt(route, matrix, max_passes=1000):
+    """
+    Mejora la ruta invirtiendo tramos mientras se reduzca la distancia.
+    Los extremos de la ruta no se mueven.
+    """
+    route = route.copy()
+    last = len(route) - 1
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, last - 1):
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:last]
+            d = route[i + 2:last + 1]
+            # Cambio de distancia al invertir route[i..j] para cada j posible
+            delta = matrix[a, c] + matrix[b, d] - matrix[a, b] - matrix[c, d]
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = i + 1 + k
+                route[i:j + 1] = route[i:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return route
+
+
+def solve_route(coordinates, start=None):
+    """
+    Orden de visita de las coordenadas.
+
+    Args:
+        coordinates: Lista de (latitud, longitud) de las paradas
+        start: (latitud, longitud) opcional desde donde sale el técnico
+
+    Returns:
+        tuple: (índices de las paradas en orden, distancias de cada tramo en km)
+    """
+    count = len(coordinates)
+    if count == 0:
+        return [], []
+
+    points = list(coordinates) + ([start] if start is not None else [])
+    size = len(points) + 1
+    matrix = np.zeros((size, size))
+    matrix[:-1, :-1] = distance_matrix(points)
+
+    dummy = size - 1
+    origin = count if start is not None else dummy
+    route = two_opt(nearest_neighbour(matrix, origin, dummy), matrix)
+
+    order = [int(node) for node in route if node < count]
+    nodes = ([origin] if start is not None else []) + order
+    legs = [float(matrix[nodes[index - 1], nodes[index]]) for index in range(1, len(nodes))]
+    if start is None:
+        legs.insert(0, 0.0)
+    return order, legs
+
+
+@dataclass
+class RoutePlan:
+    """Ruta planificada: paradas ordenadas y tareas sin ubicación"""
+    stops: list = field(default_factory=list)
+    unlocated: list = field(default_factory=list)
+    total_km: float = 0.0
+
+    def as_dict(self):
+        return {
+            'total_km': round(self.total_km, 2),
+            'stops': [
+                {
+                    'order': index,
+                    'assignment_id': stop['assignment'].pk,
+                    'ticket': stop['assignment'].request.ticket_number,
+                    'title': stop['assignment'].request.title,
+                    'address': stop['assignment'].request.address,
+                    'status': stop['assignment'].get_status_display(),
+                    'latitude': stop['latitude'],
+                    'longitude': stop['longitude'],
+                    'leg_km': round(stop['leg_km'], 2),
+                    'url': reverse('assignments:detail', args=[stop['assignment'].pk]),
+                }
+                for index, stop in enumerate(self.stops, start=1)
+            ],
+            'unlocated': [
+                {
+                    'assignment_id': assignment.pk,
+                    'ticket': assignment.request.ticket_number,
+                    'title': assignment.request.title,
+                    'address': assignment.request.address,
+                }
+                for assignment in self.unlocated
+            ],
+        }
+
+
+def plan_technician_route(technician, start=None):
+    """Ruta para las tareas aceptadas o en progreso de un técnico"""
+    assignments = list(
+        TaskAssignment.objects.filter(
+            assigned_to=technician, status__in=ROUTE_STATUSES
+        ).select_related('request').order_by('assigned_at')
+    )
+
+    located = [
+        assignment for assignment in assignments
+        if assignment.request.latitude is not None and assignment.request.longitude is not None
+    ]
+    coordinates = [
+        (float(assignment.request.latitude), float(assignment.request.longitude))
+        for assignment in located
+    ]
+
+    order, legs = solve_route(coordinates, start)
+    located_ids = {assignment.pk for assignment in located}
+    plan = RoutePlan(unlocated=[assignment for assignment in assignments if assignment.pk not in located_ids])
+    for index, leg in zip(order, legs):
+        latitude, longitude = coordinates[index]
+        plan.stops.append({
+            'assignment': located[index],
+            'latitude': latitude,
+            'longitude': longitude,
+            'leg_km': leg,
+        })
+    plan.total_km = sum(legs)
+    return plan
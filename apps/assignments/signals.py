@@ -1,25 +1,99 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.contrib.auth import get_user_model
 from django.dispatch import receiver
-from .models import TaskAssignment, Notification
+from apps.core.utils.cache import invalidate_tags_on_commit
+from apps.core.utils.events import publish_on_commit
+from .models import TaskAssignment, TechnicianRollup, Notification
+from .notifications import build_notification, send_notifications, invalidate_unread_count
+from .recommender import workload_index
+
+User = get_user_model()
 
 @receiver(post_save, sender=TaskAssignment)
 def create_assignment_notification(sender, instance, created, **kwargs):
-    """Crea notificación cuando se asigna una tarea"""
+    """Crea notificaciones cuando se asigna una tarea (un solo INSERT)"""
     if created:
-        # Notificar al técnico asignado
-        Notification.objects.create(
-            recipient=instance.assigned_to,
-            notification_type='TASK_ASSIGNED',
-            title=f'Nueva tarea asignada: {instance.request.ticket_number}',
-            message=f'Se le ha asignado la tarea: {instance.request.title}. Prioridad: {instance.get_priority_display()}.',
-            related_request=instance.request
-        )
-        
-        # Notificar al ciudadano
-        Notification.objects.create(
-            recipient=instance.request.citizen,
-            notification_type='TASK_ASSIGNED',
-            title=f'Su solicitud ha sido asignada: {instance.request.ticket_number}',
-            message=f'Su solicitud ha sido asignada a {instance.assigned_to.get_full_name()}.',
-            related_request=instance.request
-        )
\ No newline at end of file
+        # Se reutilizan la solicitud y el técnico ya cargados por el formulario;
+        # del ciudadano solo se necesita el id
+        service_request = instance.request
+        technician = instance.assigned_to
+        send_notifications([
+            # Notificar al técnico asignado
+            build_notification(
+                technician,
+                'TASK_ASSIGNED',
+                f'Nueva tarea asignada: {service_request.ticket_number}',
+                f'Se le ha asignado la tarea: {service_request.title}. Prioridad: {instance.get_priority_display()}.',
+                related_request=service_request,
+            ),
+            # Notificar al ciudadano
+            build_notification(
+                service_request.citizen_id,
+                'TASK_ASSIGNED',
+                f'Su solicitud ha sido asignada: {service_request.ticket_number}',
+                f'Su solicitud ha sido asignada a {technician.get_full_name()}.',
+                related_request=service_request,
+            ),
+        ])
+
+
+@receiver(post_save, sender=TaskAssignment)
+@receiver(post_delete, sender=TaskAssignment)
+def publish_technician_stats_change(sender, instance, **kwargs):
+    """Avisa al dashboard del técnico que sus estadísticas cambiaron"""
+    publish_on_commit(f'stats:technician:{instance.assigned_to_id}', {'type': 'invalidate'})
+
+
+@receiver(pre_save, sender=TaskAssignment)
+def track_assignment_changes(sender, instance, **kwargs):
+    """Valores originales para instancias construidas a mano con pk"""
+    if instance.pk and not instance.has_tracked_snapshot():
+        instance.load_tracked_snapshot()
+
+
+@receiver(post_save, sender=TaskAssignment)
+def update_technician_rollup(sender, instance, created, raw=False, **kwargs):
+    """Aplica el cambio de la asignación al resumen de su técnico (y del anterior si se reasignó)"""
+    if raw:
+        return
+    original = None if created else TechnicianRollup.contribution(instance.previous_state())
+    TechnicianRollup.apply_change(original, TechnicianRollup.contribution(instance))
+
+
+@receiver(post_delete, sender=TaskAssignment)
+def remove_from_technician_rollup(sender, instance, origin=None, **kwargs):
+    """Descuenta la asignación eliminada del resumen de su técnico"""
+    # Al eliminar al propio técnico su resumen se borra en cascada
+    if isinstance(origin, User) and origin.pk == instance.assigned_to_id:
+        return
+    TechnicianRollup.apply_change(TechnicianRollup.contribution(instance), None)
+
+
+@receiver(post_save, sender=TaskAssignment)
+@receiver(post_delete, sender=TaskAssignment)
+def invalidate_assignment_caches(sender, instance, **kwargs):
+    """Invalida las estadísticas del técnico y los reportes en caché"""
+    invalidate_tags_on_commit('assignments', f'assignments:technician:{instance.assigned_to_id}')
+
+
+@receiver(post_save, sender=TaskAssignment)
+@receiver(post_delete, sender=TaskAssignment)
+def refresh_workload_index(sender, instance, **kwargs):
+    """Actualiza la carga de trabajo del técnico en el índice de recomendaciones"""
+    workload_index.refresh_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Notification)
+def invalidate_notification_count(sender, instance, **kwargs):
+    """Cambios individuales (p. ej. desde el admin) en la cantidad de no leídas"""
+    invalidate_unread_count(instance.recipient_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_workload_index(sender, instance, update_fields=None, **kwargs):
+    """Recarga el índice si cambia un técnico (alta, baja o cambio de rol)"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    if instance.role == 'TECHNICIAN' or workload_index.tracks(instance.pk):
+        transaction.on_commit(workload_index.invalidate)
@@ -1,3 +1,565 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.requests.models import (
+    ServiceRequest, ServiceType, ServiceArea, RequestStatusHistory, RequestStatusCounter,
+)
+from . import transitions
+from .models import TaskAssignment, Notification, TechnicianRollup
+from .notifications import notify, notify_area_managers
+from .recommender import workload_index
+from .routing import solve_route
+
+User = get_user_model()
+
+
+class AssignmentTestMixin:
+    """Datos base para las pruebas de asignaciones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user(
+            username='ciudadano', password='municipal2024', role='CITIZEN'
+        )
+        cls.manager = User.objects.create_user(
+            username='encargado', password='municipal2024', role='MANAGER'
+        )
+        cls.technician = User.objects.create_user(
+            username='tecnico', password='municipal2024', role='TECHNICIAN',
+            first_name='Juan', last_name='Pérez'
+        )
+        cls.service_type = ServiceType.objects.create(name='Suministro de Agua')
+        cls.area = ServiceArea.objects.create(name='Zona 1')
+
+    @classmethod
+    def create_request(cls, **kwargs):
+        data = {
+            'citizen': cls.citizen,
+            'service_type': cls.service_type,
+            'service_area': cls.area,
+            'request_type': 'REPAIR',
+            'title': 'Fuga de agua',
+            'description': 'Tubería rota frente a la escuela',
+            'address': 'Casco Urbano',
+        }
+        data.update(kwargs)
+        return ServiceRequest.objects.create(**data)
+
+
+class NotificationFanOutTests(AssignmentTestMixin, TestCase):
+
+    def notification_inserts(self, queries):
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "assignments_notification"')
+        ]
+
+    def test_assignment_notifies_technician_and_citizen_in_one_insert(self):
+        service_request = ServiceRequest.objects.get(pk=self.create_request().pk)
+        technician = User.objects.get(pk=self.technician.pk)
+        assignment = TaskAssignment(
+            request=service_request, assigned_by=self.manager, assigned_to=technician
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            assignment.save()
+
+        self.assertEqual(len(self.notification_inserts(queries)), 1)
+        # La solicitud y el técnico ya estaban cargados y el ciudadano no se consulta
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(selects, [])
+
+        notifications = Notification.objects.filter(related_request=service_request)
+        self.assertEqual(
+            sorted(notifications.values_list('recipient__username', flat=True)),
+            ['ciudadano', 'tecnico']
+        )
+        self.assertIn('Juan Pérez', notifications.get(recipient=self.citizen).message)
+
+    def test_area_manager_fan_out_uses_bounded_queries(self):
+        managers = [
+            User.objects.create_user(username=f'encargado{index}', role='MANAGER')
+            for index in range(25)
+        ]
+        self.area.managers.add(*managers, self.manager)
+        service_request = self.create_request()
+
+        # Una consulta para los ids y un INSERT, sin importar cuántos sean
+        with self.assertNumQueries(2):
+            notify_area_managers(
+                self.area, 'GENERAL', 'Nueva solicitud en su área', service_request.title,
+                related_request=service_request
+            )
+
+        self.assertEqual(Notification.objects.filter(notification_type='GENERAL').count(), 26)
+
+    def test_notify_skips_duplicate_recipients(self):
+        with self.assertNumQueries(1):
+            notify([self.citizen, self.citizen.pk, self.manager], 'GENERAL', 'Aviso', 'Mensaje')
+
+        self.assertEqual(Notification.objects.filter(notification_type='GENERAL').count(), 2)
+
+
+class AssignmentTransitionTests(AssignmentTestMixin, TestCase):
+
+    def setUp(self):
+        self.service_request = self.create_request()
+        self.assignment = TaskAssignment.objects.create(
+            request=self.service_request, assigned_by=self.manager, assigned_to=self.technician
+        )
+        self.client.force_login(self.technician)
+
+    def test_concurrent_transitions_only_apply_once(self):
+        first = TaskAssignment.objects.get(pk=self.assignment.pk)
+        second = TaskAssignment.objects.get(pk=self.assignment.pk)
+
+        self.assertTrue(transitions.start_assignment(first))
+        self.assertFalse(transitions.start_assignment(second))
+        self.assertFalse(transitions.accept_assignment(second))
+
+        self.assertEqual(
+            RequestStatusHistory.objects.filter(request=self.service_request, to_status='IN_PROGRESS').count(), 1
+        )
+
+    def test_accept_updates_only_the_assignment(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('assignments:accept', args=[self.assignment.pk]))
+        self.assertEqual(response.status_code, 302)
+
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"status" = \'ACCEPTED\'', updates[0])
+        self.assertNotIn('"instructions"', updates[0])
+
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.status, 'ACCEPTED')
+        self.assertIsNotNone(self.assignment.accepted_at)
+
+    def test_complete_updates_request_in_same_transaction(self):
+        transitions.start_assignment(self.assignment)
+        response = self.client.post(reverse('assignments:complete', args=[self.assignment.pk]), {
+            'actual_hours': '2.5', 'notes': 'Se cambió la tubería',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        self.assignment.refresh_from_db()
+        self.service_request.refresh_from_db()
+        self.assertEqual(self.assignment.status, 'COMPLETED')
+        self.assertEqual(self.service_request.status, 'COMPLETED')
+        self.assertIsNotNone(self.service_request.completed_at)
+        self.assertEqual(RequestStatusCounter.get_for('global').completed, 1)
+
+        # Un segundo envío no vuelve a completar la tarea
+        self.assertFalse(transitions.complete_assignment(self.assignment))
+
+
+class TechnicianRecommenderTests(AssignmentTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.busy = User.objects.create_user(username='ocupado', role='TECHNICIAN')
+        cls.far = User.objects.create_user(username='lejano', role='TECHNICIAN')
+
+    def setUp(self):
+        workload_index.invalidate()
+
+    def assign(self, technician, **kwargs):
+        return TaskAssignment.objects.create(
+            request=self.create_request(**kwargs), assigned_by=self.manager, assigned_to=technician
+        )
+
+    def ranking(self, **kwargs):
+        service_request = ServiceRequest(service_type=self.service_type, service_area=self.area, **kwargs)
+        return [item.technician_id for item in workload_index.recommend(service_request)]
+
+    def test_ranks_by_workload_and_distance(self):
+        self.assign(self.busy, latitude=Decimal('14.6349'), longitude=Decimal('-90.5069'))
+        self.assign(self.busy, latitude=Decimal('14.6349'), longitude=Decimal('-90.5069'))
+        self.assign(self.far, latitude=Decimal('14.6800'), longitude=Decimal('-90.5069'))
+        self.assign(self.technician, latitude=Decimal('14.6400'), longitude=Decimal('-90.5100'))
+
+        ranking = self.ranking(latitude=Decimal('14.6350'), longitude=Decimal('-90.5070'))
+        self.assertEqual(ranking, [self.technician.pk, self.far.pk, self.busy.pk])
+
+    def test_recommendation_does_not_query_once_loaded(self):
+        self.ranking()
+        with self.assertNumQueries(0):
+            self.ranking()
+
+    def test_index_follows_assignment_changes(self):
+        self.ranking()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment = self.assign(self.busy)
+        self.assertEqual(workload_index.workload(self.busy.pk).open_tasks, 1)
+        self.assertNotEqual(self.ranking()[0], self.busy.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.start_assignment(assignment)
+            transitions.complete_assignment(assignment, actual_hours=Decimal('1.5'))
+        workload = workload_index.workload(self.busy.pk)
+        self.assertEqual(workload.open_tasks, 0)
+        self.assertEqual(workload.completions[('type', self.service_type.pk)][0], 1)
+
+    def test_create_view_preselects_best_technician(self):
+        self.assign(self.busy)
+        self.client.force_login(self.manager)
+        service_request = self.create_request()
+
+        response = self.client.get(reverse('assignments:create', args=[service_request.ticket_number]))
+
+        recommendations = response.context['recommendations']
+        self.assertEqual(response.context['form'].initial['assigned_to'], recommendations[0].technician_id)
+        self.assertNotEqual(recommendations[0].technician_id, self.busy.pk)
+
+
+class RoutePlannerTests(AssignmentTestMixin, TestCase):
+
+    def test_solver_visits_every_stop_on_a_short_path(self):
+        # Puntos sobre una línea recorridos en desorden
+        positions = [3, 0, 4, 1, 2]
+        coordinates = [(14.60 + 0.01 * position, -90.50) for position in positions]
+        order, legs = solve_route(coordinates)
+
+        self.assertIn([positions[index] for index in order], [[0, 1, 2, 3, 4], [4, 3, 2, 1, 0]])
+        self.assertAlmostEqual(sum(legs), 4.45, places=1)
+
+    def test_solver_handles_two_hundred_stops_quickly(self):
+        rng = np.random.default_rng(7)
+        coordinates = np.column_stack([14.5 + rng.random(200) * 0.3, -90.7 + rng.random(200) * 0.3])
+
+        start = time.perf_counter()
+        order, _ = solve_route(coordinates.tolist())
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(sorted(order), list(range(200)))
+
+    def test_route_api_orders_open_tasks_from_start(self):
+        for latitude in ('14.6300', '14.6100', '14.6200'):
+            assignment = TaskAssignment.objects.create(
+                request=self.create_request(latitude=Decimal(latitude), longitude=Decimal('-90.5000')),
+                assigned_by=self.manager, assigned_to=self.technician, status='ACCEPTED'
+            )
+        TaskAssignment.objects.create(
+            request=self.create_request(), assigned_by=self.manager,
+            assigned_to=self.technician, status='IN_PROGRESS'
+        )
+        assignment.status = 'COMPLETED'
+        assignment.save()
+
+        self.client.force_login(self.technician)
+        response = self.client.get(reverse('assignments:route_api'), {'lat': '14.6000', 'lon': '-90.5000'})
+        data = response.json()
+
+        self.assertEqual([stop['latitude'] for stop in data['stops']], [14.61, 14.63])
+        self.assertEqual(
+            data['stops'][0]['url'], reverse('assignments:detail', args=[data['stops'][0]['assignment_id']])
+        )
+        self.assertEqual(len(data['unlocated']), 1)
+        self.assertAlmostEqual(data['total_km'], 3.34, places=1)
+
+        response = self.client.get(reverse('assignments:route'))
+        self.assertEqual(len(response.context['plan'].stops), 2)
+
+    def test_route_ignores_invalid_start_and_rejects_bad_technician(self):
+        self.client.force_login(self.technician)
+        for params in ({'lat': 'nan', 'lon': '-90.5'}, {'lat': '14.6', 'lon': 'inf'}, {'lat': '95', 'lon': '-90.5'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('assignments:route'), params)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.context['start'])
+
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('assignments:route_api'), {'tecnico': 'abc'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('assignments:route_api'), {'tecnico': self.technician.pk})
+        self.assertEqual(response.status_code, 200)
+
+
+class TechnicianStatsConditionalTests(AssignmentTestMixin, TestCase):
+
+    def setUp(self):
+        self.assignment = TaskAssignment.objects.create(
+            request=self.create_request(), assigned_by=self.manager, assigned_to=self.technician
+        )
+        self.client.force_login(self.technician)
+        self.url = reverse('assignments:stats_api')
+
+    def test_not_modified_until_assignment_changes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        etag = response['ETag']
+        self.assertTrue(transitions.accept_assignment(self.assignment))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['recent_tasks'][0]['status'], 'Aceptada')
+
+    def test_stats_served_from_cache_until_assignment_changes(self):
+        self.client.get(self.url)
+        # Sesión, usuario y validadores; las consultas de la vista no se repiten
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(self.url).json()['assigned'], 1)
+
+        TaskAssignment.objects.create(
+            request=self.create_request(), assigned_by=self.manager, assigned_to=self.technician
+        )
+        self.assertEqual(self.client.get(self.url).json()['assigned'], 2)
+
+    def test_stats_use_one_grouped_count_and_recent_tasks(self):
+        completed = TaskAssignment.objects.create(
+            request=self.create_request(), assigned_by=self.manager, assigned_to=self.technician
+        )
+        self.assertTrue(transitions.complete_assignment(completed, actual_hours=Decimal('1.00')))
+        caches['views'].clear()
+        self.client.get(self.url)
+        caches['views'].clear()
+
+        # Sesión, usuario, validadores, conteo agrupado y últimas tareas
+        with self.assertNumQueries(5):
+            data = self.client.get(self.url).json()
+        self.assertEqual((data['assigned'], data['in_progress'], data['completed']), (1, 0, 1))
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(len(data['recent_tasks']), 2)
+        self.assertIn(
+            reverse('assignments:detail', args=[self.assignment.pk]),
+            [task['url'] for task in data['recent_tasks']],
+        )
+
+
+class AssignmentListFragmentCacheTests(AssignmentTestMixin, TestCase):
+
+    def setUp(self):
+        caches['fragments'].clear()
+        self.assignment = TaskAssignment.objects.create(
+            request=self.create_request(), assigned_by=self.manager, assigned_to=self.technician
+        )
+        self.url = reverse('assignments:list')
+
+    def test_cached_row_keeps_per_user_actions(self):
+        self.client.force_login(self.manager)
+        self.assertNotContains(self.client.get(self.url), 'Aceptar tarea')
+
+        # Mismo fragmento en caché para el rol, pero los botones son del técnico
+        other = User.objects.create_user(username='encargado2', role='MANAGER')
+        self.client.force_login(other)
+        self.assertNotContains(self.client.get(self.url), 'Aceptar tarea')
+        self.client.force_login(self.technician)
+        self.assertContains(self.client.get(self.url), 'Aceptar tarea')
+
+    def test_row_follows_related_labels(self):
+        self.client.force_login(self.manager)
+        self.client.get(self.url)
+
+        self.service_type.name = 'Agua potable'
+        self.service_type.save()
+        self.technician.first_name = 'Pedro'
+        self.technician.save()
+        self.manager.first_name, self.manager.last_name = 'Ana', 'López'
+        self.manager.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Agua potable')
+        self.assertContains(response, 'Pedro Pérez')
+        self.assertContains(response, 'Ana López')
+
+    def test_row_refreshes_after_transition(self):
+        self.client.force_login(self.technician)
+        self.client.get(self.url)
+        self.assertTrue(transitions.accept_assignment(self.assignment))
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Aceptada')
+        self.assertContains(response, 'Iniciar trabajo')
+
+
+class TechnicianRollupTests(AssignmentTestMixin, TestCase):
+
+    def assign(self, technician=None, **kwargs):
+        return TaskAssignment.objects.create(
+            request=self.create_request(), assigned_by=self.manager,
+            assigned_to=technician or self.technician, **kwargs
+        )
+
+    def rollup(self, technician=None):
+        return TechnicianRollup.objects.get(technician=technician or self.technician)
+
+    def test_rollup_follows_saves_and_transitions(self):
+        first = self.assign(materials_cost=Decimal('50.00'))
+        self.assign()
+        self.assertEqual(self.rollup().active_assignments, 2)
+
+        self.assertTrue(transitions.complete_assignment(first, actual_hours=Decimal('3.00')))
+        rollup = self.rollup()
+        self.assertEqual((rollup.active_assignments, rollup.completed_assignments), (1, 1))
+        self.assertEqual(rollup.total_hours, Decimal('3.00'))
+        self.assertEqual(rollup.total_cost, Decimal('50.00'))
+        self.assertEqual(rollup.avg_hours, Decimal('3.00'))
+
+    def test_reassignment_updates_previous_technician(self):
+        other = User.objects.create_user(username='tecnico2', role='TECHNICIAN')
+        assignment = self.assign()
+        assignment = TaskAssignment.objects.get(pk=assignment.pk)
+        assignment.assigned_to = other
+        assignment.save()
+        self.assertEqual(self.rollup().total_assignments, 0)
+        self.assertEqual(self.rollup(other).total_assignments, 1)
+
+        # Eliminar al técnico no deja un resumen huérfano
+        other.delete()
+        self.assertFalse(TechnicianRollup.objects.filter(technician_id=other.pk).exists())
+
+    def test_rebuild_reads_rollup_row_before_aggregating(self):
+        self.assign()
+        TechnicianRollup.objects.filter(technician=self.technician).update(total_assignments=7)
+        with CaptureQueriesContext(connection) as queries:
+            TechnicianRollup.rebuild(self.technician.pk)
+        # La fila (bloqueada en PostgreSQL) se lee antes que las asignaciones
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertIn('assignments_technicianrollup', selects[0])
+        self.assertEqual(self.rollup().total_assignments, 1)
+
+        TechnicianRollup.objects.all().delete()
+        TechnicianRollup.rebuild(self.technician.pk)
+        self.assertEqual(self.rollup().active_assignments, 1)
+
+    def test_management_page_reads_rollups_once(self):
+        idle = User.objects.create_user(username='tecnico2', role='TECHNICIAN')
+        for _ in range(5):
+            self.assign()
+        self.client.force_login(self.manager)
+        # La primera visita deja en caché el contador de notificaciones
+        self.client.get(reverse('assignments:technician_management'))
+        # Sesión, usuario y técnicos con su resumen
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('assignments:technician_management'))
+        self.assertEqual(response.context['technicians'], [self.technician, idle])
+        self.assertEqual(response.context['total_active_tasks'], 5)
+        self.assertEqual(response.context['available_technicians'], 1)
+        self.assertEqual(response.context['overloaded_technicians'], 1)
+
+
+class NotificationInboxTests(AssignmentTestMixin, TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.technician)
+        self.url = reverse('assignments:notifications')
+
+    def test_inbox_pages_by_cursor_without_marking_read(self):
+        for index in range(25):
+            notify([self.technician], 'GENERAL', f'Aviso {index}', 'Mensaje')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 20)
+        self.assertTrue(page.has_next)
+
+        response = self.client.get(self.url, {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 5)
+        # Leer la bandeja ya no cambia el estado; se marca de forma explícita
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 25)
+
+    def test_unread_badge_is_cached_until_inbox_changes(self):
+        notify([self.technician], 'GENERAL', 'Aviso', 'Mensaje')
+        self.assertContains(self.client.get(reverse('assignments:list')), 'bg-danger">1<')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('assignments:list'))
+        self.assertFalse([q for q in queries if 'assignments_notification' in q['sql']])
+
+        notify([self.technician], 'GENERAL', 'Aviso', 'Mensaje')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('assignments:list'))
+        self.assertContains(response, 'bg-danger">2<')
+        self.assertEqual(len([q for q in queries if 'assignments_notification' in q['sql']]), 1)
+
+    def test_mark_selected_and_all_read(self):
+        first, second, third = [
+            notify([self.technician], 'GENERAL', f'Aviso {index}', 'Mensaje')[0] for index in range(3)
+        ]
+        other = notify([self.manager], 'GENERAL', 'Ajena', 'Mensaje')[0]
+
+        self.client.post(reverse('assignments:notifications_mark_read'), {'ids': [first.pk, other.pk]})
+        self.assertEqual(
+            set(Notification.objects.filter(is_read=True).values_list('pk', flat=True)), {first.pk}
+        )
+        self.assertEqual(self.client.get(self.url, {'filtro': 'no-leidas'}).context['unread_notifications'](), 2)
+
+        self.client.post(reverse('assignments:notifications_mark_all_read'))
+        self.assertFalse(Notification.objects.filter(recipient=self.technician, is_read=False).exists())
+        self.assertFalse(Notification.objects.get(pk=other.pk).is_read)
+        self.assertNotContains(self.client.get(self.url), 'badge rounded-pill')
+
+    def test_purge_removes_only_old_read_notifications(self):
+        old_read, old_unread, recent_read = [
+            notify([self.technician], 'GENERAL', f'Aviso {index}', 'Mensaje')[0] for index in range(3)
+        ]
+        Notification.objects.filter(pk__in=[old_read.pk, old_unread.pk]).update(
+            created_at=timezone.now() - timedelta(days=120)
+        )
+        Notification.objects.filter(pk__in=[old_read.pk, recent_read.pk]).update(is_read=True)
+
+        call_command('purge_notifications', days=90, batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            set(Notification.objects.values_list('pk', flat=True)), {old_unread.pk, recent_read.pk}
+        )
+
+
+class NotificationDigestTests(AssignmentTestMixin, TestCase):
+
+    def setUp(self):
+        self.service_request = self.create_request()
+
+    def send(self, title, recipients=None, service_request=None):
+        return notify(
+            recipients or [self.technician, self.manager], 'TASK_UPDATED', title, 'Mensaje',
+            related_request=service_request or self.service_request,
+        )
+
+    def test_events_on_same_request_are_upserted_into_one_row(self):
+        self.send('Primer avance')
+        with CaptureQueriesContext(connection) as queries:
+            self.send('Segundo avance')
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('ON CONFLICT', inserts[0])
+
+        digest = Notification.objects.get(recipient=self.technician)
+        self.assertEqual((digest.title, digest.event_count), ('Segundo avance', 2))
+        self.assertEqual(Notification.objects.count(), 2)
+
+        # Otra solicitud tiene su propio resumen
+        self.send('Otra', recipients=[self.technician], service_request=self.create_request())
+        self.assertEqual(Notification.objects.filter(recipient=self.technician).count(), 2)
+
+    def test_read_digest_restarts_as_unread(self):
+        first = self.send('Primer avance', recipients=[self.technician])[0]
+        Notification.objects.filter(pk=first.pk).update(is_read=True)
+
+        self.send('Segundo avance', recipients=[self.technician])
+        digest = Notification.objects.get(pk=first.pk)
+        self.assertFalse(digest.is_read)
+        self.assertEqual(digest.event_count, 1)
+
+    @override_settings(NOTIFICATION_DIGEST_WINDOW=0)
+    def test_digest_can_be_disabled(self):
+        self.send('Primer avance')
+        self.send('Segundo avance')
+        self.assertEqual(Notification.objects.filter(recipient=self.technician).count(), 2)
 
-# Create your tests here.
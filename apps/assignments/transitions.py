@@ -0,0 +1,102 @@
+"""
+Transiciones de estado de TaskAssignment.
+
+Cada transición es un solo UPDATE condicional (WHERE status IN (...)) con
+solo las columnas que cambian, de modo que dos usuarios actuando a la vez
+no se pisan: solo uno cambia la fila y el otro recibe False. La solicitud
+vinculada se actualiza en la misma transacción, bloqueando su fila, y se
+guarda con update_fields para que sus señales (historial, contadores,
+correos) sigan funcionando.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.utils.cache import invalidate_tags_on_commit
+from apps.core.utils.events import publish_on_commit
+from apps.requests.models import ServiceRequest
+from .models import TaskAssignment, TechnicianRollup
+from .recommender import workload_index
+
+ACCEPTABLE_STATUSES = ['ASSIGNED']
+STARTABLE_STATUSES = ['ASSIGNED', 'ACCEPTED']
+COMPLETABLE_STATUSES = ['ASSIGNED', 'ACCEPTED', 'IN_PROGRESS', 'ON_HOLD']
+
+
+def transition_assignment(assignment, from_statuses, to_status, changes=None, request_changes=None):
+    """
+    Cambia el estado de una asignación si está en alguno de from_statuses.
+
+    Args:
+        assignment: Asignación (solo se usan pk, request_id y assigned_to_id)
+        from_statuses: Estados desde los que se permite la transición
+        to_status: Nuevo estado
+        changes: Otras columnas de la asignación a actualizar
+        request_changes: Columnas de la solicitud vinculada a actualizar
+
+    Returns:
+        bool: True si la transición se realizó
+    """
+    # update() no aplica auto_now: updated_at se asigna aquí
+    values = dict(changes or {}, status=to_status, updated_at=timezone.now())
+
+    with transaction.atomic():
+        updated = TaskAssignment.objects.filter(
+            pk=assignment.pk, status__in=from_statuses
+        ).update(**values)
+        if not updated:
+            return False
+
+        if request_changes:
+            service_request = ServiceRequest.objects.select_for_update().get(pk=assignment.request_id)
+            for field, value in request_changes.items():
+                setattr(service_request, field, value)
+            service_request.save(update_fields=[*request_changes, 'updated_at'])
+            assignment.request = service_request
+
+        # update() no dispara las señales: el resumen del técnico se recalcula
+        # si la transición puede cambiarlo (aceptar e iniciar no lo cambian)
+        if not {to_status, *from_statuses} <= set(TaskAssignment.ACTIVE_STATUSES):
+            TechnicianRollup.rebuild(assignment.assigned_to_id)
+        publish_on_commit(f'stats:technician:{assignment.assigned_to_id}', {'type': 'invalidate'})
+        invalidate_tags_on_commit('assignments', f'assignments:technician:{assignment.assigned_to_id}')
+        workload_index.refresh_on_commit(assignment.pk)
+
+    for field, value in values.items():
+        setattr(assignment, field, value)
+    return True
+
+
+def accept_assignment(assignment):
+    """El técnico acepta la tarea"""
+    return transition_assignment(
+        assignment, ACCEPTABLE_STATUSES, 'ACCEPTED',
+        changes={'accepted_at': timezone.now()},
+    )
+
+
+def start_assignment(assignment):
+    """El técnico inicia la tarea; la solicitud pasa a En Proceso"""
+    return transition_assignment(
+        assignment, STARTABLE_STATUSES, 'IN_PROGRESS',
+        changes={'started_at': timezone.now()},
+        request_changes={'status': 'IN_PROGRESS'},
+    )
+
+
+def complete_assignment(assignment, actual_hours=None, notes='', materials_used=''):
+    """El técnico completa la tarea; la solicitud pasa a Completada"""
+    now = timezone.now()
+    changes = {
+        'actual_completion': now,
+        'actual_hours': actual_hours,
+        'notes': notes,
+    }
+    # Los materiales utilizados se guardan en materials_needed (reutilizamos el campo)
+    if materials_used:
+        changes['materials_needed'] = materials_used
+
+    return transition_assignment(
+        assignment, COMPLETABLE_STATUSES, 'COMPLETED',
+        changes=changes,
+        request_changes={'status': 'COMPLETED', 'completed_at': now},
+    )
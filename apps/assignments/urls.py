@@ -8,8 +8,13 @@ from .views import (
     add_task_update,
     complete_assignment,
     notification_list,
+    notification_mark_read,
+    notification_mark_all_read,
     technician_management,
     technician_stats_api,
+    technician_stats_stream,
+    technician_route,
+    technician_route_api,
 )
 
 app_name = 'assignments'
@@ -23,6 +28,11 @@ urlpatterns = [
     path('<int:pk>/actualizar/', add_task_update, name='add_update'),
     path('<int:pk>/completar/', complete_assignment, name='complete'),
     path('notificaciones/', notification_list, name='notifications'),
+    path('notificaciones/marcar-leidas/', notification_mark_read, name='notifications_mark_read'),
+    path('notificaciones/marcar-todas/', notification_mark_all_read, name='notifications_mark_all_read'),
     path('personal/', technician_management, name='technician_management'),
+    path('ruta/', technician_route, name='route'),
+    path('api/ruta/', technician_route_api, name='route_api'),
     path('api/stats/', technician_stats_api, name='stats_api'),
+    path('api/stats/stream/', technician_stats_stream, name='stats_stream'),
 ]
\ No newline at end of file
@@ -3,15 +3,22 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import ListView, DetailView
-from django.urls import reverse_lazy
-from django.http import HttpResponseForbidden, JsonResponse
-from django.db.models import Q, Count, Avg, Sum
+from django.urls import reverse, reverse_lazy
+from django.http import Http404, HttpResponseForbidden, JsonResponse
+from django.db.models import Count, Max
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import TaskAssignment, TaskUpdate, Notification
+from .models import TaskAssignment, TaskUpdate, Notification, TechnicianRollup
 from .forms import TaskAssignmentForm, TaskUpdateForm, TaskAcceptForm, TaskCompleteForm
+from . import notifications, transitions
+from .recommender import workload_index
+from .routing import plan_technician_route
 from apps.requests.models import ServiceRequest
-from apps.authentication.decorators import role_required
+from apps.authentication.decorators import role_required, technician_required
+from apps.core.utils.events import event_stream_response
+from apps.core.utils.cache import cache_policy
+from apps.core.utils.conditional import conditional_view
+from apps.core.utils.params import coordinate_params
 
 User = get_user_model()
 
@@ -25,7 +32,7 @@ class TaskAssignmentListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         queryset = TaskAssignment.objects.select_related(
-            'request', 'assigned_to', 'assigned_by'
+            'request__service_type', 'assigned_to', 'assigned_by'
         )
 
         # Filtrar según el rol del usuario
@@ -118,11 +125,19 @@ def create_assignment(request, ticket_number):
             messages.success(request, 'Tarea asignada exitosamente.')
             return redirect('requests:detail', ticket_number=ticket_number)
     else:
-        form = TaskAssignmentForm(request_obj=service_request, user=request.user)
+        form = None
+
+    # Técnicos sugeridos según carga de trabajo, experiencia y distancia
+    recommendations = workload_index.recommend(service_request)
+
+    if form is None:
+        initial = {'assigned_to': recommendations[0].technician_id} if recommendations else {}
+        form = TaskAssignmentForm(request_obj=service_request, user=request.user, initial=initial)
 
     return render(request, 'assignments/assignment_create.html', {
         'form': form,
-        'service_request': service_request
+        'service_request': service_request,
+        'recommendations': recommendations,
     })
 
 
@@ -132,14 +147,11 @@ def accept_assignment(request, pk):
     assignment = get_object_or_404(TaskAssignment, pk=pk)
 
     # Verificar que sea el técnico asignado
-    if request.user != assignment.assigned_to:
+    if assignment.assigned_to_id != request.user.pk:
         return HttpResponseForbidden("No tienes permisos para aceptar esta tarea.")
 
     if request.method == 'POST':
-        if assignment.status == 'ASSIGNED':
-            assignment.status = 'ACCEPTED'
-            assignment.accepted_at = timezone.now()
-            assignment.save()
+        if transitions.accept_assignment(assignment):
             messages.success(request, 'Tarea aceptada exitosamente.')
         else:
             messages.warning(request, 'Esta tarea ya no puede ser aceptada.')
@@ -152,19 +164,12 @@ def start_assignment(request, pk):
     """Vista para iniciar una asignación"""
     assignment = get_object_or_404(TaskAssignment, pk=pk)
 
-    if request.user != assignment.assigned_to:
+    if assignment.assigned_to_id != request.user.pk:
         return HttpResponseForbidden("No tienes permisos para iniciar esta tarea.")
 
     if request.method == 'POST':
-        if assignment.status in ['ASSIGNED', 'ACCEPTED']:
-            assignment.status = 'IN_PROGRESS'
-            assignment.started_at = timezone.now()
-            assignment.save()
-
-            # Actualizar solicitud
-            assignment.request.status = 'IN_PROGRESS'
-            assignment.request.save()
-
+        # Inicia la tarea y actualiza la solicitud en una sola transacción
+        if transitions.start_assignment(assignment):
             messages.success(request, 'Tarea iniciada exitosamente.')
         else:
             messages.warning(request, 'Esta tarea no puede ser iniciada.')
@@ -199,29 +204,23 @@ def complete_assignment(request, pk):
     """Vista para completar una asignación"""
     assignment = get_object_or_404(TaskAssignment, pk=pk)
 
-    if request.user != assignment.assigned_to:
+    if assignment.assigned_to_id != request.user.pk:
         return HttpResponseForbidden("No tienes permisos para completar esta tarea.")
 
     if request.method == 'POST':
         form = TaskCompleteForm(request.POST)
         if form.is_valid():
-            assignment.status = 'COMPLETED'
-            assignment.actual_completion = timezone.now()
-            assignment.actual_hours = form.cleaned_data['actual_hours']
-            assignment.notes = form.cleaned_data['notes']
-
-            # Guardar materiales utilizados en materials_needed (reutilizamos el campo)
-            if form.cleaned_data.get('materials_used'):
-                assignment.materials_needed = form.cleaned_data['materials_used']
-
-            assignment.save()
-
-            # Actualizar solicitud
-            assignment.request.status = 'COMPLETED'
-            assignment.request.completed_at = timezone.now()
-            assignment.request.save()
-
-            messages.success(request, 'Tarea completada exitosamente.')
+            # Completa la tarea y la solicitud en una sola transacción
+            completed = transitions.complete_assignment(
+                assignment,
+                actual_hours=form.cleaned_data['actual_hours'],
+                notes=form.cleaned_data['notes'],
+                materials_used=form.cleaned_data.get('materials_used'),
+            )
+            if completed:
+                messages.success(request, 'Tarea completada exitosamente.')
+            else:
+                messages.warning(request, 'Esta tarea ya no puede ser completada.')
             return redirect('assignments:detail', pk=pk)
 
     return redirect('assignments:detail', pk=pk)
@@ -229,63 +228,70 @@ def complete_assignment(request, pk):
 
 @login_required
 def notification_list(request):
-    """Vista para listar notificaciones del usuario"""
-    notifications = Notification.objects.filter(
-        recipient=request.user
-    ).select_related('related_request').order_by('-created_at')[:20]
-
-    # Marcar como leídas las notificaciones vistas
-    unread = notifications.filter(is_read=False)
-    unread.update(is_read=True)
+    """Bandeja de notificaciones del usuario (paginación por cursor)"""
+    unread_only = request.GET.get('filtro') == 'no-leidas'
+    page = notifications.inbox_page(request.user, request.GET.get('cursor'), unread_only=unread_only)
 
     return render(request, 'assignments/notification_list.html', {
-        'notifications': notifications
+        'notifications': page,
+        'page_obj': page,
+        'unread_only': unread_only,
+        'filter_querystring': 'filtro=no-leidas' if unread_only else '',
     })
 
 
+@login_required
+def notification_mark_read(request):
+    """Marca como leídas las notificaciones seleccionadas"""
+    if request.method == 'POST':
+        ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+        updated = notifications.mark_read(request.user, ids)
+        messages.success(request, f'{updated} notificación(es) marcada(s) como leída(s).')
+    return redirect(_notification_list_url(request))
+
+
+@login_required
+def notification_mark_all_read(request):
+    """Marca como leídas todas las notificaciones del usuario"""
+    if request.method == 'POST':
+        notifications.mark_all_read(request.user)
+        messages.success(request, 'Todas las notificaciones fueron marcadas como leídas.')
+    return redirect(_notification_list_url(request))
+
+
+def _notification_list_url(request):
+    url = reverse('assignments:notifications')
+    if request.POST.get('filtro') == 'no-leidas':
+        url += '?filtro=no-leidas'
+    return url
+
+
 @login_required
 @role_required(['ADMIN', 'MANAGER'])
 def technician_management(request):
     """Vista para gestión de personal técnico"""
 
-    # Obtener todos los técnicos activos
-    technicians = User.objects.filter(
+    # Técnicos activos con su resumen precalculado (una sola consulta)
+    technicians = list(User.objects.filter(
         role='TECHNICIAN',
         is_active=True
-    ).annotate(
-        # Contar asignaciones por estado
-        total_assignments=Count('assignments_received'),
-        active_assignments=Count('assignments_received', filter=Q(
-            assignments_received__status__in=['ASSIGNED', 'ACCEPTED', 'IN_PROGRESS']
-        )),
-        completed_assignments=Count('assignments_received', filter=Q(
-            assignments_received__status='COMPLETED'
-        )),
-        # Promedio de horas trabajadas
-        avg_hours=Avg('assignments_received__actual_hours', filter=Q(
-            assignments_received__status='COMPLETED'
-        )),
-        # Total de horas trabajadas
-        total_hours=Sum('assignments_received__actual_hours', filter=Q(
-            assignments_received__status='COMPLETED'
-        )),
-        # Costo total de materiales
-        total_cost=Sum('assignments_received__materials_cost', filter=Q(
-            assignments_received__status='COMPLETED'
-        ))
-    ).order_by('-active_assignments', '-completed_assignments')
+    ).select_related('assignment_rollup'))
+    for technician in technicians:
+        rollup = getattr(technician, 'assignment_rollup', None)
+        technician.rollup = rollup or TechnicianRollup(technician=technician)
+    technicians.sort(key=lambda technician: (
+        -technician.rollup.active_assignments, -technician.rollup.completed_assignments
+    ))
 
     # Estadísticas generales
-    total_technicians = technicians.count()
-    total_active_tasks = TaskAssignment.objects.filter(
-        status__in=['ASSIGNED', 'ACCEPTED', 'IN_PROGRESS']
-    ).count()
+    total_technicians = len(technicians)
+    total_active_tasks = sum(technician.rollup.active_assignments for technician in technicians)
 
     # Técnicos disponibles (sin tareas activas o con pocas)
-    available_technicians = technicians.filter(active_assignments__lte=2).count()
+    available_technicians = sum(1 for technician in technicians if technician.rollup.active_assignments <= 2)
 
     # Técnicos sobrecargados (más de 5 tareas activas)
-    overloaded_technicians = technicians.filter(active_assignments__gte=5).count()
+    overloaded_technicians = sum(1 for technician in technicians if technician.rollup.active_assignments >= 5)
 
     context = {
         'technicians': technicians,
@@ -298,7 +304,24 @@ def technician_management(request):
     return render(request, 'assignments/technician_management.html', context)
 
 
+def _technician_stats_validators(request):
+    """
+    Validadores de las estadísticas del técnico: cantidad y última
+    modificación de sus asignaciones y de las solicitudes vinculadas.
+    """
+    if request.user.role != 'TECHNICIAN':
+        return None
+    row = TaskAssignment.objects.filter(assigned_to=request.user).aggregate(
+        count=Count('id'),
+        updated=Max('updated_at'),
+        request_updated=Max('request__updated_at'),
+    )
+    return tuple(row.values()), row['updated']
+
+
 @login_required
+@conditional_view(_technician_stats_validators)
+@cache_policy('assignments.technician_stats_api')
 def technician_stats_api(request):
     """API para obtener estadísticas del técnico"""
 
@@ -307,28 +330,33 @@ def technician_stats_api(request):
 
     my_assignments = TaskAssignment.objects.filter(assigned_to=request.user)
 
-    # Contar por estado
-    assigned_count = my_assignments.filter(status__in=['ASSIGNED', 'ACCEPTED']).count()
-    in_progress_count = my_assignments.filter(status='IN_PROGRESS').count()
-    completed_count = my_assignments.filter(status='COMPLETED').count()
-
-    # Últimas 5 tareas
-    recent_tasks = my_assignments.select_related(
-        'request', 'request__service_type'
-    ).order_by('-assigned_at')[:5]
-
+    # Conteo por estado en una sola consulta agrupada
+    by_status = dict(
+        my_assignments.order_by().values_list('status').annotate(count=Count('id'))
+    )
+    assigned_count = by_status.get('ASSIGNED', 0) + by_status.get('ACCEPTED', 0)
+    in_progress_count = by_status.get('IN_PROGRESS', 0)
+    completed_count = by_status.get('COMPLETED', 0)
+
+    # Últimas 5 tareas, solo las columnas que se envían
+    recent_tasks = my_assignments.order_by('-assigned_at').values(
+        'id', 'status', 'priority', 'assigned_at', 'request__title', 'request__ticket_number'
+    )[:5]
+
+    status_labels = dict(TaskAssignment.STATUS_CHOICES)
+    priority_labels = dict(TaskAssignment.PRIORITY_CHOICES)
     recent_tasks_data = []
     for task in recent_tasks:
         recent_tasks_data.append({
-            'id': task.id,
-            'title': task.request.title,
-            'ticket': task.request.ticket_number,
-            'status': task.get_status_display(),
-            'status_class': get_status_class(task.status),
-            'priority': task.get_priority_display(),
-            'priority_class': get_priority_class(task.priority),
-            'assigned_at': task.assigned_at.strftime('%d/%m/%Y %H:%M'),
-            'url': f'/asignaciones/{task.id}/'
+            'id': task['id'],
+            'title': task['request__title'],
+            'ticket': task['request__ticket_number'],
+            'status': status_labels.get(task['status'], task['status']),
+            'status_class': get_status_class(task['status']),
+            'priority': priority_labels.get(task['priority'], task['priority']),
+            'priority_class': get_priority_class(task['priority']),
+            'assigned_at': timezone.localtime(task['assigned_at']).strftime('%d/%m/%Y %H:%M'),
+            'url': reverse('assignments:detail', args=[task['id']]),
         })
 
     stats = {
@@ -342,6 +370,71 @@ def technician_stats_api(request):
     return JsonResponse(stats)
 
 
+@login_required
+def technician_stats_stream(request):
+    """
+    Avisos en vivo (Server-Sent Events) para el dashboard del técnico.
+
+    Las estadísticas incluyen las últimas tareas, así que en lugar de
+    diferencias se envía un evento 'invalidate' cuando cambia alguna
+    asignación del técnico y el navegador vuelve a consultar technician_stats_api.
+    """
+    if request.user.role != 'TECHNICIAN':
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    return event_stream_response(
+        [f'stats:technician:{request.user.pk}'],
+        snapshot=lambda: {},
+    )
+
+
+def _route_params(request):
+    """
+    Técnico y punto de partida de la ruta. El personal puede consultar la
+    ruta de otro técnico con ?tecnico=<id>; ?lat=&lon= fija el inicio.
+    """
+    technician = request.user
+    technician_id = request.GET.get('tecnico')
+    if technician_id and request.user.role in ['ADMIN', 'MANAGER']:
+        if not technician_id.isdigit():
+            raise Http404('Técnico no encontrado')
+        technician = get_object_or_404(User, pk=technician_id, role='TECHNICIAN')
+
+    # Un inicio ausente o inválido (NaN, fuera de rango) se ignora
+    return technician, coordinate_params(request.GET)
+
+
+@technician_required
+def technician_route(request):
+    """Vista con la ruta sugerida para las tareas abiertas del técnico"""
+    technician, start = _route_params(request)
+    plan = plan_technician_route(technician, start)
+
+    return render(request, 'assignments/technician_route.html', {
+        'technician': technician,
+        'plan': plan,
+        'start': start,
+        'maps_url': _maps_directions_url(plan, start),
+    })
+
+
+@technician_required
+def technician_route_api(request):
+    """API con la ruta sugerida (paradas en orden y distancias en km)"""
+    technician, start = _route_params(request)
+    return JsonResponse(plan_technician_route(technician, start).as_dict())
+
+
+def _maps_directions_url(plan, start):
+    """Enlace de Google Maps con las paradas en el orden planificado"""
+    points = ([start] if start else []) + [
+        (stop['latitude'], stop['longitude']) for stop in plan.stops
+    ]
+    if len(points) < 2:
+        return None
+    return 'https://www.google.com/maps/dir/' + '/'.join(f'{lat},{lon}' for lat, lon in points)
+
+
 def get_status_class(status):
     """Retorna la clase CSS para el estado"""
     classes = {
@@ -3,9 +3,11 @@ from django.conf import settings
 def site_settings(request):
     """
     Context processor para variables globales del sitio.
-    Hace disponibles los logos en todos los templates.
+    Hace disponibles los logos y la caché de fragmentos en todos los templates.
     """
     return {
         'LOGO_MUNICIPALIDAD_URL': getattr(settings, 'LOGO_MUNICIPALIDAD_URL', ''),
         'LOGO_UNIVERSIDAD_URL': getattr(settings, 'LOGO_UNIVERSIDAD_URL', ''),
+        'FRAGMENT_CACHE_ALIAS': getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default'),
+        'FRAGMENT_CACHE_TIMEOUT': getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300),
     }
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Capa de caché de la aplicación.
+
+Las políticas se declaran por nombre en settings.CACHE_POLICIES:
+
+    'requests.stats_api': {
+        'alias': 'views',          # alias de CACHES
+        'timeout': 60,             # segundos (None = hasta invalidar)
+        'vary_on': ['role', 'user', 'date'],
+        'tags': ['requests'],      # admite {user} (id del usuario)
+    }
+
+Cada entrada lleva en la clave la versión actual de sus etiquetas.
+invalidate_tags solo cambia esas versiones: las entradas anteriores quedan
+inalcanzables y expiran solas, así funciona con cualquier backend (memoria,
+archivos, Redis) sin tener que listar claves.
+"""
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TAG_KEY_PREFIX = 'tag'
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    name: str
+    alias: str = 'default'
+    timeout: int = 60
+    vary_on: tuple = ()
+    tags: tuple = ()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def resolve_tags(self, request=None):
+        user_id = getattr(getattr(request, 'user', None), 'pk', None)
+        return [tag.format(user=user_id) for tag in self.tags]
+
+    def version(self, request=None):
+        """Versión combinada de las etiquetas o None si la caché no responde"""
+        try:
+            return tuple(tag_versions(self.cache, self.resolve_tags(request)))
+        except Exception as error:
+            logger.warning('Caché %s no disponible: %s', self.alias, error)
+            return None
+
+    def make_key(self, request=None, *parts):
+        values = [_vary_value(request, name) for name in self.vary_on]
+        values += tag_versions(self.cache, self.resolve_tags(request))
+        values += parts
+        digest = hashlib.md5(repr(values).encode()).hexdigest()
+        return f'policy:{self.name}:{digest}'
+
+    def get_or_set(self, build, *parts, request=None):
+        """
+        Valor en caché para la política o build() si no está (None no se
+        guarda). Si el backend falla se calcula sin caché en lugar de romper
+        la página.
+        """
+        try:
+            key = self.make_key(request, *parts)
+            value = self.cache.get(key)
+        except Exception as error:
+            logger.warning('Caché %s no disponible: %s', self.alias, error)
+            return build()
+        if value is None:
+            value = build()
+            if value is None:
+                return None
+            try:
+                self.cache.set(key, value, self.timeout)
+            except Exception as error:
+                logger.warning('Caché %s no disponible: %s', self.alias, error)
+        return value
+
+
+def _vary_value(request, name):
+    if name == 'date':
+        return timezone.localdate().isoformat()
+    user = getattr(request, 'user', None)
+    if name == 'role':
+        return getattr(user, 'role', '')
+    if name == 'user':
+        return getattr(user, 'pk', None)
+    raise ValueError(f'vary_on desconocido: {name}')
+
+
+def get_policy(name):
+    """Política declarada en settings.CACHE_POLICIES"""
+    options = dict(settings.CACHE_POLICIES[name])
+    return CachePolicy(
+        name=name,
+        alias=options.get('alias', 'default'),
+        timeout=options.get('timeout', 60),
+        vary_on=tuple(options.get('vary_on', ())),
+        tags=tuple(options.get('tags', ())),
+    )
+
+
+def tag_versions(cache, tags):
+    """Versión actual de cada etiqueta; las que no existen se crean"""
+    if not tags:
+        return []
+    keys = [f'{TAG_KEY_PREFIX}:{tag}' for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(*tags):
+    """Invalida las entradas de todas las políticas con esas etiquetas"""
+    aliases = {options.get('alias', 'default') for options in settings.CACHE_POLICIES.values()}
+    version = time.time_ns()
+    for alias in aliases:
+        try:
+            caches[alias].set_many({f'{TAG_KEY_PREFIX}:{tag}': version for tag in tags}, None)
+        except Exception as error:
+            logger.warning('No se pudieron invalidar las etiquetas %s en %s: %s', tags, alias, error)
+
+
+def invalidate_tags_on_commit(*tags):
+    """
+    Invalida ahora (lecturas dentro de la misma transacción) y otra vez al
+    confirmar, por si otra petición guardó datos previos mientras tanto.
+    """
+    invalidate_tags(*tags)
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def cache_policy(name):
+    """
+    Decorador que guarda en caché las respuestas 200 de una vista GET según
+    la política indicada. La ruta completa (con parámetros) y los validadores
+    de conditional_view, si los hay, forman parte de la clave.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            policy = get_policy(name)
+            validators = getattr(request, '_conditional_validators', None)
+            responses = []
+
+            def build():
+                response = view_func(request, *args, **kwargs)
+                responses.append(response)
+                if response.status_code != 200 or response.streaming:
+                    return None
+                return response.content, response['Content-Type']
+
+            cached = policy.get_or_set(build, request.get_full_path(), validators, request=request)
+            if responses:
+                return responses[0]
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        return _wrapped_view
+    return decorator
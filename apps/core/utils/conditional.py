@@ -0,0 +1,67 @@
+"""
+GET condicional (ETag / Last-Modified) para vistas de usuarios autenticados.
+
+La vista declara una función de validadores que hace una sola consulta
+barata; si el navegador ya tiene la versión vigente se responde 304 sin
+ejecutar la vista (ni sus consultas ni la plantilla).
+
+El ETag incluye al usuario, su rol y el token CSRF, porque la página cambia
+según quién la ve y los formularios llevan el token.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def viewer_etag(request, *parts):
+    """ETag para el usuario actual a partir de las partes indicadas"""
+    raw = ':'.join(str(part) for part in (
+        request.user.pk,
+        request.user.role,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        *parts,
+    ))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional_view(validators):
+    """
+    Decorador de vistas con GET condicional.
+
+    Args:
+        validators: función (request, *args, **kwargs) que devuelve
+            (partes_del_etag, last_modified) o None si no se puede validar
+            (la vista se ejecuta normalmente)
+    """
+    def resolve(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_validators'):
+            result = None
+            # Con mensajes pendientes la página debe mostrarse completa
+            if request.user.is_authenticated and not len(messages.get_messages(request)):
+                result = validators(request, *args, **kwargs)
+            request._conditional_validators = result
+        return request._conditional_validators
+
+    def etag(request, *args, **kwargs):
+        result = resolve(request, *args, **kwargs)
+        return viewer_etag(request, *result[0]) if result else None
+
+    def last_modified(request, *args, **kwargs):
+        result = resolve(request, *args, **kwargs)
+        return result[1] if result else None
+
+    def decorator(view_func):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            # El navegador guarda la respuesta, pero debe revalidarla siempre
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,219 @@
+"""
+Publicación/suscripción de eventos para las transmisiones en vivo (SSE).
+
+El broker por defecto vive en el proceso: sirve cuando la aplicación corre en
+un solo proceso (un worker gthread de gunicorn, como en el Procfile); un
+evento publicado en un proceso no llega a los clientes conectados a otro.
+Con varios procesos se debe configurar EVENT_BROKER con una clase que
+exponga la misma interfaz (publish/subscribe) sobre un broker compartido.
+
+Cada stream ocupa un hilo del servidor mientras está abierto, así que cada
+proceso atiende como máximo EVENT_STREAM_MAX_CONNECTIONS a la vez; por
+encima de ese límite se responde 503 y el navegador consulta la API JSON
+periódicamente.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """Cola de eventos de un suscriptor"""
+
+    def __init__(self, broker, channels, max_pending=100):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._overflowed = False
+
+    def put(self, channel, event):
+        try:
+            self._queue.put_nowait((channel, event))
+        except queue.Full:
+            # El cliente no alcanza a leer: se le pide recargar el estado
+            self._overflowed = True
+
+    def get(self, timeout=None):
+        """Siguiente (canal, evento) o None si no llega nada en timeout segundos"""
+        if self._overflowed:
+            self._overflowed = False
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            return None, RESYNC
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LocalEventBroker:
+    """Broker en memoria, seguro entre hilos del mismo proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(channel, event)
+        return len(subscribers)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Instancia única del broker configurado en EVENT_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENT_BROKER)()
+    return _broker
+
+
+def publish_on_commit(channel, event):
+    """Publica el evento cuando se confirme la transacción actual"""
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
+
+
+def format_sse(event, data):
+    """Serializa un evento en el formato de Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_active_streams = 0
+_streams_lock = threading.Lock()
+
+
+def _acquire_stream_slot():
+    """Reserva un lugar para un stream o retorna False si se alcanzó el límite"""
+    global _active_streams
+    with _streams_lock:
+        if _active_streams >= settings.EVENT_STREAM_MAX_CONNECTIONS:
+            return False
+        _active_streams += 1
+        return True
+
+
+def _release_stream_slot():
+    global _active_streams
+    with _streams_lock:
+        _active_streams -= 1
+
+
+class _StreamBody:
+    """
+    Contenido del stream que libera su lugar al cerrarse la respuesta, aunque
+    el generador no haya llegado a iniciarse.
+    """
+
+    def __init__(self, generator):
+        self._generator = generator
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._generator)
+
+    def close(self):
+        try:
+            self._generator.close()
+        finally:
+            if not self._released:
+                self._released = True
+                _release_stream_slot()
+
+
+def event_stream_response(channels, snapshot, event_filter=None):
+    """
+    Respuesta text/event-stream para los canales indicados.
+
+    Args:
+        channels: Canales del broker a escuchar
+        snapshot: Función sin argumentos que retorna el estado inicial; se
+            envía como evento 'snapshot' al conectar y tras un 'resync'
+        event_filter: Función opcional (canal, evento) -> datos a enviar
+            como evento 'delta', o None para omitirlo
+    """
+    if not _acquire_stream_slot():
+        response = JsonResponse({'error': 'Demasiadas conexiones en vivo; use la API'}, status=503)
+        response['Retry-After'] = str(settings.EVENT_STREAM_MAX_DURATION)
+        return response
+
+    heartbeat = settings.EVENT_STREAM_HEARTBEAT
+    max_duration = settings.EVENT_STREAM_MAX_DURATION
+
+    def stream():
+        # Suscribirse antes de leer el estado inicial para no perder eventos
+        with get_broker().subscribe(channels) as subscription:
+            yield f"retry: {settings.EVENT_STREAM_RETRY_MS}\n\n"
+            yield format_sse('snapshot', snapshot())
+            _release_connection()
+
+            deadline = time.monotonic() + max_duration
+            while time.monotonic() < deadline:
+                message = subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ': ping\n\n'
+                    continue
+
+                channel, event = message
+                if event is RESYNC:
+                    yield format_sse('snapshot', snapshot())
+                    _release_connection()
+                    continue
+
+                data = event_filter(channel, event) if event_filter else event
+                if data:
+                    yield format_sse(event.get('type', 'delta'), data)
+
+    response = StreamingHttpResponse(_StreamBody(stream()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _release_connection():
+    """Libera la conexión a la base de datos mientras el stream espera eventos"""
+    if not connection.in_atomic_block:
+        connection.close()
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+
+class FieldTrackerMixin:
+    """
+    Mixin para modelos que guarda los valores de tracked_fields al cargar
+    la fila desde la base de datos (from_db), de modo que las señales puedan
+    comparar cambios sin volver a consultar la fila original.
+
+    tracked_fields usa los attname de los campos (p. ej. 'service_type_id').
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    @property
+    def _tracked_snapshot(self):
+        if '_tracked_values' not in self.__dict__:
+            self.__dict__['_tracked_values'] = {}
+        return self.__dict__['_tracked_values']
+
+    def _snapshot_tracked_fields(self, fields=None):
+        """Copia los valores actuales (ya cargados) de los campos rastreados"""
+        for attname in fields if fields is not None else self.tracked_fields:
+            if attname in self.__dict__:
+                self._tracked_snapshot[attname] = self.__dict__[attname]
+
+    def has_tracked_snapshot(self):
+        """Indica si se conocen los valores originales de todos los campos"""
+        return all(attname in self._tracked_snapshot for attname in self.tracked_fields)
+
+    def load_tracked_snapshot(self):
+        """
+        Consulta los valores originales que falten (instancias creadas a mano
+        con pk o cargadas con only()/defer()).
+        """
+        missing = [attname for attname in self.tracked_fields if attname not in self._tracked_snapshot]
+        if not self.pk or not missing:
+            return
+        values = type(self)._base_manager.filter(pk=self.pk).values(*missing).first()
+        if values:
+            self._tracked_snapshot.update(values)
+
+    def has_changed(self, attname):
+        """Indica si el campo cambió desde que se cargó o guardó la instancia"""
+        if attname not in self._tracked_snapshot:
+            return True
+        return self._tracked_snapshot[attname] != getattr(self, attname)
+
+    def previous_value(self, attname):
+        """Valor del campo al cargar o guardar la instancia por última vez"""
+        return self._tracked_snapshot.get(attname)
+
+    def previous_state(self):
+        """Objeto con los valores originales de los campos rastreados"""
+        return SimpleNamespace(**{
+            attname: self._tracked_snapshot.get(attname, getattr(self, attname))
+            for attname in self.tracked_fields
+        })
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self._snapshot_tracked_fields()
+        else:
+            self._snapshot_tracked_fields([
+                self._meta.get_field(name).attname for name in update_fields
+            ])
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None:
+            self._snapshot_tracked_fields()
+        else:
+            self._snapshot_tracked_fields([
+                self._meta.get_field(name).attname for name in fields
+            ])
@@ -0,0 +1,82 @@
+"""
+Geohash: codifica una coordenada como texto donde los prefijos comunes
+indican celdas cercanas, de modo que un índice B-tree normal sirve para
+búsquedas por zona (sin PostGIS).
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+KM_PER_DEGREE = 111.32
+
+
+def encode(latitude, longitude, precision=8):
+    """Geohash de una coordenada"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def prefix_end(prefix):
+    """
+    Menor geohash posterior a todos los que empiezan con prefix (None si no
+    hay). Solo usa caracteres de BASE32, cuyo orden es el mismo en
+    cualquier collation, así que sirve como límite de un rango en el índice.
+    """
+    stripped = prefix.rstrip(BASE32[-1])
+    if not stripped:
+        return None
+    return stripped[:-1] + BASE32[BASE32.index(stripped[-1]) + 1]
+
+
+def cell_size(precision):
+    """Alto y ancho en grados de una celda de la precisión indicada"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(latitude, longitude, radius_km, max_precision=8, max_cells=32):
+    """
+    Celdas que cubren el cuadrado de lado 2 * radius_km alrededor de la
+    coordenada. Usa la mayor precisión que no pase de max_cells celdas.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    south, north = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    west, east = longitude - lon_delta, longitude + lon_delta
+
+    for precision in range(max_precision, 0, -1):
+        height, width = cell_size(precision)
+        rows = range(math.floor((south + 90) / height), math.floor((north + 90) / height) + 1)
+        cols = range(math.floor((west + 180) / width), math.floor((east + 180) / width) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            break
+
+    cells = set()
+    for row in rows:
+        lat = min(-90 + (row + 0.5) * height, 90.0)
+        for col in cols:
+            lon = (-180 + (col + 0.5) * width + 180) % 360 - 180
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
@@ -0,0 +1,77 @@
+"""
+MinHash y LSH (locality-sensitive hashing) para detectar textos parecidos.
+
+La firma MinHash de un conjunto de términos permite estimar su similitud de
+Jaccard comparando posiciones iguales. Para no comparar contra todos los
+textos, la firma se divide en bandas: dos textos con alguna banda idéntica
+son candidatos, y solo a esos se les calcula la similitud estimada.
+
+Los hashes son deterministas (crc32 y coeficientes con semilla fija) porque
+las firmas se guardan en la base de datos.
+"""
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+NUM_PERMUTATIONS = 60
+BANDS = 20
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 1 << 31, NUM_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, NUM_PERMUTATIONS).astype(np.uint64)
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+STOPWORDS = frozenset("""
+    al ante con de del desde el en entre es esta este hay la las lo los me mi
+    muy no para pero por que se sin su sus un una uno unos unas ya favor
+""".split())
+
+
+def normalize_tokens(text):
+    """Términos del texto sin acentos, en minúsculas y sin palabras vacías"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    tokens = set()
+    for token in TOKEN_PATTERN.findall(text):
+        if token in STOPWORDS or (len(token) < 3 and not token.isdigit()):
+            continue
+        # Plural simple: "tuberias" y "tuberia" cuentan como el mismo término
+        if len(token) > 4 and token.endswith('s'):
+            token = token[:-1]
+        tokens.add(token)
+    return tokens
+
+
+def signature(tokens):
+    """Firma MinHash (lista de enteros de 32 bits) o None si no hay términos"""
+    if not tokens:
+        return None
+    hashes = np.array([zlib.crc32(token.encode('utf-8')) for token in tokens], dtype=np.uint64)
+    permuted = (np.outer(hashes, _A) + _B) % MERSENNE_PRIME & MAX_HASH
+    return permuted.min(axis=0).astype(np.int64).tolist()
+
+
+def similarity(first, second):
+    """Similitud de Jaccard estimada entre dos firmas"""
+    return float(np.mean(np.asarray(first) == np.asarray(second)))
+
+
+def band_buckets(minhash, namespace=''):
+    """
+    Un bucket por banda (entero de 64 bits con signo). namespace separa los
+    buckets de grupos que no deben compararse entre sí.
+    """
+    buckets = []
+    for band in range(BANDS):
+        values = minhash[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        key = f'{namespace}:{band}:{",".join(map(str, values))}'.encode('utf-8')
+        digest = zlib.crc32(key) << 32 | zlib.adler32(key)
+        buckets.append(digest - (1 << 64) if digest >= 1 << 63 else digest)
+    return buckets
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(direction, obj):
+    """
+    Genera un cursor opaco a partir de (created_at, id) de un objeto.
+
+    Args:
+        direction: 'next' para avanzar o 'prev' para retroceder
+        obj: Instancia desde la cual continuar
+    """
+    payload = json.dumps([direction, obj.created_at.isoformat(), obj.pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decodifica un cursor generado por encode_cursor.
+
+    Returns:
+        tuple: (direction, created_at, pk) o None si el cursor no es válido
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if direction not in ('next', 'prev') or created_at is None:
+        return None
+    return direction, created_at, pk
+
+
+class CursorPage:
+    """Página obtenida con paginación por cursor (keyset)"""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = None
+        self.previous_cursor = None
+        if object_list and has_next:
+            self.next_cursor = encode_cursor('next', object_list[-1])
+        if object_list and has_previous:
+            self.previous_cursor = encode_cursor('prev', object_list[0])
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_by_cursor(queryset, token, per_page):
+    """
+    Pagina un queryset ordenado por (-created_at, -id) sin OFFSET ni COUNT.
+
+    Cada página filtra a partir de la última fila vista, por lo que el costo
+    no crece con la profundidad de la página.
+    """
+    cursor = decode_cursor(token)
+
+    if cursor is None:
+        rows = list(queryset.order_by('-created_at', '-id')[:per_page + 1])
+        return CursorPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=False)
+
+    direction, created_at, pk = cursor
+    if direction == 'next':
+        rows = list(queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        ).order_by('-created_at', '-id')[:per_page + 1])
+        return CursorPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=True)
+
+    rows = list(queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+    ).order_by('created_at', 'id')[:per_page + 1])
+    has_previous = len(rows) > per_page
+    rows = rows[:per_page]
+    rows.reverse()
+    return CursorPage(rows, has_next=True, has_previous=has_previous)
+
+
+def estimate_count(model):
+    """
+    Total aproximado de filas de una tabla sin recorrerla.
+
+    Usa las estadísticas de PostgreSQL (pg_class.reltuples); en otros
+    motores retorna None.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return row[0]
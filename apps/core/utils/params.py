@@ -0,0 +1,39 @@
+"""
+Lectura de parámetros numéricos de la URL (?lat=&lon=&radio=...).
+
+float() acepta 'nan' e 'inf', que luego se cuelan en los cálculos de
+distancia; aquí se rechazan junto con las coordenadas fuera de rango.
+"""
+import math
+
+
+def float_param(value, default=None):
+    """
+    Número de un parámetro GET; default si no se envió.
+
+    Raises:
+        ValueError: Si no es un número finito (NaN e infinito incluidos)
+    """
+    if value in (None, ''):
+        return default
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'Número no finito: {value}')
+    return number
+
+
+def coordinate_params(params, lat_key='lat', lon_key='lon'):
+    """
+    Coordenada (latitud, longitud) de los parámetros o None si falta alguna
+    o no es válida.
+    """
+    try:
+        latitude = float_param(params.get(lat_key))
+        longitude = float_param(params.get(lon_key))
+    except ValueError:
+        return None
+    if latitude is None or longitude is None:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reports'
-    verbose_name = 'Reportes y Estadísticas'
\ No newline at end of file
+    verbose_name = 'Reportes y Estadísticas'
+
+    def ready(self):
+        import apps.reports.signals
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core.utils.cache import invalidate_tags_on_commit
+from .models import CitizenSatisfaction
+
+
+@receiver(post_save, sender=CitizenSatisfaction)
+@receiver(post_delete, sender=CitizenSatisfaction)
+def invalidate_satisfaction_caches(sender, instance, **kwargs):
+    """Invalida los reportes de satisfacción en caché"""
+    invalidate_tags_on_commit('satisfaction')
@@ -1,3 +1,205 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.requests.models import ServiceRequest, ServiceType, ServiceArea, RequestDailyStat
+from .utils.statistics import ReportGenerator
+
+User = get_user_model()
+
+
+class ReportGeneratorTestMixin:
+    """Datos base para las pruebas de estadísticas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user(
+            username='ciudadano', password='municipal2024', role='CITIZEN'
+        )
+        cls.service_type = ServiceType.objects.create(name='Suministro de Agua')
+
+    def create_request(self, status='PENDING', resolution=None, **kwargs):
+        service_request = ServiceRequest.objects.create(
+            citizen=self.citizen,
+            service_type=kwargs.pop('service_type', self.service_type),
+            request_type='REPAIR',
+            title='Fuga de agua',
+            description='Tubería rota frente a la escuela',
+            address='Casco Urbano',
+            status=status,
+            **kwargs
+        )
+        if resolution is not None:
+            service_request.completed_at = service_request.created_at + resolution
+            service_request.save()
+        return service_request
+
+
+class GeneralStatisticsTests(ReportGeneratorTestMixin, TestCase):
+
+    def test_general_statistics_single_query(self):
+        self.create_request('PENDING')
+        self.create_request('IN_PROGRESS')
+        self.create_request('REJECTED')
+        self.create_request('COMPLETED', resolution=timedelta(days=2))
+        self.create_request('COMPLETED', resolution=timedelta(days=4))
+
+        for use_daily_stats in (True, False):
+            generator = ReportGenerator(use_daily_stats=use_daily_stats)
+            with self.assertNumQueries(1):
+                stats = generator.get_general_statistics()
+            self.assert_general_statistics(stats)
+
+    def assert_general_statistics(self, stats):
+        self.assertEqual(list(stats), [
+            'total_requests', 'pending', 'in_progress', 'completed', 'rejected',
+            'cancelled', 'average_completion_days', 'completion_rate',
+        ])
+        self.assertEqual(stats['total_requests'], 5)
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['in_progress'], 1)
+        self.assertEqual(stats['completed'], 2)
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['cancelled'], 0)
+        self.assertAlmostEqual(stats['average_completion_days'], 3)
+        self.assertAlmostEqual(stats['completion_rate'], 40)
+
+    def test_general_statistics_without_requests(self):
+        stats = ReportGenerator(use_daily_stats=True).get_general_statistics()
+
+        self.assertEqual(stats['total_requests'], 0)
+        self.assertEqual(stats['average_completion_days'], 0)
+        self.assertEqual(stats['completion_rate'], 0)
+
+
+class ResponseTimeTests(ReportGeneratorTestMixin, TestCase):
+
+    def test_response_time_percentiles_in_hours(self):
+        for hours in range(1, 11):
+            self.create_request('COMPLETED', resolution=timedelta(hours=hours), priority='HIGH')
+        self.create_request('PENDING')
+
+        response_times = ReportGenerator().get_response_times()
+
+        self.assertEqual(response_times['total_analyzed'], 10)
+        self.assertAlmostEqual(response_times['p50_hours'], 5.5)
+        self.assertAlmostEqual(response_times['p90_hours'], 9.1)
+        self.assertAlmostEqual(response_times['p99_hours'], 9.91)
+        self.assertAlmostEqual(response_times['average_hours'], 5.5)
+
+        by_priority = response_times['by_priority']
+        self.assertEqual(len(by_priority), 1)
+        self.assertEqual(by_priority[0]['label'], 'Alta')
+        self.assertEqual(by_priority[0]['total'], 10)
+        self.assertAlmostEqual(by_priority[0]['p50_hours'], 5.5)
+
+    def test_response_time_breakdown_by_service_type(self):
+        drainage = ServiceType.objects.create(name='Drenajes')
+        self.create_request('COMPLETED', resolution=timedelta(hours=2))
+        self.create_request('COMPLETED', resolution=timedelta(hours=4))
+        self.create_request('COMPLETED', resolution=timedelta(hours=30), service_type=drainage)
+
+        by_service_type = ReportGenerator().get_response_times()['by_service_type']
+
+        self.assertEqual(
+            [(row['label'], row['total']) for row in by_service_type],
+            [('Suministro de Agua', 2), ('Drenajes', 1)]
+        )
+        self.assertAlmostEqual(by_service_type[0]['p50_hours'], 3)
+        self.assertAlmostEqual(by_service_type[1]['p99_hours'], 30)
+        self.assertEqual(
+            ReportGenerator().get_response_times()['by_service_area'][0]['label'],
+            'Sin especificar'
+        )
+
+    def test_response_times_without_completed_requests(self):
+        self.create_request('PENDING')
+
+        self.assertIsNone(ReportGenerator().get_response_times())
+
+
+class DailyStatsReportTests(ReportGeneratorTestMixin, TestCase):
+
+    def setUp(self):
+        area = ServiceArea.objects.create(name='Casco Urbano: Barrio Rico')
+        self.create_request('PENDING', service_area=area, priority='HIGH')
+        self.create_request('IN_PROGRESS', service_area=area)
+        self.create_request('COMPLETED', resolution=timedelta(hours=5), priority='LOW')
+        self.create_request('COMPLETED', resolution=timedelta(hours=1), service_area=area)
+
+    def assert_same_report(self, method):
+        from_stats = list(getattr(ReportGenerator(use_daily_stats=True), method)())
+        from_requests = list(getattr(ReportGenerator(use_daily_stats=False), method)())
+        self.assertEqual(from_stats, from_requests)
+
+    def test_daily_stats_match_request_scan(self):
+        for method in ('get_requests_by_service_type', 'get_requests_by_area',
+                       'get_requests_by_priority', 'get_monthly_trend'):
+            with self.subTest(method=method):
+                self.assert_same_report(method)
+
+    def test_daily_stats_follow_status_changes(self):
+        service_request = ServiceRequest.objects.filter(status='PENDING').get()
+        service_request.status = 'COMPLETED'
+        service_request.completed_at = service_request.created_at + timedelta(hours=3)
+        service_request.save()
+        ServiceRequest.objects.filter(status='IN_PROGRESS').get().delete()
+
+        self.assert_same_report('get_requests_by_service_type')
+        self.assertEqual(
+            ReportGenerator(use_daily_stats=True).get_general_statistics(),
+            ReportGenerator(use_daily_stats=False).get_general_statistics()
+        )
+
+    def test_rebuild_command_restores_daily_stats(self):
+        expected = list(RequestDailyStat.objects.order_by('pk').values(
+            'day', 'service_type', 'service_area', 'priority', 'status', 'request_count'
+        ))
+        RequestDailyStat.objects.all().delete()
+        ServiceRequest.objects.update(priority='URGENT')
+
+        call_command('rebuild_request_stats', stdout=StringIO())
+
+        self.assertEqual(RequestDailyStat.objects.exclude(priority='URGENT').count(), 0)
+        self.assertEqual(
+            sum(row['request_count'] for row in expected),
+            RequestDailyStat.objects.aggregate(total=Sum('request_count'))['total']
+        )
+        self.assert_same_report('get_requests_by_priority')
+
+    def test_rows_without_area_are_unique(self):
+        stat = RequestDailyStat.objects.filter(service_area__isnull=True).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RequestDailyStat.objects.create(
+                day=stat.day, service_type_id=stat.service_type_id, service_area=None,
+                priority=stat.priority, status=stat.status, request_count=1,
+            )
+
+
+class DashboardCacheTests(ReportGeneratorTestMixin, TestCase):
+
+    def setUp(self):
+        self.create_request('PENDING')
+        manager = User.objects.create_user(username='encargado', role='MANAGER')
+        self.client.force_login(manager)
+        self.url = reverse('reports:dashboard')
+
+    def test_dashboard_data_cached_until_requests_change(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        # Solo sesión y usuario: las estadísticas salen de la caché
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response.context['general_stats']['total_requests'], 1)
+
+        self.create_request('PENDING')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['general_stats']['total_requests'], 2)
 
-# Create your tests here.
@@ -0,0 +1,91 @@
+from itertools import groupby
+from math import floor, ceil
+
+from django.db import connection
+from django.db.models import Aggregate, Count, Func, FloatField
+
+
+class PercentileCont(Aggregate):
+    """Percentil continuo nativo (PostgreSQL: PERCENTILE_CONT ... WITHIN GROUP)"""
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+class EpochHours(Func):
+    """Convierte un intervalo de PostgreSQL a horas"""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s) / 3600.0'
+    output_field = FloatField()
+
+
+def supports_native_percentiles():
+    """Indica si la base de datos actual tiene PERCENTILE_CONT"""
+    return connection.vendor == 'postgresql'
+
+
+def interpolate(lower, upper, fraction):
+    """Interpolación lineal equivalente a PERCENTILE_CONT"""
+    if upper is None or fraction == 0:
+        return lower
+    return lower + (upper - lower) * fraction
+
+
+def stream_percentiles(queryset, group_field, value_field, percentiles):
+    """
+    Calcula percentiles recorriendo los valores ordenados en la base de datos.
+
+    Primero obtiene el total de filas por grupo y luego itera los valores
+    ordenados por (grupo, valor) conservando solo las posiciones necesarias,
+    de modo que la memoria usada no depende del tamaño del rango.
+
+    Returns:
+        dict: {grupo: {'total': n, 'average': promedio, percentil: valor, ...}}
+    """
+    group_fields = [group_field] if group_field else []
+
+    if group_field:
+        counts = dict(
+            queryset.order_by().values_list(group_field).annotate(total=Count('pk'))
+        )
+    else:
+        counts = {None: queryset.order_by().count()}
+
+    rows = queryset.order_by(*group_fields, value_field).values_list(
+        *group_fields, value_field
+    ).iterator(chunk_size=2000)
+
+    if group_field:
+        grouped = groupby(rows, key=lambda row: row[0])
+    else:
+        grouped = [(None, rows)]
+
+    results = {}
+    for group, group_rows in grouped:
+        total = counts.get(group, 0)
+        if not total:
+            continue
+
+        # Posiciones (inferior, superior) que necesita cada percentil
+        positions = {}
+        for percentile in percentiles:
+            position = percentile * (total - 1)
+            positions[percentile] = (floor(position), ceil(position), position - floor(position))
+        wanted = {index for lower, upper, _ in positions.values() for index in (lower, upper)}
+
+        values = {}
+        running_sum = None
+        for index, row in enumerate(group_rows):
+            value = row[-1]
+            running_sum = value if running_sum is None else running_sum + value
+            if index in wanted:
+                values[index] = value
+
+        results[group] = {'total': total, 'average': running_sum / total}
+        for percentile, (lower, upper, fraction) in positions.items():
+            results[group][percentile] = interpolate(values[lower], values.get(upper), fraction)
+
+    return results
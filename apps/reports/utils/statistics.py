@@ -1,70 +1,118 @@
-from django.db.models import Count, Avg, Q, Sum, F
+from django.conf import settings
+from django.db.models import Count, Avg, Q, Sum, F, ExpressionWrapper, DurationField
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
 from django.utils import timezone
 from datetime import timedelta
-from apps.requests.models import ServiceRequest, ServiceType, ServiceArea
+from apps.requests.models import ServiceRequest, ServiceType, ServiceArea, RequestDailyStat
 from apps.assignments.models import TaskAssignment
 from apps.reports.models import CitizenSatisfaction
+from .percentiles import PercentileCont, EpochHours, supports_native_percentiles, stream_percentiles
 
 
 class ReportGenerator:
     """Clase para generar estadísticas y reportes"""
 
-    def __init__(self, date_from=None, date_to=None):
+    RESPONSE_TIME_PERCENTILES = (0.5, 0.9, 0.99)
+
+    RESPONSE_TIME_BREAKDOWNS = {
+        'by_service_type': 'service_type__name',
+        'by_service_area': 'service_area__name',
+        'by_priority': 'priority',
+    }
+
+    def __init__(self, date_from=None, date_to=None, use_daily_stats=None):
         self.date_from = date_from or (timezone.now() - timedelta(days=30)).date()
         self.date_to = date_to or timezone.now().date()
-
-    def get_general_statistics(self):
-        """Estadísticas generales del sistema"""
-        requests = ServiceRequest.objects.filter(
+        if use_daily_stats is None:
+            use_daily_stats = getattr(settings, 'REPORTS_USE_DAILY_STATS', True)
+        self.use_daily_stats = use_daily_stats
+
+    def _requests(self):
+        """
+        Solicitudes del período. Con el resumen diario activo se leen filas
+        de RequestDailyStat (una por día y combinación) en lugar de solicitudes.
+        """
+        if self.use_daily_stats:
+            return RequestDailyStat.objects.filter(
+                day__gte=self.date_from,
+                day__lte=self.date_to
+            )
+        return ServiceRequest.objects.filter(
             created_at__date__gte=self.date_from,
             created_at__date__lte=self.date_to
         )
 
-        return {
-            'total_requests': requests.count(),
-            'pending': requests.filter(status='PENDING').count(),
-            'in_progress': requests.filter(status='IN_PROGRESS').count(),
-            'completed': requests.filter(status='COMPLETED').count(),
-            'rejected': requests.filter(status='REJECTED').count(),
-            'cancelled': requests.filter(status='CANCELLED').count(),
-            'average_completion_days': self._calculate_avg_completion_time(requests),
-            'completion_rate': self._calculate_completion_rate(requests),
+    def _count(self, **filters):
+        """Conteo de solicitudes compatible con ambas fuentes"""
+        condition = Q(**filters) if filters else None
+        if self.use_daily_stats:
+            return Coalesce(Sum('request_count', filter=condition), 0)
+        return Count('id', filter=condition)
+
+    @property
+    def _date_field(self):
+        return 'day' if self.use_daily_stats else 'created_at'
+
+    def get_general_statistics(self):
+        """Estadísticas generales del sistema (una sola consulta agregada)"""
+        aggregates = {
+            'total_requests': self._count(),
+            'pending': self._count(status='PENDING'),
+            'in_progress': self._count(status='IN_PROGRESS'),
+            'completed': self._count(status='COMPLETED'),
+            'rejected': self._count(status='REJECTED'),
+            'cancelled': self._count(status='CANCELLED'),
         }
+        if self.use_daily_stats:
+            aggregates['resolution_seconds'] = Sum('resolution_seconds', filter=Q(status='COMPLETED'))
+            aggregates['resolved'] = Sum('resolved_count', filter=Q(status='COMPLETED'))
+        else:
+            aggregates['avg_completion'] = Avg(
+                ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField()),
+                filter=Q(status='COMPLETED', completed_at__isnull=False)
+            )
+
+        totals = self._requests().aggregate(**aggregates)
+
+        if self.use_daily_stats:
+            resolution_seconds = totals.pop('resolution_seconds')
+            resolved = totals.pop('resolved')
+            avg_completion = timedelta(seconds=resolution_seconds / resolved) if resolved else None
+        else:
+            avg_completion = totals.pop('avg_completion')
+
+        totals['average_completion_days'] = self._duration_to_days(avg_completion)
+        totals['completion_rate'] = self._calculate_completion_rate(
+            totals['total_requests'], totals['completed']
+        )
+        return totals
 
     def get_requests_by_service_type(self):
         """Solicitudes agrupadas por tipo de servicio"""
-        return ServiceRequest.objects.filter(
-            created_at__date__gte=self.date_from,
-            created_at__date__lte=self.date_to
-        ).values(
+        return self._requests().values(
             'service_type__name'
         ).annotate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(status='COMPLETED')),
-            pending=Count('id', filter=Q(status='PENDING')),
-            in_progress=Count('id', filter=Q(status='IN_PROGRESS'))
+            total=self._count(),
+            completed=self._count(status='COMPLETED'),
+            pending=self._count(status='PENDING'),
+            in_progress=self._count(status='IN_PROGRESS')
         ).order_by('-total')
 
     def get_requests_by_area(self):
         """Solicitudes agrupadas por área"""
-        return ServiceRequest.objects.filter(
-            created_at__date__gte=self.date_from,
-            created_at__date__lte=self.date_to,
+        return self._requests().filter(
             service_area__isnull=False
         ).values(
             'service_area__name'
         ).annotate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(status='COMPLETED'))
+            total=self._count(),
+            completed=self._count(status='COMPLETED')
         ).order_by('-total')
 
     def get_requests_by_priority(self):
         """Solicitudes agrupadas por prioridad"""
-        return ServiceRequest.objects.filter(
-            created_at__date__gte=self.date_from,
-            created_at__date__lte=self.date_to
-        ).values('priority').annotate(
-            total=Count('id')
+        return self._requests().values('priority').annotate(
+            total=self._count()
         ).order_by('priority')
 
     def get_technician_performance(self):
@@ -107,23 +155,21 @@ class ReportGenerator:
 
     def get_monthly_trend(self):
         """Tendencia mensual de solicitudes"""
-        from django.db.models.functions import ExtractMonth, ExtractYear
-
-        requests = ServiceRequest.objects.filter(
-            created_at__date__gte=self.date_from,
-            created_at__date__lte=self.date_to
-        ).annotate(
-            month=ExtractMonth('created_at'),
-            year=ExtractYear('created_at')
+        requests = self._requests().annotate(
+            month=ExtractMonth(self._date_field),
+            year=ExtractYear(self._date_field)
         ).values('month', 'year').annotate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(status='COMPLETED'))
+            total=self._count(),
+            completed=self._count(status='COMPLETED')
         ).order_by('year', 'month')
 
         return list(requests)
 
     def get_response_times(self):
-        """Tiempos de respuesta promedio"""
+        """
+        Percentiles (p50/p90/p99) del tiempo de resolución en horas,
+        general y desglosados por tipo de servicio, área y prioridad.
+        """
         completed_requests = ServiceRequest.objects.filter(
             created_at__date__gte=self.date_from,
             created_at__date__lte=self.date_to,
@@ -131,39 +177,102 @@ class ReportGenerator:
             completed_at__isnull=False
         )
 
-        times = []
-        for req in completed_requests:
-            delta = req.completed_at - req.created_at
-            times.append(delta.days)
-
-        if times:
-            return {
-                'average_days': sum(times) / len(times),
-                'min_days': min(times),
-                'max_days': max(times),
-                'total_analyzed': len(times)
+        if supports_native_percentiles():
+            compute = self._native_response_times
+        else:
+            compute = self._streamed_response_times
+
+        overall = compute(completed_requests, None)
+        if not overall:
+            return None
+
+        response_times = overall[0]
+        response_times['total_analyzed'] = response_times.pop('total')
+        for key, group_field in self.RESPONSE_TIME_BREAKDOWNS.items():
+            response_times[key] = compute(completed_requests, group_field)
+        return response_times
+
+    def _native_response_times(self, queryset, group_field):
+        """Percentiles calculados con PERCENTILE_CONT en la base de datos"""
+        hours = EpochHours(F('completed_at') - F('created_at'))
+        aggregates = {
+            'total': Count('id'),
+            'average_hours': Avg(hours),
+        }
+        for percentile in self.RESPONSE_TIME_PERCENTILES:
+            aggregates[self._percentile_key(percentile)] = PercentileCont(hours, percentile)
+
+        if group_field is None:
+            row = queryset.aggregate(**aggregates)
+            return [self._response_time_row(None, row)] if row['total'] else []
+
+        rows = queryset.values(group_field).annotate(**aggregates).order_by('-total')
+        return [self._response_time_row(group_field, row) for row in rows]
+
+    def _streamed_response_times(self, queryset, group_field):
+        """Percentiles calculados recorriendo los valores ordenados (SQLite)"""
+        queryset = queryset.annotate(
+            resolution=ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField())
+        )
+        groups = stream_percentiles(
+            queryset, group_field, 'resolution', self.RESPONSE_TIME_PERCENTILES
+        )
+
+        rows = []
+        for group, values in groups.items():
+            row = {
+                'total': values['total'],
+                'average_hours': self._duration_to_hours(values['average']),
             }
-        return None
+            if group_field:
+                row[group_field] = group
+            for percentile in self.RESPONSE_TIME_PERCENTILES:
+                row[self._percentile_key(percentile)] = self._duration_to_hours(values[percentile])
+            rows.append(self._response_time_row(group_field, row))
+
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows
+
+    def _response_time_row(self, group_field, row):
+        """Normaliza una fila de percentiles para los templates"""
+        result = {
+            'total': row['total'],
+            'average_hours': row['average_hours'],
+        }
+        for percentile in self.RESPONSE_TIME_PERCENTILES:
+            key = self._percentile_key(percentile)
+            result[key] = row[key]
 
-    def _calculate_avg_completion_time(self, requests):
-        """Calcula el tiempo promedio de finalización"""
-        completed = requests.filter(status='COMPLETED', completed_at__isnull=False)
-        if not completed.exists():
-            return 0
+        if group_field == 'priority':
+            priorities = dict(ServiceRequest.PRIORITY_CHOICES)
+            result['label'] = priorities.get(row['priority'], row['priority'])
+        elif group_field:
+            result['label'] = row[group_field] or 'Sin especificar'
+        return result
+
+    @staticmethod
+    def _percentile_key(percentile):
+        return f'p{round(percentile * 100)}_hours'
 
-        total_days = 0
-        for req in completed:
-            delta = req.completed_at - req.created_at
-            total_days += delta.days
+    @staticmethod
+    def _duration_to_hours(duration):
+        """Convierte un timedelta a horas"""
+        if not duration:
+            return 0
+        return duration.total_seconds() / 3600
 
-        return total_days / completed.count()
+    @staticmethod
+    def _duration_to_days(duration):
+        """Convierte un timedelta agregado por la base de datos a días"""
+        if not duration:
+            return 0
+        return duration.total_seconds() / 86400
 
-    def _calculate_completion_rate(self, requests):
+    @staticmethod
+    def _calculate_completion_rate(total, completed):
         """Calcula la tasa de finalización"""
-        total = requests.count()
         if total == 0:
             return 0
-        completed = requests.filter(status='COMPLETED').count()
         return (completed / total) * 100
 
 
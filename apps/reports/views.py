@@ -14,6 +14,7 @@ from .forms import ReportFilterForm, SatisfactionSurveyForm
 from .utils.statistics import ReportGenerator, ChartDataGenerator
 from apps.requests.models import ServiceRequest
 from apps.authentication.decorators import role_required
+from apps.core.utils.cache import get_policy
 
 class DashboardReportsView(LoginRequiredMixin, TemplateView):
     """Dashboard principal de reportes"""
@@ -30,45 +31,50 @@ class DashboardReportsView(LoginRequiredMixin, TemplateView):
         # Último mes por defecto
         date_to = timezone.now().date()
         date_from = date_to - timedelta(days=30)
+
+        # Mismos datos para todos los roles con acceso; se invalidan al
+        # cambiar solicitudes, asignaciones o evaluaciones
+        context.update(get_policy('reports.dashboard').get_or_set(
+            lambda: self.build_dashboard(date_from, date_to), date_from
+        ))
+        
+        context['date_from'] = date_from
+        context['date_to'] = date_to
+        context['form'] = ReportFilterForm()
         
+        return context
+
+    def build_dashboard(self, date_from, date_to):
+        """Estadísticas y datos de gráficos del dashboard"""
         generator = ReportGenerator(date_from, date_to)
         chart_generator = ChartDataGenerator()
         
-        # Estadísticas generales
-        context['general_stats'] = generator.get_general_statistics()
-        
-        # Datos para gráficos
         by_service = generator.get_requests_by_service_type()
-        context['service_chart_data'] = json.dumps(
-            chart_generator.prepare_pie_chart_data(by_service, 'service_type__name')
-        )
-        
         by_area = generator.get_requests_by_area()
-        context['area_chart_data'] = json.dumps(
-            chart_generator.prepare_bar_chart_data(
-                by_area, 
-                'service_area__name', 
-                ['total', 'completed']
-            )
-        )
-        
-        # Rendimiento de técnicos
-        context['technician_performance'] = generator.get_technician_performance()
-        
-        # Satisfacción ciudadana
-        context['satisfaction_stats'] = generator.get_satisfaction_statistics()
-        
-        # Tendencia mensual
         monthly_trend = generator.get_monthly_trend()
-        context['monthly_trend_data'] = json.dumps(
-            chart_generator.prepare_line_chart_data(monthly_trend, 'month', 'total')
-        )
-        
-        context['date_from'] = date_from
-        context['date_to'] = date_to
-        context['form'] = ReportFilterForm()
-        
-        return context
+        return {
+            # Estadísticas generales
+            'general_stats': generator.get_general_statistics(),
+            # Datos para gráficos
+            'service_chart_data': json.dumps(
+                chart_generator.prepare_pie_chart_data(by_service, 'service_type__name')
+            ),
+            'area_chart_data': json.dumps(
+                chart_generator.prepare_bar_chart_data(
+                    by_area, 
+                    'service_area__name', 
+                    ['total', 'completed']
+                )
+            ),
+            # Rendimiento de técnicos
+            'technician_performance': list(generator.get_technician_performance()),
+            # Satisfacción ciudadana
+            'satisfaction_stats': generator.get_satisfaction_statistics(),
+            # Tendencia mensual
+            'monthly_trend_data': json.dumps(
+                chart_generator.prepare_line_chart_data(monthly_trend, 'month', 'total')
+            ),
+        }
 
 @login_required
 @role_required(['ADMIN', 'AUTHORITY', 'MANAGER'])
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import ServiceType, ServiceArea, ServiceRequest, RequestImage, RequestComment, RequestStatusHistory
+from .models import ServiceType, ServiceArea, ServiceRequest, RequestImage, RequestComment, RequestStatusHistory, RequestDailyStat, RequestStatusCounter, EmailOutbox, RequestMerge
+from .lookups import LookupChoiceField
 
 @admin.register(ServiceType)
 class ServiceTypeAdmin(admin.ModelAdmin):
@@ -14,6 +15,7 @@ class ServiceAreaAdmin(admin.ModelAdmin):
     list_filter = ['is_active']
     search_fields = ['name', 'description']
     list_editable = ['is_active']
+    filter_horizontal = ['managers']
 
 class RequestImageInline(admin.TabularInline):
     model = RequestImage
@@ -76,6 +78,12 @@ class ServiceRequestAdmin(admin.ModelAdmin):
     
     inlines = [RequestImageInline, RequestCommentInline, RequestStatusHistoryInline]
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Catálogos desde la copia en memoria (incluye los inactivos)
+        if db_field.name in ('service_type', 'service_area'):
+            kwargs.update(form_class=LookupChoiceField, active_only=False)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 @admin.register(RequestImage)
 class RequestImageAdmin(admin.ModelAdmin):
     list_display = ['request', 'description', 'is_before', 'uploaded_by', 'uploaded_at']
@@ -95,4 +103,29 @@ class RequestStatusHistoryAdmin(admin.ModelAdmin):
     list_display = ['request', 'from_status', 'to_status', 'changed_by', 'created_at']
     list_filter = ['from_status', 'to_status', 'created_at']
     search_fields = ['request__ticket_number', 'reason']
-    readonly_fields = ['request', 'from_status', 'to_status', 'changed_by', 'created_at']
\ No newline at end of file
+    readonly_fields = ['request', 'from_status', 'to_status', 'changed_by', 'created_at']
+
+@admin.register(RequestDailyStat)
+class RequestDailyStatAdmin(admin.ModelAdmin):
+    list_display = ['day', 'service_type', 'service_area', 'priority', 'status', 'request_count', 'resolved_count']
+    list_filter = ['status', 'priority', 'service_type', 'day']
+    readonly_fields = ['day', 'service_type', 'service_area', 'priority', 'status', 'request_count', 'resolved_count', 'resolution_seconds']
+
+@admin.register(RequestStatusCounter)
+class RequestStatusCounterAdmin(admin.ModelAdmin):
+    list_display = ['key', 'pending', 'in_progress', 'completed', 'overdue', 'overdue_date']
+    search_fields = ['key']
+    readonly_fields = ['key', 'pending', 'in_review', 'approved', 'in_progress', 'completed', 'rejected', 'cancelled', 'overdue', 'overdue_date', 'version']
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['recipient', 'subject', 'dedupe_key']
+    readonly_fields = ['related_request', 'dedupe_key', 'attempts', 'last_error', 'created_at', 'sent_at']
+
+@admin.register(RequestMerge)
+class RequestMergeAdmin(admin.ModelAdmin):
+    list_display = ['duplicate', 'survivor', 'merged_by', 'merged_at']
+    search_fields = ['duplicate__ticket_number', 'survivor__ticket_number']
+    readonly_fields = ['duplicate', 'survivor', 'merged_by', 'merged_at']
@@ -0,0 +1,132 @@
+"""
+Detección y fusión de solicitudes duplicadas.
+
+Los candidatos salen del índice LSH (RequestSignatureBand): solo solicitudes
+abiertas del mismo tipo de servicio que comparten al menos una banda de la
+firma MinHash de título + descripción. A esos se les estima la similitud y
+se filtran por cercanía (coordenadas o, si faltan, área).
+"""
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Count
+
+from apps.core.utils import minhash
+from .models import (
+    ServiceRequest, RequestSignature, RequestSignatureBand, RequestComment, RequestImage,
+    RequestStatusHistory, RequestMerge,
+)
+from .nearby import haversine_km
+
+DUPLICATE_SIMILARITY = 0.5
+DUPLICATE_RADIUS_KM = 0.5
+MAX_CANDIDATES = 50
+
+
+@dataclass
+class DuplicateCandidate:
+    request: ServiceRequest
+    similarity: float
+    distance_km: float = None
+
+
+def find_duplicates(service_request, limit=5):
+    """
+    Posibles duplicados abiertos de una solicitud (guardada o no), de mayor
+    a menor similitud.
+    """
+    values = minhash.signature(minhash.normalize_tokens(RequestSignature.text_of(service_request)))
+    if values is None:
+        return []
+
+    buckets = minhash.band_buckets(values, RequestSignature.namespace_of(service_request.service_type_id))
+    matches = RequestSignatureBand.objects.filter(bucket__in=buckets)
+    if service_request.pk:
+        matches = matches.exclude(signature_id=service_request.pk)
+    candidate_ids = list(
+        matches.values('signature_id').annotate(hits=Count('id'))
+        .order_by('-hits').values_list('signature_id', flat=True)[:MAX_CANDIDATES]
+    )
+    if not candidate_ids:
+        return []
+
+    signatures = RequestSignature.objects.filter(
+        pk__in=candidate_ids, request__status__in=RequestSignature.INDEXED_STATUSES
+    ).select_related('request__service_type')
+
+    duplicates = []
+    for signature in signatures:
+        similarity = minhash.similarity(values, signature.minhash)
+        if similarity < DUPLICATE_SIMILARITY:
+            continue
+        distance = _distance_km(service_request, signature.request)
+        if distance is None:
+            if (service_request.service_area_id and signature.request.service_area_id
+                    and service_request.service_area_id != signature.request.service_area_id):
+                continue
+        elif distance > DUPLICATE_RADIUS_KM:
+            continue
+        duplicates.append(DuplicateCandidate(signature.request, similarity, distance))
+
+    duplicates.sort(key=lambda candidate: (-candidate.similarity, candidate.request.created_at))
+    return duplicates[:limit]
+
+
+def _distance_km(first, second):
+    if None in (first.latitude, first.longitude, second.latitude, second.longitude):
+        return None
+    return float(haversine_km(
+        float(first.latitude), float(first.longitude),
+        float(second.latitude), float(second.longitude),
+    ))
+
+
+def merge_requests(duplicate, survivor, user):
+    """
+    Fusiona duplicate en survivor: mueve comentarios, imágenes e historial,
+    cancela el duplicado y deja registro de la fusión.
+
+    Raises:
+        ValueError: Si la fusión no es válida (mensaje para el usuario)
+    """
+    if duplicate.pk == survivor.pk:
+        raise ValueError('No se puede fusionar una solicitud consigo misma.')
+
+    with transaction.atomic():
+        # Bloqueo en orden de pk para no cruzarse con una fusión inversa
+        locked = {
+            service_request.pk: service_request
+            for service_request in ServiceRequest.objects.select_for_update().filter(
+                pk__in=[duplicate.pk, survivor.pk]
+            ).order_by('pk')
+        }
+        duplicate, survivor = locked[duplicate.pk], locked[survivor.pk]
+
+        if duplicate.status not in RequestSignature.INDEXED_STATUSES:
+            raise ValueError(f'La solicitud {duplicate.ticket_number} ya no está abierta.')
+        if survivor.status not in RequestSignature.INDEXED_STATUSES:
+            raise ValueError(f'La solicitud {survivor.ticket_number} ya no está abierta.')
+        assignment = getattr(duplicate, 'assignment', None)
+        if assignment is not None and assignment.status not in ['COMPLETED', 'CANCELLED']:
+            raise ValueError(
+                f'La solicitud {duplicate.ticket_number} tiene una tarea activa; cancélela antes de fusionar.'
+            )
+
+        RequestComment.objects.filter(request=duplicate).update(request=survivor)
+        RequestImage.objects.filter(request=duplicate).update(request=survivor)
+        RequestStatusHistory.objects.filter(request=duplicate).update(request=survivor)
+        RequestMerge.objects.create(duplicate=duplicate, survivor=survivor, merged_by=user)
+
+        RequestComment.objects.create(
+            request=survivor,
+            user=user,
+            comment=f'Se fusionó la solicitud duplicada {duplicate.ticket_number}: {duplicate.title}',
+        )
+
+        # La señal create_status_history registra el cambio con este autor y motivo
+        duplicate.status = 'CANCELLED'
+        duplicate._status_changed_by = user
+        duplicate._status_change_reason = f'Duplicada de {survivor.ticket_number}'
+        duplicate.save(update_fields=['status', 'updated_at'])
+
+    return survivor
@@ -3,17 +3,21 @@ from django.forms import inlineformset_factory
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, HTML, Field, Div
 from .models import ServiceRequest, RequestImage, RequestComment, ServiceType, ServiceArea
+from .lookups import LookupChoiceField
 
 
 class ServiceRequestForm(forms.ModelForm):
     """Formulario para crear solicitudes de servicio"""
 
+    # Se marca al volver a enviar después de ver los posibles duplicados
+    ignore_duplicates = forms.BooleanField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = ServiceRequest
         fields = [
             'service_type', 'service_area', 'request_type', 'title',
             'description', 'address', 'priority', 'citizen_phone',
-            'citizen_email', 'notes'
+            'citizen_email', 'notes', 'latitude', 'longitude'
         ]
 
         widgets = {
@@ -48,6 +52,14 @@ class ServiceRequestForm(forms.ModelForm):
                 'placeholder': 'Información adicional (opcional)',
                 'rows': 2
             }),
+            'latitude': forms.HiddenInput(),
+            'longitude': forms.HiddenInput(),
+        }
+
+        # Solo tipos de servicio y áreas activos, desde la copia en memoria
+        field_classes = {
+            'service_type': LookupChoiceField,
+            'service_area': LookupChoiceField,
         }
 
         labels = {
@@ -72,10 +84,6 @@ class ServiceRequestForm(forms.ModelForm):
             self.fields['citizen_phone'].initial = self.user.phone
             self.fields['citizen_email'].initial = self.user.email
 
-        # Filtrar solo tipos de servicios activos
-        self.fields['service_type'].queryset = ServiceType.objects.filter(is_active=True)
-        self.fields['service_area'].queryset = ServiceArea.objects.filter(is_active=True)
-
         # Configurar Crispy Forms
         self.helper = FormHelper()
         self.helper.layout = Layout(
@@ -95,6 +103,13 @@ class ServiceRequestForm(forms.ModelForm):
                 Column('citizen_email', css_class='col-md-6'),
             ),
             'notes',
+            'latitude',
+            'longitude',
+            'ignore_duplicates',
+            HTML(
+                '<button type="button" class="btn btn-outline-secondary btn-sm" id="btn-ubicacion">'
+                '<i class="bi bi-geo-alt"></i> Usar mi ubicación actual</button> '
+                '<small class="text-muted" id="ubicacion-estado"></small>'),
             HTML('<div class="alert alert-info mt-3">'),
             HTML(
                 '<i class="bi bi-info-circle"></i> <strong>Importante:</strong> Después de crear la solicitud podrás subir fotografías como evidencia.'),
@@ -311,16 +326,16 @@ class RequestSearchForm(forms.Form):
         label='Estado'
     )
 
-    service_type = forms.ModelChoiceField(
-        queryset=ServiceType.objects.filter(is_active=True),
+    service_type = LookupChoiceField(
+        queryset=ServiceType.objects.all(),
         required=False,
         empty_label='Todos los servicios',
         widget=forms.Select(attrs={'class': 'form-control'}),
         label='Tipo de Servicio'
     )
 
-    service_area = forms.ModelChoiceField(
-        queryset=ServiceArea.objects.filter(is_active=True),
+    service_area = LookupChoiceField(
+        queryset=ServiceArea.objects.all(),
         required=False,
         empty_label='Todas las áreas',
         widget=forms.Select(attrs={'class': 'form-control'}),
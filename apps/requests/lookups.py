@@ -0,0 +1,96 @@
+"""
+Catálogos de tipos de servicio y áreas.
+
+Son tablas pequeñas que casi no cambian y se usan en cada formulario, así
+que cada proceso guarda una copia en memoria junto con la versión de la
+etiqueta 'lookups' (política 'lookups' en CACHE_POLICIES). Antes de usarla
+solo se consulta esa versión en la caché compartida; las señales de
+ServiceType y ServiceArea la cambian y entonces cada worker recarga la tabla
+(primero desde la caché compartida, luego desde la base de datos).
+"""
+import copy
+
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceField, ModelChoiceIterator
+
+from apps.core.utils.cache import get_policy
+from .models import ServiceType, ServiceArea
+
+
+class LookupTable:
+    """Copia en memoria del proceso de una tabla de catálogo"""
+
+    def __init__(self, model):
+        self.model = model
+        # (versión, filas): se reemplaza completo, sin bloqueos
+        self._state = (None, None)
+
+    def all(self):
+        policy = get_policy('lookups')
+        version = policy.version()
+        if version is None:
+            return list(self.model.objects.all())
+
+        loaded_version, rows = self._state
+        if rows is None or loaded_version != version:
+            rows = policy.get_or_set(lambda: list(self.model.objects.all()), self.model._meta.label_lower)
+            self._state = (version, rows)
+        return rows
+
+    def active(self):
+        return [row for row in self.all() if row.is_active]
+
+
+service_types = LookupTable(ServiceType)
+service_areas = LookupTable(ServiceArea)
+
+LOOKUP_TABLES = {ServiceType: service_types, ServiceArea: service_areas}
+
+
+class LookupChoiceIterator(ModelChoiceIterator):
+    """Opciones desde la copia en memoria en lugar del queryset"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for row in self.field.rows():
+            yield self.choice(row)
+
+    def __len__(self):
+        return len(self.field.rows()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.rows())
+
+
+class LookupChoiceField(ModelChoiceField):
+    """
+    ModelChoiceField de un catálogo que arma las opciones y valida el valor
+    enviado con la copia en memoria, sin consultas.
+
+    Args:
+        queryset: Queryset del modelo (solo se usa para saber la tabla)
+        active_only: Ofrecer solo los registros activos
+    """
+    iterator = LookupChoiceIterator
+
+    def __init__(self, queryset, *, active_only=True, **kwargs):
+        self.table = LOOKUP_TABLES[queryset.model]
+        self.active_only = active_only
+        super().__init__(queryset, **kwargs)
+
+    def rows(self):
+        return self.table.active() if self.active_only else self.table.all()
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.table.model):
+            value = value.pk
+        for row in self.rows():
+            if str(row.pk) == str(value):
+                # La fila es compartida por el proceso: quien la reciba puede modificarla
+                return copy.copy(row)
+        raise ValidationError(
+            self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value}
+        )
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from apps.assignments.models import TaskAssignment
+from apps.assignments.views import TaskAssignmentListView
+from apps.requests.models import ServiceRequest, ServiceType
+from apps.requests.views import ServiceRequestListView
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Mide el renderizado de los listados con la caché de filas fría y caliente (no guarda cambios)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200], help='Filas por página')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.cache = caches[settings.FRAGMENT_CACHE_ALIAS]
+        self.factory = RequestFactory()
+        rows = max(options['sizes'])
+
+        with transaction.atomic():
+            citizen = User.objects.create_user(username='benchmark_listados', role='CITIZEN')
+            manager = User.objects.create_user(
+                username='benchmark_encargado', role='MANAGER', first_name='Ana', last_name='López'
+            )
+            technician = User.objects.create_user(
+                username='benchmark_tecnico', role='TECHNICIAN', first_name='Juan', last_name='Pérez'
+            )
+            service_type = ServiceType.objects.create(name='Benchmark')
+            requests = [
+                ServiceRequest.objects.create(
+                    citizen=citizen,
+                    service_type=service_type,
+                    request_type='REPAIR',
+                    title=f'Solicitud sintética {index}',
+                    description='Benchmark de renderizado de listados',
+                    address='Casco Urbano',
+                    expected_completion=timezone.localdate(),
+                )
+                for index in range(rows)
+            ]
+            TaskAssignment.objects.bulk_create([
+                TaskAssignment(
+                    request=service_request, assigned_by=manager, assigned_to=technician,
+                    instructions='Revisar y reparar', estimated_hours=2,
+                )
+                for service_request in requests
+            ])
+
+            self.stdout.write(f"Caché de filas: {self.cache.__class__.__name__} ({settings.FRAGMENT_CACHE_ALIAS})\n")
+            listings = [
+                ('Solicitudes', ServiceRequestListView, manager, self._touch_request),
+                ('Asignaciones', TaskAssignmentListView, technician, self._touch_assignment),
+            ]
+            for label, view_class, user, touch in listings:
+                self.stdout.write(label)
+                for size in sorted(options['sizes']):
+                    view = view_class.as_view(paginate_by=size)
+                    cold = self._measure(view, user, options['repeat'], clear=True)
+                    warm = self._measure(view, user, options['repeat'])
+                    changed = self._measure(view, user, options['repeat'], before=touch)
+                    self.stdout.write(
+                        f"  {size:4} filas   fría: {cold * 1000:8.1f} ms   caliente: {warm * 1000:8.1f} ms   "
+                        f"1 fila modificada: {changed * 1000:8.1f} ms"
+                    )
+
+            transaction.set_rollback(True)
+
+        self.cache.clear()
+        self.stdout.write(self.style.SUCCESS('\nBenchmark completado (datos descartados)'))
+
+    def _render(self, view, user):
+        request = self.factory.get('/')
+        request.user = user
+        response = view(request)
+        response.render()
+        return response
+
+    def _measure(self, view, user, repeat, clear=False, before=None):
+        # Una pasada previa para que la caché quede caliente
+        self._render(view, user)
+        times = []
+        for _ in range(repeat):
+            if clear:
+                self.cache.clear()
+            if before:
+                before()
+            start = time.perf_counter()
+            self._render(view, user)
+            times.append(time.perf_counter() - start)
+        return np.median(times)
+
+    @staticmethod
+    def _touch_request():
+        ServiceRequest.objects.filter(service_type__name='Benchmark').latest('created_at').save()
+
+    @staticmethod
+    def _touch_assignment():
+        TaskAssignment.objects.filter(request__service_type__name='Benchmark').latest('assigned_at').save()
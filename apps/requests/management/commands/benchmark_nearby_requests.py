@@ -0,0 +1,116 @@
+import random
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from apps.core.utils import geohash
+from apps.requests.models import ServiceRequest, ServiceType, GEOHASH_PRECISION
+from apps.requests.nearby import OPEN_STATUSES, haversine_km, nearby_requests
+
+User = get_user_model()
+
+STATUSES = OPEN_STATUSES + ['COMPLETED', 'CANCELLED']
+
+
+class Command(BaseCommand):
+    help = 'Compara la búsqueda de solicitudes cercanas por geohash contra un recorrido completo (no guarda cambios)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=1000000, help='Solicitudes sintéticas a crear')
+        parser.add_argument('--queries', type=int, default=50, help='Consultas por geohash a medir')
+        parser.add_argument('--scans', type=int, default=3, help='Consultas por recorrido completo a medir')
+        parser.add_argument('--radius', type=float, default=1.0, help='Radio en km')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        radius = options['radius']
+
+        with transaction.atomic():
+            citizen = User.objects.create_user(username='benchmark_cercanas', role='CITIZEN')
+            service_type = ServiceType.objects.create(name='Benchmark')
+
+            start = time.perf_counter()
+            self._create_requests(citizen, service_type, options['points'])
+            self.stdout.write(
+                f"{options['points']} solicitudes creadas en {time.perf_counter() - start:.1f} s"
+            )
+            # Sin estadísticas el planificador puede preferir el índice de estado
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {ServiceRequest._meta.db_table}')
+
+            base = ServiceRequest.objects.filter(service_type=service_type)
+            queries = [self._random_point() for _ in range(max(options['queries'], options['scans']))]
+
+            indexed_times = []
+            found = 0
+            for latitude, longitude in queries[:options['queries']]:
+                start = time.perf_counter()
+                found += len(nearby_requests(latitude, longitude, radius, limit=20, queryset=base))
+                indexed_times.append(time.perf_counter() - start)
+
+            scan_times = []
+            mismatches = 0
+            for latitude, longitude in queries[:options['scans']]:
+                start = time.perf_counter()
+                expected = self._full_scan(base, latitude, longitude, radius)
+                scan_times.append(time.perf_counter() - start)
+                result = [
+                    service_request.pk
+                    for service_request, _ in nearby_requests(latitude, longitude, radius, limit=20, queryset=base)
+                ]
+                mismatches += result != expected
+
+            self.stdout.write(
+                f"Radio {radius} km   geohash: {np.median(indexed_times) * 1000:8.1f} ms (mediana)   "
+                f"recorrido completo: {np.median(scan_times) * 1000:8.1f} ms (mediana)   "
+                f"resultados promedio: {found / max(options['queries'], 1):.1f}"
+            )
+            if mismatches:
+                self.stdout.write(self.style.ERROR(f"{mismatches} consultas con resultados distintos"))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\nBenchmark completado (datos descartados)'))
+
+    @staticmethod
+    def _random_point():
+        # Puntos dentro de ~30 km alrededor de la Ciudad de Guatemala
+        return 14.50 + random.random() * 0.30, -90.70 + random.random() * 0.30
+
+    def _create_requests(self, citizen, service_type, count, batch_size=5000):
+        created = 0
+        while created < count:
+            batch = []
+            for index in range(created, min(created + batch_size, count)):
+                latitude, longitude = (round(value, 6) for value in self._random_point())
+                batch.append(ServiceRequest(
+                    ticket_number=f'BENCH-{index:08d}',
+                    citizen=citizen,
+                    service_type=service_type,
+                    request_type='REPAIR',
+                    title='Solicitud sintética',
+                    description='Benchmark de solicitudes cercanas',
+                    address='Casco Urbano',
+                    latitude=latitude,
+                    longitude=longitude,
+                    # bulk_create no llama a save(): la celda se calcula aquí
+                    geohash=geohash.encode(latitude, longitude, GEOHASH_PRECISION),
+                    status=random.choice(STATUSES),
+                ))
+            ServiceRequest.objects.bulk_create(batch)
+            created += len(batch)
+
+    @staticmethod
+    def _full_scan(base, latitude, longitude, radius, limit=20):
+        """Referencia sin índice: distancia a todas las solicitudes abiertas"""
+        rows = np.array(list(
+            base.filter(status__in=OPEN_STATUSES).order_by()
+            .values_list('id', 'latitude', 'longitude')
+        ), dtype=float)
+        distances = haversine_km(latitude, longitude, rows[:, 1], rows[:, 2])
+        inside = np.flatnonzero(distances <= radius)
+        nearest = inside[np.argsort(distances[inside], kind='stable')][:limit]
+        return [int(rows[index, 0]) for index in nearest]
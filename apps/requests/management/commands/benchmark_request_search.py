@@ -0,0 +1,92 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.requests.models import ServiceRequest, ServiceType
+from apps.requests.search import search_requests, search_backend, search_requests_basic
+
+User = get_user_model()
+
+WORDS = [
+    'fuga', 'agua', 'tubería', 'rota', 'alumbrado', 'poste', 'lámpara', 'apagada',
+    'basura', 'acumulada', 'calle', 'bache', 'drenaje', 'tapado', 'parque', 'árbol',
+    'caído', 'mercado', 'limpieza', 'señalización', 'banqueta', 'alcantarilla',
+    'colonia', 'barrio', 'cantón', 'sector', 'escuela', 'iglesia', 'esquina', 'frente',
+]
+
+TERMS = ['fuga de agua', 'alcantarilla', 'arbol caido', 'lampara apagada escuela']
+
+
+class Command(BaseCommand):
+    help = 'Compara la búsqueda de texto completo contra icontains con datos sintéticos (no guarda cambios)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[100000, 1000000],
+            help='Cantidades de solicitudes sintéticas a evaluar'
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.stdout.write(f"Motor de búsqueda: {search_backend()}")
+
+        with transaction.atomic():
+            citizen = User.objects.create_user(username='benchmark_busqueda', role='CITIZEN')
+            service_type = ServiceType.objects.create(name='Benchmark')
+
+            created = 0
+            for rows in sorted(options['rows']):
+                self._create_requests(citizen, service_type, rows - created)
+                created = rows
+                base = ServiceRequest.objects.filter(service_type=service_type)
+
+                self.stdout.write(f"\n{rows} solicitudes")
+                for term in TERMS:
+                    legacy = self._measure(
+                        lambda: search_requests_basic(base, term).order_by('-created_at'), options['repeat']
+                    )
+                    indexed = self._measure(
+                        lambda: search_requests(base, term).order_by('-search_rank', '-created_at'),
+                        options['repeat']
+                    )
+                    self.stdout.write(
+                        f"  {term!r:28} icontains: {legacy * 1000:8.1f} ms   "
+                        f"texto completo: {indexed * 1000:8.1f} ms"
+                    )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\nBenchmark completado (datos descartados)'))
+
+    def _create_requests(self, citizen, service_type, count, batch_size=5000):
+        while count > 0:
+            size = min(batch_size, count)
+            ServiceRequest.objects.bulk_create([
+                ServiceRequest(
+                    citizen=citizen,
+                    service_type=service_type,
+                    request_type='REPAIR',
+                    title=' '.join(random.choices(WORDS, k=4)),
+                    description=' '.join(random.choices(WORDS, k=30)),
+                    address='Casco Urbano',
+                )
+                for _ in range(size)
+            ])
+            count -= size
+
+    @staticmethod
+    def _measure(build_queryset, repeat):
+        """Mejor tiempo de una página típica: COUNT + primeras 10 filas"""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset = build_queryset()
+            queryset.count()
+            list(queryset[:10])
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
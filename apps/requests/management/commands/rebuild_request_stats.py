@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F, ExpressionWrapper, DurationField
+from django.db.models.functions import TruncDate
+from apps.requests.models import ServiceRequest, RequestDailyStat
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen diario de solicitudes usado por los reportes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Primer día a reconstruir (AAAA-MM-DD)')
+        parser.add_argument('--date-to', help='Último día a reconstruir (AAAA-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        requests = ServiceRequest.objects.annotate(day=TruncDate('created_at'))
+        stats = RequestDailyStat.objects.all()
+
+        if options['date_from']:
+            requests = requests.filter(day__gte=options['date_from'])
+            stats = stats.filter(day__gte=options['date_from'])
+        if options['date_to']:
+            requests = requests.filter(day__lte=options['date_to'])
+            stats = stats.filter(day__lte=options['date_to'])
+
+        rows = requests.order_by().values(
+            'day', 'service_type_id', 'service_area_id', 'priority', 'status'
+        ).annotate(
+            request_count=Count('id'),
+            resolved_count=Count('id', filter=Q(completed_at__isnull=False)),
+            resolution=Sum(
+                ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField()),
+                filter=Q(completed_at__isnull=False)
+            ),
+        )
+
+        created = 0
+        with transaction.atomic():
+            deleted, _ = stats.delete()
+            batch = []
+            for row in rows.iterator():
+                resolution = row.pop('resolution')
+                batch.append(RequestDailyStat(
+                    resolution_seconds=int(resolution.total_seconds()) if resolution else 0,
+                    **row
+                ))
+                if len(batch) >= options['batch_size']:
+                    RequestDailyStat.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            RequestDailyStat.objects.bulk_create(batch)
+            created += len(batch)
+
+        self.stdout.write(f"- Eliminados: {deleted} registros anteriores")
+        self.stdout.write(
+            self.style.SUCCESS(f'\nTotal: {created} registros de resumen diario creados')
+        )
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.requests.models import ServiceRequest, RequestStatusCounter
+
+COUNTER_FIELDS = [status.lower() for status, _ in ServiceRequest.STATUS_CHOICES] + ['overdue']
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de solicitudes por estado y corrige diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo reporta las diferencias, sin corregirlas'
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        expected = self._expected_counts(today)
+
+        with transaction.atomic():
+            existing = {
+                counter.key: counter
+                for counter in RequestStatusCounter.objects.select_for_update()
+            }
+
+            drifted = []
+            for key, counts in expected.items():
+                counter = existing.pop(key, None)
+                if counter is None:
+                    drifted.append((key, 'faltante'))
+                    if not options['dry_run']:
+                        RequestStatusCounter.objects.create(key=key, overdue_date=today, **counts)
+                    continue
+
+                differences = [
+                    f"{field}: {getattr(counter, field)} -> {counts[field]}"
+                    for field in COUNTER_FIELDS if getattr(counter, field) != counts[field]
+                ]
+                if differences:
+                    drifted.append((key, ', '.join(differences)))
+                if (differences or counter.overdue_date != today) and not options['dry_run']:
+                    RequestStatusCounter.objects.filter(key=key).update(overdue_date=today, **counts)
+
+            # Alcances sin solicitudes: se dejan en cero
+            zero = dict.fromkeys(COUNTER_FIELDS, 0)
+            for key, counter in existing.items():
+                if any(getattr(counter, field) for field in COUNTER_FIELDS):
+                    drifted.append((key, 'sin solicitudes'))
+                    if not options['dry_run']:
+                        RequestStatusCounter.objects.filter(key=key).update(overdue_date=today, **zero)
+
+        for key, detail in drifted:
+            self.stdout.write(f"- {key}: {detail}")
+
+        action = 'encontrados' if options['dry_run'] else 'corregidos'
+        self.stdout.write(
+            self.style.SUCCESS(f'\nTotal: {len(drifted)} contadores con diferencias {action}')
+        )
+
+    def _expected_counts(self, today):
+        """Conteos reales por alcance, con una consulta agrupada por tipo de alcance"""
+        aggregates = {
+            status.lower(): Count('id', filter=Q(status=status))
+            for status, _ in ServiceRequest.STATUS_CHOICES
+        }
+        aggregates['overdue'] = Count('id', filter=Q(
+            expected_completion__lt=today,
+            status__in=RequestStatusCounter.OVERDUE_STATUSES
+        ))
+
+        requests = ServiceRequest.objects.order_by()
+        expected = {
+            RequestStatusCounter.global_key(): requests.aggregate(**aggregates)
+        }
+        for row in requests.values('citizen_id').annotate(**aggregates):
+            expected[RequestStatusCounter.citizen_key(row.pop('citizen_id'))] = row
+        for row in requests.filter(service_area__isnull=False).values('service_area_id').annotate(**aggregates):
+            expected[RequestStatusCounter.area_key(row.pop('service_area_id'))] = row
+        return expected
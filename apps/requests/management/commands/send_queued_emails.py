@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.requests.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos en cola (EmailOutbox) en lotes sobre una conexión SMTP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Seguir revisando la cola en lugar de terminar cuando se vacía'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Segundos de espera cuando la cola está vacía (con --loop)'
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = deliver_batch(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"- Lote: {sent} enviados, {failed} fallidos")
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\nTotal: {total_sent} correos enviados, {total_failed} fallidos')
+        )
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:51
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, Q, F, ExpressionWrapper, DurationField
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_daily_stats(apps, schema_editor):
+    ServiceRequest = apps.get_model('requests', 'ServiceRequest')
+    RequestDailyStat = apps.get_model('requests', 'RequestDailyStat')
+
+    rows = ServiceRequest.objects.annotate(day=TruncDate('created_at')).order_by().values(
+        'day', 'service_type_id', 'service_area_id', 'priority', 'status'
+    ).annotate(
+        request_count=Count('id'),
+        resolved_count=Count('id', filter=Q(completed_at__isnull=False)),
+        resolution=Sum(
+            ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField()),
+            filter=Q(completed_at__isnull=False)
+        ),
+    )
+
+    stats = []
+    for row in rows:
+        resolution = row.pop('resolution')
+        stats.append(RequestDailyStat(
+            resolution_seconds=int(resolution.total_seconds()) if resolution else 0,
+            **row
+        ))
+    RequestDailyStat.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0003_alter_requeststatushistory_from_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('priority', models.CharField(choices=[('LOW', 'Baja'), ('MEDIUM', 'Media'), ('HIGH', 'Alta'), ('URGENT', 'Urgente')], max_length=10, verbose_name='Prioridad')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('IN_REVIEW', 'En Revisión'), ('APPROVED', 'Aprobada'), ('IN_PROGRESS', 'En Proceso'), ('COMPLETED', 'Completada'), ('REJECTED', 'Rechazada'), ('CANCELLED', 'Cancelada')], max_length=50, verbose_name='Estado')),
+                ('request_count', models.IntegerField(default=0, verbose_name='Total de Solicitudes')),
+                ('resolved_count', models.IntegerField(default=0, verbose_name='Solicitudes con Fecha de Finalización')),
+                ('resolution_seconds', models.BigIntegerField(default=0, verbose_name='Segundos de Resolución Acumulados')),
+                ('service_area', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='requests.servicearea', verbose_name='Área de Servicio')),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='requests.servicetype', verbose_name='Tipo de Servicio')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Solicitudes',
+                'verbose_name_plural': 'Resúmenes Diarios de Solicitudes',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='requestdailystat',
+            constraint=models.UniqueConstraint(fields=('day', 'service_type', 'service_area', 'priority', 'status'), name='unique_request_daily_stat'),
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'spanish_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION public.spanish_unaccent (COPY = pg_catalog.spanish);
+            ALTER TEXT SEARCH CONFIGURATION public.spanish_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        END IF;
+    END
+    $$
+    """,
+    "ALTER TABLE requests_servicerequest ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION requests_servicerequest_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('public.spanish_unaccent', coalesce(NEW.ticket_number, '')), 'A') ||
+            setweight(to_tsvector('public.spanish_unaccent', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('public.spanish_unaccent', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER requests_servicerequest_search_trigger
+        BEFORE INSERT OR UPDATE OF ticket_number, title, description ON requests_servicerequest
+        FOR EACH ROW EXECUTE FUNCTION requests_servicerequest_search_update()
+    """,
+    "UPDATE requests_servicerequest SET title = title",
+    "CREATE INDEX requests_servicerequest_search_idx ON requests_servicerequest USING gin (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP TRIGGER IF EXISTS requests_servicerequest_search_trigger ON requests_servicerequest",
+    "DROP FUNCTION IF EXISTS requests_servicerequest_search_update()",
+    "ALTER TABLE requests_servicerequest DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE requests_servicerequest_fts USING fts5(
+        ticket_number, title, description,
+        content='requests_servicerequest', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER requests_servicerequest_fts_insert AFTER INSERT ON requests_servicerequest BEGIN
+        INSERT INTO requests_servicerequest_fts(rowid, ticket_number, title, description)
+        VALUES (new.id, new.ticket_number, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER requests_servicerequest_fts_delete AFTER DELETE ON requests_servicerequest BEGIN
+        INSERT INTO requests_servicerequest_fts(requests_servicerequest_fts, rowid, ticket_number, title, description)
+        VALUES ('delete', old.id, old.ticket_number, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER requests_servicerequest_fts_update AFTER UPDATE OF ticket_number, title, description
+    ON requests_servicerequest BEGIN
+        INSERT INTO requests_servicerequest_fts(requests_servicerequest_fts, rowid, ticket_number, title, description)
+        VALUES ('delete', old.id, old.ticket_number, old.title, old.description);
+        INSERT INTO requests_servicerequest_fts(rowid, ticket_number, title, description)
+        VALUES (new.id, new.ticket_number, new.title, new.description);
+    END
+    """,
+    "INSERT INTO requests_servicerequest_fts(requests_servicerequest_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS requests_servicerequest_fts_insert",
+    "DROP TRIGGER IF EXISTS requests_servicerequest_fts_delete",
+    "DROP TRIGGER IF EXISTS requests_servicerequest_fts_update",
+    "DROP TABLE IF EXISTS requests_servicerequest_fts",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Índice de texto completo para la búsqueda de solicitudes
+    (ver apps/requests/search.py). Se crea con SQL propio de cada motor.
+    """
+
+    dependencies = [
+        ('requests', '0005_servicerequest_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_statements({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
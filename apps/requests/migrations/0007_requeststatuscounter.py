@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0006_servicerequest_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestStatusCounter',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Alcance')),
+                ('pending', models.IntegerField(default=0, verbose_name='Pendientes')),
+                ('in_review', models.IntegerField(default=0, verbose_name='En Revisión')),
+                ('approved', models.IntegerField(default=0, verbose_name='Aprobadas')),
+                ('in_progress', models.IntegerField(default=0, verbose_name='En Proceso')),
+                ('completed', models.IntegerField(default=0, verbose_name='Completadas')),
+                ('rejected', models.IntegerField(default=0, verbose_name='Rechazadas')),
+                ('cancelled', models.IntegerField(default=0, verbose_name='Canceladas')),
+                ('overdue', models.IntegerField(default=0, verbose_name='Vencidas')),
+                ('overdue_date', models.DateField(blank=True, null=True, verbose_name='Fecha de Cálculo de Vencidas')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Versión')),
+            ],
+            options={
+                'verbose_name': 'Contador de Solicitudes',
+                'verbose_name_plural': 'Contadores de Solicitudes',
+            },
+        ),
+    ]
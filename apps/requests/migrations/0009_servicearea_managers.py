@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('requests', '0008_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicearea',
+            name='managers',
+            field=models.ManyToManyField(blank=True, limit_choices_to={'role': 'MANAGER'}, related_name='managed_areas', to=settings.AUTH_USER_MODEL, verbose_name='Encargados'),
+        ),
+    ]
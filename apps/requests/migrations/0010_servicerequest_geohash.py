@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:14
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+from apps.core.utils import geohash
+
+search_migration = import_module('apps.requests.migrations.0006_servicerequest_search')
+
+
+def backfill_geohash(apps, schema_editor):
+    ServiceRequest = apps.get_model('requests', 'ServiceRequest')
+
+    located = ServiceRequest.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).only('id', 'latitude', 'longitude')
+
+    batch = []
+    for service_request in located.iterator(chunk_size=2000):
+        service_request.geohash = geohash.encode(
+            float(service_request.latitude), float(service_request.longitude), 8
+        )
+        batch.append(service_request)
+        if len(batch) >= 2000:
+            ServiceRequest.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    ServiceRequest.objects.bulk_update(batch, ['geohash'])
+
+
+def restore_sqlite_search_triggers(apps, schema_editor):
+    # En SQLite AddField reconstruye la tabla y se pierden los triggers del
+    # índice de texto completo (0006): se vuelven a crear
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in search_migration.SQLITE_REVERSE[:3] + search_migration.SQLITE_FORWARD[1:]:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0009_servicearea_managers'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_search_triggers),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, verbose_name='Celda (Geohash)'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['geohash', 'status'], name='requests_se_geohash_d5c6cb_idx'),
+        ),
+        migrations.RunPython(restore_sqlite_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apps.core.utils import minhash
+
+OPEN_STATUSES = ['PENDING', 'IN_REVIEW', 'APPROVED', 'IN_PROGRESS']
+
+
+def build_signatures(apps, schema_editor):
+    ServiceRequest = apps.get_model('requests', 'ServiceRequest')
+    RequestSignature = apps.get_model('requests', 'RequestSignature')
+    RequestSignatureBand = apps.get_model('requests', 'RequestSignatureBand')
+
+    open_requests = ServiceRequest.objects.filter(status__in=OPEN_STATUSES).only(
+        'id', 'service_type_id', 'title', 'description'
+    )
+    for service_request in open_requests.iterator(chunk_size=2000):
+        values = minhash.signature(
+            minhash.normalize_tokens(f'{service_request.title} {service_request.description}')
+        )
+        if values is None:
+            continue
+        signature = RequestSignature.objects.create(request_id=service_request.pk, minhash=values)
+        RequestSignatureBand.objects.bulk_create([
+            RequestSignatureBand(signature=signature, bucket=bucket)
+            for bucket in minhash.band_buckets(values, f'service_type:{service_request.service_type_id}')
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('requests', '0010_servicerequest_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestSignature',
+            fields=[
+                ('request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='requests.servicerequest', verbose_name='Solicitud')),
+                ('minhash', models.JSONField(verbose_name='Firma MinHash')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Firma de Solicitud',
+                'verbose_name_plural': 'Firmas de Solicitudes',
+            },
+        ),
+        migrations.CreateModel(
+            name='RequestMerge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merged_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Fusión')),
+                ('duplicate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='merged_into', to='requests.servicerequest', verbose_name='Solicitud Duplicada')),
+                ('merged_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Fusionada por')),
+                ('survivor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merged_requests', to='requests.servicerequest', verbose_name='Solicitud que se Conserva')),
+            ],
+            options={
+                'verbose_name': 'Fusión de Solicitudes',
+                'verbose_name_plural': 'Fusiones de Solicitudes',
+                'ordering': ['-merged_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RequestSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(verbose_name='Bucket')),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='requests.requestsignature', verbose_name='Firma')),
+            ],
+            options={
+                'verbose_name': 'Banda de Firma',
+                'verbose_name_plural': 'Bandas de Firmas',
+                'indexes': [models.Index(fields=['bucket'], name='requests_re_bucket_0da4c7_idx')],
+            },
+        ),
+        migrations.RunPython(build_signatures, migrations.RunPython.noop),
+    ]
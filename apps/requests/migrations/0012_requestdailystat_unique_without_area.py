@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:04
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_rows(apps, schema_editor):
+    """Une las filas sin área repetidas antes de crear la restricción"""
+    RequestDailyStat = apps.get_model('requests', 'RequestDailyStat')
+    key = ['day', 'service_type', 'priority', 'status']
+    duplicated = RequestDailyStat.objects.filter(service_area__isnull=True).values(*key).annotate(
+        rows=Count('id'),
+        total_requests=Sum('request_count'),
+        total_resolved=Sum('resolved_count'),
+        total_seconds=Sum('resolution_seconds'),
+    ).filter(rows__gt=1)
+
+    for row in duplicated:
+        lookup = {field: row[field] for field in key}
+        stats = RequestDailyStat.objects.filter(service_area__isnull=True, **lookup).order_by('id')
+        keep = stats.first()
+        stats.exclude(pk=keep.pk).delete()
+        RequestDailyStat.objects.filter(pk=keep.pk).update(
+            request_count=row['total_requests'],
+            resolved_count=row['total_resolved'],
+            resolution_seconds=row['total_seconds'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0011_request_signatures'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='requestdailystat',
+            constraint=models.UniqueConstraint(condition=models.Q(('service_area__isnull', True)), fields=('day', 'service_type', 'priority', 'status'), name='unique_request_daily_stat_without_area'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0013_servicerequest_geohash_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='servicerequest',
+            name='request_geohash_prefix_idx',
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['geohash', 'status'], name='request_geohash_status_idx'),
+        ),
+    ]
@@ -1,12 +1,18 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
+from apps.core.utils import geohash, minhash
+from apps.core.utils.field_tracker import FieldTrackerMixin
 import uuid
 import os
 
 User = get_user_model()
 
+# ~38 m x 19 m por celda
+GEOHASH_PRECISION = 8
+
 
 class ServiceType(models.Model):
     """Tipos de servicios públicos disponibles"""
@@ -56,6 +62,13 @@ class ServiceArea(models.Model):
         default=True,
         verbose_name='Activa'
     )
+    managers = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name='managed_areas',
+        limit_choices_to={'role': 'MANAGER'},
+        verbose_name='Encargados'
+    )
 
     class Meta:
         verbose_name = 'Área de Servicio'
@@ -80,9 +93,15 @@ def request_image_path(instance, filename):
     return os.path.join('requests', str(instance.request.id), filename)
 
 
-class ServiceRequest(models.Model):
+class ServiceRequest(FieldTrackerMixin, models.Model):
     """Solicitudes de servicios y reportes de averías"""
 
+    # Campos cuyo valor original se conserva al cargar la fila (ver signals.py)
+    tracked_fields = (
+        'status', 'priority', 'citizen_id', 'service_type_id', 'service_area_id',
+        'created_at', 'completed_at', 'expected_completion', 'title', 'description',
+    )
+
     STATUS_CHOICES = [
         ('PENDING', 'Pendiente'),
         ('IN_REVIEW', 'En Revisión'),
@@ -174,6 +193,13 @@ class ServiceRequest(models.Model):
         verbose_name='Longitud'
     )
 
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        editable=False,
+        verbose_name='Celda (Geohash)'
+    )
+
     # Estado y prioridad
     status = models.CharField(
         max_length=50,
@@ -274,11 +300,34 @@ class ServiceRequest(models.Model):
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['citizen', 'status']),
             models.Index(fields=['ticket_number']),
+            models.Index(fields=['created_at', 'id']),
+            # Rangos de geohash por celda, ver nearby.py
+            models.Index(fields=['geohash', 'status'], name='request_geohash_status_idx'),
         ]
 
     def __str__(self):
         return f"{self.ticket_number} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        # Celda geográfica para búsquedas de solicitudes cercanas
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+
+        # Los contadores y resúmenes se actualizan en señales: misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return geohash.encode(float(self.latitude), float(self.longitude), GEOHASH_PRECISION)
+
     def get_absolute_url(self):
         return reverse('requests:detail', kwargs={'ticket_number': self.ticket_number})
 
@@ -457,4 +506,574 @@ class RequestComment(models.Model):
         ordering = ['created_at']
 
     def __str__(self):
-        return f"Comentario de {self.user.username} en {self.request.ticket_number}"
\ No newline at end of file
+        return f"Comentario de {self.user.username} en {self.request.ticket_number}"
+
+
+class RequestDailyStat(models.Model):
+    """
+    Resumen diario de solicitudes por (día, servicio, área, prioridad, estado).
+
+    Se mantiene de forma incremental desde las señales de ServiceRequest y
+    se reconstruye con el comando rebuild_request_stats.
+    """
+    day = models.DateField(
+        verbose_name='Día'
+    )
+
+    service_type = models.ForeignKey(
+        ServiceType,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        verbose_name='Tipo de Servicio'
+    )
+
+    service_area = models.ForeignKey(
+        ServiceArea,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_stats',
+        verbose_name='Área de Servicio'
+    )
+
+    priority = models.CharField(
+        max_length=10,
+        choices=ServiceRequest.PRIORITY_CHOICES,
+        verbose_name='Prioridad'
+    )
+
+    status = models.CharField(
+        max_length=50,
+        choices=ServiceRequest.STATUS_CHOICES,
+        verbose_name='Estado'
+    )
+
+    request_count = models.IntegerField(
+        default=0,
+        verbose_name='Total de Solicitudes'
+    )
+
+    resolved_count = models.IntegerField(
+        default=0,
+        verbose_name='Solicitudes con Fecha de Finalización'
+    )
+
+    resolution_seconds = models.BigIntegerField(
+        default=0,
+        verbose_name='Segundos de Resolución Acumulados'
+    )
+
+    class Meta:
+        verbose_name = 'Resumen Diario de Solicitudes'
+        verbose_name_plural = 'Resúmenes Diarios de Solicitudes'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'service_type', 'service_area', 'priority', 'status'],
+                name='unique_request_daily_stat'
+            ),
+            # Los NULL no se consideran iguales: sin área se necesita su propia restricción
+            models.UniqueConstraint(
+                fields=['day', 'service_type', 'priority', 'status'],
+                condition=models.Q(service_area__isnull=True),
+                name='unique_request_daily_stat_without_area'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.service_type_id} - {self.status}: {self.request_count}"
+
+    @staticmethod
+    def contribution(service_request):
+        """Aporte de una solicitud al resumen: (clave, resueltas, segundos)"""
+        key = (
+            timezone.localdate(service_request.created_at),
+            service_request.service_type_id,
+            service_request.service_area_id,
+            service_request.priority,
+            service_request.status,
+        )
+        if service_request.completed_at:
+            seconds = int((service_request.completed_at - service_request.created_at).total_seconds())
+            return key, 1, seconds
+        return key, 0, 0
+
+    @classmethod
+    def apply(cls, contribution, sign=1):
+        """Suma (sign=1) o resta (sign=-1) el aporte de una solicitud"""
+        (day, service_type_id, service_area_id, priority, status), resolved, seconds = contribution
+        lookup = {
+            'day': day,
+            'service_type_id': service_type_id,
+            'service_area_id': service_area_id,
+            'priority': priority,
+            'status': status,
+        }
+        changes = {
+            'request_count': F('request_count') + sign,
+            'resolved_count': F('resolved_count') + sign * resolved,
+            'resolution_seconds': F('resolution_seconds') + sign * seconds,
+        }
+
+        if cls.objects.filter(**lookup).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    request_count=sign,
+                    resolved_count=sign * resolved,
+                    resolution_seconds=sign * seconds,
+                    **lookup
+                )
+        except IntegrityError:
+            # Otra transacción creó la fila al mismo tiempo
+            cls.objects.filter(**lookup).update(**changes)
+
+
+class RequestStatusCounter(models.Model):
+    """
+    Contadores de solicitudes por estado para un alcance: global, ciudadano
+    o área. La llave primaria es el alcance ('global', 'citizen:<id>',
+    'area:<id>'), así que leerlos es una sola búsqueda por llave primaria.
+
+    Se actualizan en las señales de ServiceRequest y se reparan con el
+    comando reconcile_request_counters. El conteo de vencidas depende de la
+    fecha, por eso se recalcula la primera vez que se lee cada día.
+    """
+    OVERDUE_STATUSES = ['PENDING', 'IN_PROGRESS']
+
+    key = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name='Alcance'
+    )
+
+    pending = models.IntegerField(default=0, verbose_name='Pendientes')
+    in_review = models.IntegerField(default=0, verbose_name='En Revisión')
+    approved = models.IntegerField(default=0, verbose_name='Aprobadas')
+    in_progress = models.IntegerField(default=0, verbose_name='En Proceso')
+    completed = models.IntegerField(default=0, verbose_name='Completadas')
+    rejected = models.IntegerField(default=0, verbose_name='Rechazadas')
+    cancelled = models.IntegerField(default=0, verbose_name='Canceladas')
+
+    overdue = models.IntegerField(
+        default=0,
+        verbose_name='Vencidas'
+    )
+
+    overdue_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Cálculo de Vencidas'
+    )
+
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Versión'
+    )
+
+    class Meta:
+        verbose_name = 'Contador de Solicitudes'
+        verbose_name_plural = 'Contadores de Solicitudes'
+
+    def __str__(self):
+        return f"{self.key}: {self.total}"
+
+    @property
+    def total(self):
+        return sum(getattr(self, status.lower()) for status, _ in ServiceRequest.STATUS_CHOICES)
+
+    @staticmethod
+    def global_key():
+        return 'global'
+
+    @staticmethod
+    def citizen_key(citizen_id):
+        return f'citizen:{citizen_id}'
+
+    @staticmethod
+    def area_key(area_id):
+        return f'area:{area_id}'
+
+    @classmethod
+    def keys_for(cls, service_request):
+        """Alcances a los que pertenece una solicitud"""
+        keys = [cls.global_key(), cls.citizen_key(service_request.citizen_id)]
+        if service_request.service_area_id:
+            keys.append(cls.area_key(service_request.service_area_id))
+        return keys
+
+    @classmethod
+    def scope_filter(cls, key):
+        """Filtro de ServiceRequest equivalente a un alcance"""
+        if key == cls.global_key():
+            return {}
+        scope, scope_id = key.split(':')
+        if scope == 'citizen':
+            return {'citizen_id': int(scope_id)}
+        return {'service_area_id': int(scope_id)}
+
+    @classmethod
+    def is_overdue_on(cls, service_request, today):
+        return bool(
+            service_request.expected_completion
+            and service_request.expected_completion < today
+            and service_request.status in cls.OVERDUE_STATUSES
+        )
+
+    @classmethod
+    def contribution(cls, service_request, today):
+        """Aporte de una solicitud: {alcance: (estado, vencida)}"""
+        overdue = cls.is_overdue_on(service_request, today)
+        return {key: (service_request.status, overdue) for key in cls.keys_for(service_request)}
+
+    @classmethod
+    def apply_change(cls, original, current):
+        """
+        Aplica la diferencia entre dos aportes (None si no existía o ya no
+        existe). Solo se ejecuta un UPDATE por alcance afectado.
+
+        Returns:
+            dict: {alcance: {campo: diferencia}} de los alcances modificados
+        """
+        today = timezone.localdate()
+        original = original or {}
+        current = current or {}
+        changed = {}
+
+        for key in set(original) | set(current):
+            if original.get(key) == current.get(key):
+                continue
+
+            deltas = {}
+            overdue_delta = 0
+            if key in original:
+                status, overdue = original[key]
+                deltas[status] = deltas.get(status, 0) - 1
+                overdue_delta -= int(overdue)
+            if key in current:
+                status, overdue = current[key]
+                deltas[status] = deltas.get(status, 0) + 1
+                overdue_delta += int(overdue)
+
+            changes = {
+                status.lower(): F(status.lower()) + delta
+                for status, delta in deltas.items() if delta
+            }
+            changes['version'] = F('version') + 1
+            if overdue_delta:
+                changes['overdue'] = models.Case(
+                    models.When(overdue_date=today, then=F('overdue') + overdue_delta),
+                    default=F('overdue'),
+                )
+
+            if not cls.objects.filter(key=key).update(**changes):
+                # Sin fila todavía: se crea con el conteo completo del alcance
+                cls.rebuild(key)
+
+            changed[key] = {
+                status.lower(): delta for status, delta in deltas.items() if delta
+            }
+            changed[key]['total'] = sum(deltas.values())
+            if overdue_delta:
+                changed[key]['overdue'] = overdue_delta
+
+        return changed
+
+    @classmethod
+    def rebuild(cls, key):
+        """Recalcula desde ServiceRequest los contadores de un alcance"""
+        today = timezone.localdate()
+        requests = ServiceRequest.objects.filter(**cls.scope_filter(key))
+        counts = requests.aggregate(
+            overdue=models.Count('id', filter=models.Q(
+                expected_completion__lt=today, status__in=cls.OVERDUE_STATUSES
+            )),
+            **{
+                status.lower(): models.Count('id', filter=models.Q(status=status))
+                for status, _ in ServiceRequest.STATUS_CHOICES
+            }
+        )
+        counter, _ = cls.objects.update_or_create(
+            key=key,
+            defaults=dict(counts, overdue_date=today),
+        )
+        # Nueva versión: los ETag de las APIs de estadísticas dejan de coincidir
+        cls.objects.filter(key=key).update(version=F('version') + 1)
+        return counter
+
+    @classmethod
+    def get_for(cls, key):
+        """
+        Contadores de un alcance. Normalmente es una sola consulta por llave
+        primaria; la primera lectura del día recalcula las vencidas.
+        """
+        try:
+            counter = cls.objects.get(key=key)
+        except cls.DoesNotExist:
+            return cls.rebuild(key)
+
+        today = timezone.localdate()
+        if counter.overdue_date != today:
+            counter.overdue = ServiceRequest.objects.filter(
+                expected_completion__lt=today,
+                status__in=cls.OVERDUE_STATUSES,
+                **cls.scope_filter(key)
+            ).count()
+            counter.overdue_date = today
+            cls.objects.filter(key=key).update(overdue=counter.overdue, overdue_date=today)
+        return counter
+
+
+class EmailOutbox(models.Model):
+    """
+    Correos pendientes de envío. Se escriben en la misma transacción que el
+    cambio que los origina y los envía el comando send_queued_emails, así la
+    petición web no espera al servidor SMTP.
+
+    Mientras un correo sigue pendiente, un nuevo correo con la misma
+    dedupe_key lo reemplaza (p. ej. varios cambios de estado del mismo ticket
+    se envían como uno solo con el estado más reciente). Un correo en
+    SENDING ya fue tomado por el worker y no se reemplaza; si el worker se
+    detiene, vuelve a tomarse cuando vence next_attempt_at.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('SENDING', 'Enviando'),
+        ('SENT', 'Enviado'),
+        ('FAILED', 'Fallido'),
+    ]
+
+    recipient = models.EmailField(
+        verbose_name='Destinatario'
+    )
+
+    subject = models.CharField(
+        max_length=255,
+        verbose_name='Asunto'
+    )
+
+    body = models.TextField(
+        verbose_name='Mensaje'
+    )
+
+    dedupe_key = models.CharField(
+        max_length=150,
+        blank=True,
+        verbose_name='Llave de Agrupación'
+    )
+
+    related_request = models.ForeignKey(
+        ServiceRequest,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outgoing_emails',
+        verbose_name='Solicitud Relacionada'
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='PENDING',
+        verbose_name='Estado'
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próximo Intento'
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Último Error'
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Envío'
+    )
+
+    class Meta:
+        verbose_name = 'Correo en Cola'
+        verbose_name_plural = 'Correos en Cola'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status='PENDING') & ~models.Q(dedupe_key=''),
+                name='unique_pending_email_dedupe_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject}"
+
+    @classmethod
+    def enqueue(cls, recipient, subject, body, dedupe_key='', related_request=None):
+        """
+        Agrega un correo a la cola o reemplaza el pendiente con la misma
+        dedupe_key. Debe llamarse dentro de la transacción del cambio.
+        """
+        values = {
+            'recipient': recipient,
+            'subject': subject,
+            'body': body,
+            'related_request': related_request,
+        }
+        if not dedupe_key:
+            return cls.objects.create(**values)
+
+        pending = cls.objects.filter(dedupe_key=dedupe_key, status='PENDING')
+        if pending.update(**values):
+            return pending.first()
+        try:
+            with transaction.atomic():
+                return cls.objects.create(dedupe_key=dedupe_key, **values)
+        except IntegrityError:
+            # Otra transacción creó el pendiente al mismo tiempo
+            pending.update(**values)
+            return pending.first()
+
+
+class RequestSignature(models.Model):
+    """
+    Firma MinHash del título y la descripción de una solicitud abierta.
+
+    Sus bandas LSH (RequestSignatureBand) permiten encontrar posibles
+    duplicados sin recorrer todas las solicitudes abiertas. Se mantiene desde
+    las señales de ServiceRequest y solo existe mientras la solicitud está
+    abierta.
+    """
+    INDEXED_STATUSES = ['PENDING', 'IN_REVIEW', 'APPROVED', 'IN_PROGRESS']
+
+    request = models.OneToOneField(
+        ServiceRequest,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Solicitud'
+    )
+
+    minhash = models.JSONField(
+        verbose_name='Firma MinHash'
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
+
+    class Meta:
+        verbose_name = 'Firma de Solicitud'
+        verbose_name_plural = 'Firmas de Solicitudes'
+
+    def __str__(self):
+        return f"Firma de {self.request_id}"
+
+    @staticmethod
+    def text_of(service_request):
+        return f"{service_request.title} {service_request.description}"
+
+    @staticmethod
+    def namespace_of(service_type_id):
+        """Los buckets se separan por tipo de servicio"""
+        return f'service_type:{service_type_id}'
+
+    @classmethod
+    def index(cls, service_request):
+        """Crea, actualiza o elimina la firma según el estado de la solicitud"""
+        with transaction.atomic():
+            RequestSignatureBand.objects.filter(signature_id=service_request.pk).delete()
+            if service_request.status not in cls.INDEXED_STATUSES:
+                cls.objects.filter(pk=service_request.pk).delete()
+                return None
+
+            values = minhash.signature(minhash.normalize_tokens(cls.text_of(service_request)))
+            if values is None:
+                cls.objects.filter(pk=service_request.pk).delete()
+                return None
+
+            signature, _ = cls.objects.update_or_create(
+                request_id=service_request.pk, defaults={'minhash': values}
+            )
+            RequestSignatureBand.objects.bulk_create([
+                RequestSignatureBand(signature=signature, bucket=bucket)
+                for bucket in minhash.band_buckets(values, cls.namespace_of(service_request.service_type_id))
+            ])
+            return signature
+
+
+class RequestSignatureBand(models.Model):
+    """Bucket LSH de una banda de la firma MinHash"""
+    signature = models.ForeignKey(
+        RequestSignature,
+        on_delete=models.CASCADE,
+        related_name='bands',
+        verbose_name='Firma'
+    )
+
+    bucket = models.BigIntegerField(
+        verbose_name='Bucket'
+    )
+
+    class Meta:
+        verbose_name = 'Banda de Firma'
+        verbose_name_plural = 'Bandas de Firmas'
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.signature_id}: {self.bucket}"
+
+
+class RequestMerge(models.Model):
+    """Registro de una solicitud duplicada fusionada en otra"""
+    duplicate = models.OneToOneField(
+        ServiceRequest,
+        on_delete=models.CASCADE,
+        related_name='merged_into',
+        verbose_name='Solicitud Duplicada'
+    )
+
+    survivor = models.ForeignKey(
+        ServiceRequest,
+        on_delete=models.CASCADE,
+        related_name='merged_requests',
+        verbose_name='Solicitud que se Conserva'
+    )
+
+    merged_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        verbose_name='Fusionada por'
+    )
+
+    merged_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Fusión'
+    )
+
+    class Meta:
+        verbose_name = 'Fusión de Solicitudes'
+        verbose_name_plural = 'Fusiones de Solicitudes'
+        ordering = ['-merged_at']
+
+    def __str__(self):
+        return f"{self.duplicate.ticket_number} → {self.survivor.ticket_number}"
@@ -0,0 +1,76 @@
+"""
+Búsqueda de solicitudes abiertas cercanas a una coordenada.
+
+Los candidatos se obtienen por rangos de geohash (las celdas que cubren el
+radio) sobre el índice (geohash, status), y solo a esos se les calcula la
+distancia exacta. Funciona igual en SQLite y PostgreSQL, sin PostGIS.
+
+El límite superior de cada rango es el siguiente prefijo en BASE32 (ver
+geohash.prefix_end) y no un carácter de puntuación, que las collations
+lingüísticas de PostgreSQL ordenan distinto que los bytes. Un rango, a
+diferencia de LIKE 'prefijo%', usa el índice en ambos motores.
+"""
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.db.models import Q
+
+from apps.core.utils import geohash
+from .models import ServiceRequest
+
+OPEN_STATUSES = ['PENDING', 'IN_REVIEW', 'APPROVED', 'IN_PROGRESS']
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def cells_filter(latitude, longitude, radius_km):
+    """Filtro por rangos de geohash que cubren el radio"""
+    return reduce(or_, (
+        cell_range(cell) for cell in geohash.covering_cells(latitude, longitude, radius_km)
+    ))
+
+
+def cell_range(cell):
+    """Geohashes que empiezan con cell, como rango del índice"""
+    end = geohash.prefix_end(cell)
+    return Q(geohash__gte=cell, geohash__lt=end) if end else Q(geohash__gte=cell)
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Distancias en km desde una coordenada a arreglos de coordenadas"""
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearby_requests(latitude, longitude, radius_km=1.0, limit=20, queryset=None, statuses=None):
+    """
+    Solicitudes a menos de radius_km, ordenadas por distancia.
+
+    Returns:
+        list: [(solicitud, distancia_km), ...] con a lo más limit elementos
+    """
+    queryset = ServiceRequest.objects.all() if queryset is None else queryset
+    candidates = list(
+        queryset.filter(
+            cells_filter(latitude, longitude, radius_km),
+            status__in=statuses or OPEN_STATUSES,
+        ).order_by().values_list('id', 'latitude', 'longitude')
+    )
+    if not candidates:
+        return []
+
+    ids = np.array([row[0] for row in candidates])
+    coordinates = np.array([(float(row[1]), float(row[2])) for row in candidates])
+    distances = haversine_km(latitude, longitude, coordinates[:, 0], coordinates[:, 1])
+
+    inside = np.flatnonzero(distances <= radius_km)
+    nearest = inside[np.argsort(distances[inside], kind='stable')][:limit]
+
+    objects = queryset.select_related('service_type').in_bulk([int(ids[index]) for index in nearest])
+    return [(objects[int(ids[index])], float(distances[index])) for index in nearest]
@@ -0,0 +1,106 @@
+"""
+Envío de los correos en cola (EmailOutbox).
+
+Cada lote se toma con un UPDATE corto que los marca como SENDING, se envía
+reutilizando una sola conexión SMTP y luego se registra el resultado. Los
+fallos se reintentan con espera exponencial hasta EMAIL_OUTBOX_MAX_ATTEMPTS.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def claim_batch(batch_size):
+    """
+    Toma hasta batch_size correos listos para enviar. Quedan en SENDING hasta
+    que vence EMAIL_OUTBOX_LEASE_SECONDS, por si el worker se detiene.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+                Q(status='PENDING') | Q(status='SENDING'),
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=ids).update(
+            status='SENDING',
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+        )
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def retry_delay(attempts):
+    """Espera antes del siguiente intento (exponencial, con tope)"""
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def deliver_batch(batch_size=50, connection=None):
+    """
+    Envía un lote de correos pendientes.
+
+    Returns:
+        tuple: (enviados, fallidos)
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = []
+    failed = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.recipient],
+                connection=connection,
+            )
+            try:
+                # La conexión se abre una vez y se reutiliza en todo el lote
+                connection.open()
+                message.send()
+            except Exception as error:
+                failed += 1
+                _record_failure(email, error)
+                # La conexión puede haber quedado inválida
+                connection.close()
+            else:
+                sent.append(email.id)
+    finally:
+        connection.close()
+        if sent:
+            EmailOutbox.objects.filter(id__in=sent).update(
+                status='SENT', sent_at=timezone.now(), last_error=''
+            )
+
+    return len(sent), failed
+
+
+def _record_failure(email, error):
+    logger.warning('No se pudo enviar el correo %s a %s: %s', email.id, email.recipient, error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        status, next_attempt_at = 'FAILED', timezone.now()
+    else:
+        status, next_attempt_at = 'PENDING', timezone.now() + retry_delay(email.attempts)
+
+    # Si ya existe otro pendiente con la misma llave, ese tiene el contenido
+    # más reciente y este reintento sobra
+    if status == 'PENDING' and email.dedupe_key and EmailOutbox.objects.filter(
+        dedupe_key=email.dedupe_key, status='PENDING'
+    ).exists():
+        status = 'FAILED'
+
+    EmailOutbox.objects.filter(id=email.id).update(
+        status=status, next_attempt_at=next_attempt_at, last_error=str(error)[:1000]
+    )
@@ -0,0 +1,100 @@
+"""
+Búsqueda de texto completo sobre ServiceRequest (ticket, título y descripción).
+
+PostgreSQL usa la columna search_vector (tsvector mantenido por trigger, con
+stemming en español y unaccent) y su índice GIN. SQLite usa la tabla FTS5
+requests_servicerequest_fts. Ambas estructuras se crean en la migración
+0006_servicerequest_search; otros motores usan icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q, Value, FloatField, BooleanField
+from django.db.models.expressions import RawSQL
+
+TICKET_PATTERN = re.compile(r'^REQ-\d{8}-[0-9A-F]{8}$', re.IGNORECASE)
+
+POSTGRES_CONFIG = 'public.spanish_unaccent'
+
+FTS_TABLE = 'requests_servicerequest_fts'
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def search_backend():
+    """Motor de búsqueda disponible para la conexión actual"""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        return 'sqlite'
+    return 'basic'
+
+
+def search_requests(queryset, term):
+    """
+    Filtra un queryset de ServiceRequest por el término de búsqueda.
+
+    Un número de ticket completo se resuelve directamente con el índice único.
+    En otro caso se usa el índice de texto completo y los resultados se
+    anotan con search_rank (mayor es más relevante).
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+
+    if TICKET_PATTERN.match(term):
+        return queryset.filter(ticket_number=term.upper()).annotate(
+            search_rank=Value(1.0, output_field=FloatField())
+        )
+
+    backend = search_backend()
+    if backend == 'postgresql':
+        return _search_postgresql(queryset, term)
+    if backend == 'sqlite':
+        return _search_sqlite(queryset, term)
+    return search_requests_basic(queryset, term)
+
+
+def _search_postgresql(queryset, term):
+    table = queryset.model._meta.db_table
+    query = f"websearch_to_tsquery('{POSTGRES_CONFIG}', %s)"
+    return queryset.annotate(
+        search_match=RawSQL(f'"{table}"."search_vector" @@ {query}', [term], output_field=BooleanField()),
+        search_rank=RawSQL(f'ts_rank_cd("{table}"."search_vector", {query})', [term], output_field=FloatField()),
+    ).filter(search_match=True)
+
+
+def _fts_query(term):
+    """Convierte el término en una consulta FTS5 segura (prefijos unidos con AND)"""
+    tokens = TOKEN_PATTERN.findall(term)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _search_sqlite(queryset, term):
+    match = _fts_query(term)
+    if not match:
+        return queryset.none()
+
+    table = queryset.model._meta.db_table
+    matching_ids = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    # Las subconsultas no correlacionadas se evalúan una sola vez; bm25() por
+    # fila obligaría a SQLite a repetir el MATCH para cada solicitud. La
+    # relevancia se aproxima dando más peso a coincidencias en ticket/título.
+    return queryset.filter(
+        id__in=RawSQL(matching_ids, [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f'CASE WHEN "{table}"."id" IN ({matching_ids}) THEN 2.0 ELSE 1.0 END',
+            [f'{{ticket_number title}} : ({match})'],
+            output_field=FloatField()
+        ),
+    )
+
+
+def search_requests_basic(queryset, term):
+    """Búsqueda sin índice (icontains), usada en motores sin texto completo"""
+    return queryset.filter(
+        Q(ticket_number__icontains=term) |
+        Q(title__icontains=term) |
+        Q(description__icontains=term)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
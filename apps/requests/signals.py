@@ -1,23 +1,23 @@
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
-from .models import ServiceRequest, RequestStatusHistory
+from django.utils import timezone
+from apps.core.utils.cache import invalidate_tags_on_commit
+from apps.core.utils.events import publish_on_commit
+from .tasks import deliver_queued_emails, queue_new_request_emails
+from .models import ServiceType, ServiceArea, ServiceRequest, RequestStatusHistory, RequestDailyStat, RequestStatusCounter, EmailOutbox, RequestSignature
 
 
 @receiver(pre_save, sender=ServiceRequest)
 def track_status_changes(sender, instance, **kwargs):
-    """Registra cambios de estado en el historial"""
-    if instance.pk:  # Solo para instancias existentes
-        try:
-            original = ServiceRequest.objects.get(pk=instance.pk)
-            if original.status != instance.status:
-                # El estado cambió, se creará el historial en post_save
-                instance._status_changed = True
-                instance._original_status = original.status
-        except ServiceRequest.DoesNotExist:
-            pass
+    """
+    Asegura que se conozcan los valores originales de los campos rastreados.
+    Las instancias cargadas desde la base de datos ya los tienen (from_db),
+    así que solo se consulta para instancias construidas a mano con pk.
+    """
+    if instance.pk and not instance.has_tracked_snapshot():
+        instance.load_tracked_snapshot()
 
 
 @receiver(post_save, sender=ServiceRequest)
@@ -32,38 +32,114 @@ def create_status_history(sender, instance, created, **kwargs):
             changed_by=instance.citizen,
             reason="Solicitud creada"
         )
-    elif hasattr(instance, '_status_changed') and instance._status_changed:
-        # Estado cambió
+    elif instance.has_changed('status'):
+        # Estado cambió; quien guarda puede indicar autor y motivo en la instancia
         RequestStatusHistory.objects.create(
             request=instance,
-            from_status=instance._original_status,
+            from_status=instance.previous_value('status'),
             to_status=instance.status,
-            changed_by=instance.citizen,  # Esto se debe cambiar según quién hizo el cambio
-            reason="Estado actualizado"
+            changed_by=getattr(instance, '_status_changed_by', None) or instance.citizen,
+            reason=getattr(instance, '_status_change_reason', None) or "Estado actualizado"
         )
 
 
 @receiver(post_save, sender=ServiceRequest)
-def send_status_notification(sender, instance, created, **kwargs):
-    """Envía notificaciones por email cuando cambia el estado"""
-    if created:
-        # Notificación de nueva solicitud
-        subject = f"Nueva Solicitud Creada: {instance.ticket_number}"
-        message = f"""
-        Se ha creado una nueva solicitud:
+def update_daily_stats(sender, instance, created, raw=False, **kwargs):
+    """Mantiene actualizado el resumen diario de solicitudes"""
+    if raw:
+        return
 
-        Ticket: {instance.ticket_number}
-        Tipo: {instance.get_request_type_display()}
-        Servicio: {instance.service_type.name}
-        Ciudadano: {instance.citizen.get_full_name()}
+    current = RequestDailyStat.contribution(instance)
+    original = None if created else RequestDailyStat.contribution(instance.previous_state())
 
-        Descripción: {instance.description[:200]}...
-        """
+    with transaction.atomic():
+        if original is None:
+            RequestDailyStat.apply(current)
+        elif original != current:
+            RequestDailyStat.apply(original, -1)
+            RequestDailyStat.apply(current)
 
-        # Enviar a personal municipal (esto se puede mejorar)
-        # send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, ['admin@municipalidad.gt'])
 
-    elif hasattr(instance, '_status_changed') and instance._status_changed:
+@receiver(post_delete, sender=ServiceRequest)
+def remove_daily_stats(sender, instance, **kwargs):
+    """Descuenta la solicitud eliminada del resumen diario"""
+    RequestDailyStat.apply(RequestDailyStat.contribution(instance), -1)
+
+
+@receiver(post_save, sender=ServiceRequest)
+def update_status_counters(sender, instance, created, raw=False, **kwargs):
+    """Mantiene los contadores por estado de los alcances de la solicitud"""
+    if raw:
+        return
+
+    today = timezone.localdate()
+    current = RequestStatusCounter.contribution(instance, today)
+    original = None if created else RequestStatusCounter.contribution(instance.previous_state(), today)
+
+    with transaction.atomic():
+        publish_counter_changes(RequestStatusCounter.apply_change(original, current))
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def remove_status_counters(sender, instance, **kwargs):
+    """Descuenta la solicitud eliminada de sus contadores"""
+    publish_counter_changes(RequestStatusCounter.apply_change(
+        RequestStatusCounter.contribution(instance, timezone.localdate()), None
+    ))
+
+
+@receiver(post_save, sender=ServiceRequest)
+@receiver(post_delete, sender=ServiceRequest)
+def invalidate_request_caches(sender, instance, raw=False, **kwargs):
+    """Invalida las estadísticas y reportes en caché"""
+    if not raw:
+        invalidate_tags_on_commit('requests')
+
+
+@receiver(post_save, sender=ServiceType)
+@receiver(post_delete, sender=ServiceType)
+@receiver(post_save, sender=ServiceArea)
+@receiver(post_delete, sender=ServiceArea)
+def invalidate_lookup_caches(sender, instance, **kwargs):
+    """Invalida los catálogos de tipos de servicio y áreas en caché"""
+    invalidate_tags_on_commit('lookups')
+
+
+SIGNATURE_FIELDS = ('title', 'description', 'status', 'service_type_id')
+
+
+@receiver(post_save, sender=ServiceRequest)
+def update_request_signature(sender, instance, created, raw=False, **kwargs):
+    """Mantiene la firma MinHash usada para detectar duplicados"""
+    if raw:
+        return
+    if created or any(instance.has_changed(field) for field in SIGNATURE_FIELDS):
+        RequestSignature.index(instance)
+
+
+def publish_counter_changes(changes):
+    """Notifica a los dashboards conectados los cambios en los contadores"""
+    for key, delta in changes.items():
+        publish_on_commit(f'stats:{key}', dict(delta, type='delta'))
+
+
+@receiver(post_save, sender=ServiceRequest)
+def send_status_notification(sender, instance, created, raw=False, **kwargs):
+    """
+    Encola notificaciones por email cuando se crea o cambia de estado una
+    solicitud. Se guardan en la misma transacción y las envía la tarea
+    deliver_queued_emails (manage.py runworker) o el comando send_queued_emails.
+    """
+    if raw:
+        return
+
+    if created:
+        # El aviso al personal se arma en segundo plano: necesita el tipo de
+        # servicio y el ciudadano, que la petición no tiene por qué cargar
+        if settings.STAFF_NOTIFICATION_EMAILS:
+            queue_new_request_emails.delay(instance.pk)
+
+    elif instance.has_changed('status'):
         # Notificación de cambio de estado
         subject = f"Actualización de Solicitud: {instance.ticket_number}"
         message = f"""
@@ -75,7 +151,12 @@ def send_status_notification(sender, instance, created, **kwargs):
         Puede ver más detalles en el sistema.
         """
 
-        # Enviar al ciudadano
+        # Enviar al ciudadano; si aún no se envió el aviso anterior, se
+        # reemplaza por este con el estado más reciente
         if instance.citizen.email:
-            # send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [instance.citizen.email])
-            pass
\ No newline at end of file
+            EmailOutbox.enqueue(
+                instance.citizen.email, subject, message,
+                dedupe_key=f'request-status:{instance.pk}',
+                related_request=instance,
+            )
+            deliver_queued_emails.delay()
@@ -0,0 +1,37 @@
+from django.conf import settings
+from apps.tasks.decorators import task
+from .models import ServiceRequest, EmailOutbox
+from .outbox import deliver_batch
+
+
+@task(unique=True, priority=10)
+def deliver_queued_emails(batch_size=50):
+    """Envía los correos en cola (EmailOutbox) hasta vaciarla"""
+    while any(deliver_batch(batch_size)):
+        pass
+
+
+@task
+def queue_new_request_emails(request_id):
+    """Encola el aviso de nueva solicitud para el personal municipal"""
+    service_request = ServiceRequest.objects.select_related(
+        'service_type', 'citizen'
+    ).filter(pk=request_id).first()
+    if service_request is None:
+        return
+
+    subject = f"Nueva Solicitud Creada: {service_request.ticket_number}"
+    message = f"""
+        Se ha creado una nueva solicitud:
+
+        Ticket: {service_request.ticket_number}
+        Tipo: {service_request.get_request_type_display()}
+        Servicio: {service_request.service_type.name}
+        Ciudadano: {service_request.citizen.get_full_name()}
+
+        Descripción: {service_request.description[:200]}...
+        """
+
+    for email in settings.STAFF_NOTIFICATION_EMAILS:
+        EmailOutbox.enqueue(email, subject, message, related_request=service_request)
+    deliver_queued_emails.delay()
@@ -1,3 +1,943 @@
-from django.test import TestCase
+import json
+import os
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.assignments.models import TaskAssignment, TaskUpdate
+from apps.core.utils import geohash, minhash
+from apps.core.utils.cache import get_policy, invalidate_tags
+from apps.core.utils.events import get_broker
+from apps.core.utils.pagination import paginate_by_cursor, decode_cursor
+from apps.tasks.models import BackgroundTask
+from apps.tasks.worker import run_pending
+from .models import (
+    ServiceRequest, ServiceType, ServiceArea, RequestStatusHistory, RequestStatusCounter, EmailOutbox,
+    RequestComment, RequestSignature, RequestSignatureBand, RequestMerge,
+)
+from .duplicates import find_duplicates, merge_requests
+from .forms import RequestSearchForm
+from .lookups import service_areas
+from .timeline import build_timeline
+from .nearby import OPEN_STATUSES, cells_filter, nearby_requests
+from .outbox import deliver_batch
+from .search import search_requests
+from .tasks import deliver_queued_emails
+
+User = get_user_model()
+
+
+class ServiceRequestTestMixin:
+    """Datos base para las pruebas de solicitudes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user(
+            username='ciudadano', password='municipal2024', role='CITIZEN'
+        )
+        cls.manager = User.objects.create_user(
+            username='encargado', password='municipal2024', role='MANAGER'
+        )
+        cls.service_type = ServiceType.objects.create(name='Suministro de Agua')
+
+    @classmethod
+    def create_request(cls, **kwargs):
+        data = {
+            'citizen': cls.citizen,
+            'service_type': cls.service_type,
+            'request_type': 'REPAIR',
+            'title': 'Fuga de agua',
+            'description': 'Tubería rota frente a la escuela',
+            'address': 'Casco Urbano',
+        }
+        data.update(kwargs)
+        return ServiceRequest.objects.create(**data)
+
+
+class CursorPaginationTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        for index in range(7):
+            service_request = cls.create_request(title=f'Solicitud {index}')
+            # Dos solicitudes por instante para probar el desempate por id
+            ServiceRequest.objects.filter(pk=service_request.pk).update(
+                created_at=now - timedelta(minutes=index // 2)
+            )
+        cls.expected = list(
+            ServiceRequest.objects.order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+
+    def test_walks_forward_and_back_without_gaps(self):
+        queryset = ServiceRequest.objects.all()
+        pages = []
+        token = None
+        while True:
+            with self.assertNumQueries(1):
+                page = paginate_by_cursor(queryset, token, 3)
+            pages.append([obj.pk for obj in page])
+            if not page.has_next:
+                break
+            token = page.next_cursor
+
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+        self.assertEqual(len(pages), 3)
+
+        previous = paginate_by_cursor(queryset, page.previous_cursor, 3)
+        self.assertEqual([obj.pk for obj in previous], pages[1])
+        self.assertTrue(previous.has_previous)
+
+    def test_invalid_cursor_returns_first_page(self):
+        self.assertIsNone(decode_cursor('no-es-un-cursor'))
+        page = paginate_by_cursor(ServiceRequest.objects.all(), 'no-es-un-cursor', 3)
+        self.assertEqual([obj.pk for obj in page], self.expected[:3])
+        self.assertFalse(page.has_previous)
+
+    def test_list_view_cursor_mode_skips_exact_count(self):
+        self.client.force_login(self.manager)
+        url = reverse('requests:list')
+
+        response = self.client.get(url, {'paginacion': 'cursor'})
+        self.assertTrue(response.context['cursor_pagination'])
+        self.assertIsNone(response.context['paginator'])
+        self.assertIsNone(response.context['total_requests'])
+        first_page = [obj.pk for obj in response.context['requests']]
+        self.assertEqual(first_page, self.expected)
+
+        response = self.client.get(url)
+        self.assertEqual(response.context['total_requests'], 7)
+
+
+class RequestSearchTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.pipe = cls.create_request(
+            title='Fuga de agua potable',
+            description='La tubería principal tiene una fuga frente a la escuela'
+        )
+        cls.tree = cls.create_request(
+            title='Árbol caído',
+            description='Un árbol bloquea la calle después de la tormenta, hay agua'
+        )
+        cls.light = cls.create_request(
+            title='Lámpara apagada',
+            description='El poste de alumbrado de la esquina no enciende'
+        )
+
+    def search(self, term):
+        return list(search_requests(ServiceRequest.objects.all(), term).order_by('-search_rank'))
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search('agua'), [self.pipe, self.tree])
+
+    def test_ignores_accents_and_matches_prefixes(self):
+        self.assertEqual(self.search('arbol caido'), [self.tree])
+        self.assertEqual(self.search('lamp'), [self.light])
+
+    def test_exact_ticket_number_fast_path(self):
+        with self.assertNumQueries(1):
+            results = self.search(self.light.ticket_number.lower())
+        self.assertEqual(results, [self.light])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.light.title = 'Semáforo dañado'
+        self.light.save()
+        self.tree.delete()
+
+        self.assertEqual(self.search('lampara'), [])
+        self.assertEqual(self.search('semaforo'), [self.light])
+        self.assertEqual(self.search('tormenta'), [])
+
+    def test_list_view_orders_search_by_relevance(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('requests:list'), {'search_term': 'agua'})
+        self.assertEqual(list(response.context['requests']), [self.pipe, self.tree])
+
+        # El cursor ordena por fecha: una búsqueda conserva el orden por relevancia
+        for params, setting in (({'paginacion': 'cursor'}, False), ({}, True)):
+            with self.subTest(params=params), override_settings(REQUEST_LIST_CURSOR_PAGINATION=setting):
+                response = self.client.get(reverse('requests:list'), dict(params, search_term='agua'))
+                self.assertEqual(list(response.context['requests']), [self.pipe, self.tree])
+
+
+class FieldTrackingTests(ServiceRequestTestMixin, TestCase):
+
+    def setUp(self):
+        self.service_request = self.create_request()
+
+    def test_status_change_saves_without_reselecting_row(self):
+        service_request = ServiceRequest.objects.get(pk=self.service_request.pk)
+        service_request.status = 'IN_REVIEW'
+        self.assertTrue(service_request.has_changed('status'))
+        self.assertEqual(service_request.previous_value('status'), 'PENDING')
+
+        with CaptureQueriesContext(connection) as queries:
+            service_request.save()
+
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "requests_servicerequest"' in query['sql']
+        ]
+        self.assertEqual(selects, [])
+        self.assertFalse(service_request.has_changed('status'))
+        history = RequestStatusHistory.objects.filter(request=service_request).order_by('-id').first()
+        self.assertEqual((history.from_status, history.to_status), ('PENDING', 'IN_REVIEW'))
+
+    def test_save_without_status_change_adds_no_history(self):
+        service_request = ServiceRequest.objects.get(pk=self.service_request.pk)
+        service_request.notes = 'Sin cambio de estado'
+        service_request.save()
+        service_request.save()
+
+        self.assertEqual(RequestStatusHistory.objects.filter(request=service_request).count(), 1)
+
+    def test_unloaded_instance_falls_back_to_query(self):
+        service_request = ServiceRequest.objects.only('id', 'title').get(pk=self.service_request.pk)
+        service_request.refresh_from_db()
+        service_request.status = 'APPROVED'
+        service_request.save()
+
+        copy = ServiceRequest(**{
+            field.attname: getattr(service_request, field.attname)
+            for field in ServiceRequest._meta.concrete_fields
+        })
+        copy.status = 'COMPLETED'
+        copy.save()
+
+        transitions = list(RequestStatusHistory.objects.filter(
+            request=self.service_request
+        ).order_by('id').values_list('from_status', 'to_status'))
+        self.assertEqual(transitions, [
+            (None, 'PENDING'), ('PENDING', 'APPROVED'), ('APPROVED', 'COMPLETED'),
+        ])
+
+
+class StatusCounterTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.area = ServiceArea.objects.create(name='Zona 1')
+        yesterday = timezone.localdate() - timedelta(days=1)
+        cls.create_request()
+        cls.create_request(status='IN_PROGRESS', service_area=cls.area, expected_completion=yesterday)
+        cls.create_request(status='COMPLETED', service_area=cls.area)
+
+    def counts(self, key):
+        counter = RequestStatusCounter.get_for(key)
+        return counter.total, counter.pending, counter.in_progress, counter.completed, counter.overdue
+
+    def test_counters_follow_saves_and_deletes(self):
+        self.assertEqual(self.counts('global'), (3, 1, 1, 1, 1))
+        self.assertEqual(self.counts(f'area:{self.area.pk}'), (2, 0, 1, 1, 1))
+
+        service_request = ServiceRequest.objects.get(status='PENDING')
+        service_request.status = 'IN_PROGRESS'
+        service_request.service_area = self.area
+        service_request.save()
+        ServiceRequest.objects.get(status='COMPLETED').delete()
+
+        self.assertEqual(self.counts('global'), (2, 0, 2, 0, 1))
+        self.assertEqual(self.counts(f'area:{self.area.pk}'), (2, 0, 2, 0, 1))
+        self.assertEqual(self.counts(f'citizen:{self.citizen.pk}'), (2, 0, 2, 0, 1))
+
+    def test_overdue_is_recomputed_on_a_new_day(self):
+        RequestStatusCounter.get_for('global')
+        RequestStatusCounter.objects.filter(key='global').update(
+            overdue=0, overdue_date=timezone.localdate() - timedelta(days=1)
+        )
+        self.assertEqual(self.counts('global')[-1], 1)
+
+    def test_stats_api_is_a_single_lookup(self):
+        RequestStatusCounter.get_for('global')
+        RequestStatusCounter.get_for(f'citizen:{self.citizen.pk}')
+        url = reverse('requests:stats_api')
+
+        # Sesión, usuario y una búsqueda por llave primaria del contador
+        self.client.force_login(self.manager)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), {
+            'total': 3, 'pending': 1, 'in_progress': 1, 'completed': 1, 'overdue': 1,
+        })
+
+        self.client.force_login(self.citizen)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['total'], 3)
+
+    def test_reconcile_command_repairs_drift(self):
+        RequestStatusCounter.get_for('global')
+        RequestStatusCounter.objects.filter(key='global').update(pending=10, completed=0)
+
+        call_command('reconcile_request_counters', stdout=StringIO())
+
+        self.assertEqual(self.counts('global'), (3, 1, 1, 1, 1))
+        self.assertEqual(self.counts(f'area:{self.area.pk}'), (2, 0, 1, 1, 1))
+
+
+@override_settings(EVENT_STREAM_HEARTBEAT=0.01, EVENT_STREAM_MAX_DURATION=0.5)
+class StatsStreamTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.service_request = cls.create_request()
+
+    def next_event(self, stream):
+        """Siguiente evento del stream, omitiendo comentarios keep-alive"""
+        for chunk in stream:
+            chunk = chunk.decode()
+            if chunk.startswith('event:'):
+                name, data = chunk.strip().split('\n')
+                return name.split(': ', 1)[1], json.loads(data.split(': ', 1)[1])
+        return None
+
+    def test_stream_sends_snapshot_then_deltas(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('requests:stats_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+
+        self.assertEqual(self.next_event(stream), ('snapshot', {
+            'total': 1, 'pending': 1, 'in_progress': 0, 'completed': 0, 'overdue': 0,
+        }))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service_request.status = 'IN_PROGRESS'
+            self.service_request.save()
+
+        self.assertEqual(self.next_event(stream), ('delta', {'pending': -1, 'in_progress': 1}))
+        response.close()
+
+    def test_citizen_stream_only_sees_own_scope(self):
+        self.client.force_login(self.citizen)
+        response = self.client.get(reverse('requests:stats_stream'))
+        stream = iter(response.streaming_content)
+        self.assertEqual(self.next_event(stream)[0], 'snapshot')
+
+        get_broker().publish('stats:global', {'type': 'delta', 'pending': 1, 'total': 1})
+        get_broker().publish(f'stats:citizen:{self.citizen.pk}', {'type': 'delta', 'overdue': 1, 'total': 1})
+
+        self.assertEqual(self.next_event(stream), ('delta', {'total': 1}))
+        response.close()
+
+    @override_settings(EVENT_STREAM_MAX_CONNECTIONS=1)
+    def test_streams_are_capped_per_process(self):
+        self.client.force_login(self.manager)
+        url = reverse('requests:stats_stream')
+        first = self.client.get(url)
+        self.assertEqual(first['Content-Type'], 'text/event-stream')
+
+        # Sin hilos libres para otro stream: el navegador usa la API
+        rejected = self.client.get(url)
+        self.assertEqual(rejected.status_code, 503)
+
+        first.close()
+        second = self.client.get(url)
+        self.assertEqual(second['Content-Type'], 'text/event-stream')
+        second.close()
+
+    def test_subscription_overflow_requests_resync(self):
+        subscription = get_broker().subscribe(['stats:global'])
+        with subscription:
+            for _ in range(150):
+                get_broker().publish('stats:global', {'type': 'delta', 'pending': 1})
+            channel, event = subscription.get(timeout=0)
+        self.assertEqual(event, {'type': 'resync'})
+        self.assertEqual(get_broker().publish('stats:global', {}), 0)
+
+
+class CountingEmailBackend(LocmemEmailBackend):
+    """Backend locmem que cuenta conexiones y puede fallar los primeros envíos"""
+
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.opened = 0
+        self.is_open = False
+
+    def open(self):
+        if self.is_open:
+            return False
+        self.is_open = True
+        self.opened += 1
+        return True
+
+    def close(self):
+        self.is_open = False
+
+    def send_messages(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('SMTP no disponible')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailOutboxTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.citizen.email = 'ciudadano@example.com'
+        cls.citizen.save()
+
+    def change_status(self, service_request, status):
+        service_request.status = status
+        service_request.save()
+
+    def test_status_changes_are_queued_and_deduplicated(self):
+        service_request = self.create_request()
+        self.change_status(service_request, 'IN_REVIEW')
+        self.change_status(service_request, 'APPROVED')
+
+        self.assertEqual(mail.outbox, [])
+        pending = EmailOutbox.objects.get(status='PENDING')
+        self.assertIn('Aprobada', pending.body)
+
+        call_command('send_queued_emails', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ciudadano@example.com'])
+        self.assertIn('Aprobada', mail.outbox[0].body)
+        self.assertEqual(EmailOutbox.objects.get().status, 'SENT')
+
+    def test_batch_reuses_one_connection(self):
+        for index in range(3):
+            self.change_status(self.create_request(title=f'Solicitud {index}'), 'IN_REVIEW')
+
+        connection = CountingEmailBackend()
+        self.assertEqual(deliver_batch(connection=connection), (3, 0))
+        self.assertEqual(connection.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_delivery_is_retried_with_backoff(self):
+        self.change_status(self.create_request(), 'IN_REVIEW')
+
+        self.assertEqual(deliver_batch(connection=CountingEmailBackend(failures=1)), (0, 1))
+        email = EmailOutbox.objects.get()
+        self.assertEqual((email.status, email.attempts), ('PENDING', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_batch(connection=CountingEmailBackend()), (0, 0))
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_batch(connection=CountingEmailBackend(failures=1)), (0, 1))
+        self.assertEqual(EmailOutbox.objects.get().status, 'FAILED')
+
+    def test_worker_delivers_queued_emails(self):
+        self.change_status(self.create_request(), 'IN_REVIEW')
+        self.change_status(self.create_request(title='Otra'), 'IN_REVIEW')
+        # Una sola entrega pendiente para toda la cola
+        self.assertEqual(BackgroundTask.objects.filter(name=deliver_queued_emails.name).count(), 1)
+
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(STAFF_NOTIFICATION_EMAILS=['personal@example.com'])
+    def test_new_request_email_is_built_in_background(self):
+        service_request = self.create_request()
+        self.assertFalse(EmailOutbox.objects.exists())
+
+        run_pending()
+        self.assertEqual(mail.outbox[0].to, ['personal@example.com'])
+        self.assertIn(service_request.ticket_number, mail.outbox[0].subject)
+
+
+class NearbyRequestsTests(ServiceRequestTestMixin, TestCase):
+
+    CENTER = (14.6349, -90.5069)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        latitude, longitude = cls.CENTER
+        # ~0.1 km, ~0.5 km, ~0.9 km y ~3 km al norte del centro
+        cls.near = cls.create_request(title='Cerca', latitude='14.635800', longitude='-90.506900')
+        cls.middle = cls.create_request(title='Media', latitude='14.639400', longitude='-90.506900')
+        cls.edge = cls.create_request(title='Borde', latitude='14.643000', longitude='-90.506900')
+        cls.far = cls.create_request(title='Lejos', latitude='14.662000', longitude='-90.506900')
+        cls.closed = cls.create_request(
+            title='Cerrada', latitude='14.635000', longitude='-90.506900', status='COMPLETED'
+        )
+        cls.unlocated = cls.create_request(title='Sin ubicación')
+
+    def test_geohash_maintained_on_save(self):
+        self.assertEqual(self.near.geohash, geohash.encode(14.6358, -90.5069, 8))
+        self.assertEqual(self.unlocated.geohash, '')
+
+        self.near.latitude = '14.700000'
+        self.near.save(update_fields=['latitude'])
+        self.near.refresh_from_db()
+        self.assertEqual(self.near.geohash, geohash.encode(14.7, -90.5069, 8))
+
+    def test_covering_cells_contain_points_in_radius(self):
+        latitude, longitude = self.CENTER
+        cells = geohash.covering_cells(latitude, longitude, 1.0)
+        self.assertLessEqual(len(cells), 32)
+        for request in (self.near, self.middle, self.edge):
+            self.assertTrue(any(request.geohash.startswith(cell) for cell in cells))
+
+    def test_open_requests_within_radius_sorted_by_distance(self):
+        results = nearby_requests(*self.CENTER, radius_km=1.0)
+
+        self.assertEqual([request for request, _ in results], [self.near, self.middle, self.edge])
+        distances = [distance for _, distance in results]
+        self.assertEqual(distances, sorted(distances))
+        self.assertLessEqual(distances[-1], 1.0)
+
+        self.assertEqual(len(nearby_requests(*self.CENTER, radius_km=1.0, limit=2)), 2)
+        self.assertIn(self.far, [request for request, _ in nearby_requests(*self.CENTER, radius_km=5.0)])
+
+    def test_candidates_pruned_by_cells(self):
+        # Una solicitud a ~100 km no debe llegar siquiera a los candidatos
+        distant = self.create_request(title='Otra ciudad', latitude='15.500000', longitude='-90.506900')
+        with CaptureQueriesContext(connection) as queries:
+            nearby_requests(*self.CENTER, radius_km=1.0)
+        self.assertNotIn(distant.geohash[:4], queries.captured_queries[0]['sql'])
+
+    def test_prefix_end_bounds_cell(self):
+        self.assertEqual(geohash.prefix_end('9fxe'), '9fxf')
+        self.assertEqual(geohash.prefix_end('9fzz'), '9g')
+        self.assertIsNone(geohash.prefix_end('zz'))
+        inside, outside = '9fzzy0', '9g0000'
+        self.assertTrue('9fz' <= inside < geohash.prefix_end('9fz') <= outside)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Plan de consulta de SQLite')
+    def test_candidates_use_geohash_index(self):
+        latitude, longitude = self.CENTER
+        ServiceRequest.objects.bulk_create([
+            ServiceRequest(
+                ticket_number=f'PLAN-{index:04d}', citizen=self.citizen, service_type=self.service_type,
+                request_type='REPAIR', title='Plan', description='Plan', address='Casco Urbano',
+                geohash=geohash.encode(latitude + index * 0.0005, longitude - index * 0.0005, 8),
+                status=OPEN_STATUSES[index % len(OPEN_STATUSES)],
+            )
+            for index in range(500)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {ServiceRequest._meta.db_table}')
+        plan = ServiceRequest.objects.filter(
+            cells_filter(latitude, longitude, 1.0), status__in=OPEN_STATUSES
+        ).order_by().values_list('id').explain()
+        self.assertIn('request_geohash_status_idx', plan)
+
+    def test_api(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('requests:nearby_api'), {'ticket': self.near.ticket_number})
+        self.assertEqual(response.status_code, 200)
+        tickets = [row['ticket'] for row in response.json()['results']]
+        self.assertEqual(tickets, [self.middle.ticket_number, self.edge.ticket_number])
+
+        response = self.client.get(reverse('requests:nearby_api'), {'lat': 'x', 'lon': '-90.5'})
+        self.assertEqual(response.status_code, 400)
+        for params in ({'lat': 'nan', 'lon': '-90.5'}, {'lat': '14.63', 'lon': 'inf'},
+                       {'lat': '14.63', 'lon': '-90.5', 'radio': 'nan'},
+                       {'lat': '14.63', 'lon': '-90.5', 'radio': 'inf'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('requests:nearby_api'), params).status_code, 400)
+
+        self.client.force_login(self.citizen)
+        response = self.client.get(reverse('requests:nearby_api'), {'lat': '14.63', 'lon': '-90.5'})
+        self.assertEqual(response.status_code, 302)
+
+    @unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), 'Benchmark de 1M de puntos: definir RUN_BENCHMARKS=1')
+    def test_benchmark_one_million_points(self):
+        out = StringIO()
+        call_command('benchmark_nearby_requests', points=1000000, queries=20, scans=3, stdout=out)
+        self.assertNotIn('resultados distintos', out.getvalue())
+
+
+class DuplicateDetectionTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.original = cls.create_request(
+            title='Fuga de agua en tubería principal',
+            description='La tubería principal frente a la escuela del barrio El Centro está rota y sale mucha agua',
+            latitude='14.634900', longitude='-90.506900',
+        )
+        cls.other = cls.create_request(
+            title='Poste de alumbrado caído',
+            description='El poste de la esquina del mercado se cayó con el viento',
+        )
+
+    def report(self, **kwargs):
+        data = {
+            'service_type': self.service_type,
+            'title': 'Fuga de agua en la tubería principal',
+            'description': 'Tuberia principal rota frente a la escuela del barrio El Centro, sale agua',
+            'latitude': '14.635200', 'longitude': '-90.506900',
+        }
+        data.update(kwargs)
+        return ServiceRequest(**data)
+
+    def test_signature_index_follows_open_requests(self):
+        signature = RequestSignature.objects.get(pk=self.original.pk)
+        self.assertEqual(len(signature.minhash), minhash.NUM_PERMUTATIONS)
+        self.assertEqual(RequestSignatureBand.objects.filter(signature=signature).count(), minhash.BANDS)
+
+        self.original.status = 'COMPLETED'
+        self.original.save()
+        self.assertFalse(RequestSignature.objects.filter(pk=self.original.pk).exists())
+        self.assertFalse(RequestSignatureBand.objects.filter(signature_id=self.original.pk).exists())
+
+    def test_similar_nearby_request_is_candidate(self):
+        duplicates = find_duplicates(self.report())
+        self.assertEqual([candidate.request for candidate in duplicates], [self.original])
+        self.assertGreaterEqual(duplicates[0].similarity, 0.5)
+        self.assertLess(duplicates[0].distance_km, 0.1)
+
+    def test_other_type_distance_or_text_is_not_candidate(self):
+        other_type = ServiceType.objects.create(name='Drenajes')
+        self.assertEqual(find_duplicates(self.report(service_type=other_type)), [])
+        self.assertEqual(find_duplicates(self.report(latitude='14.700000')), [])
+        self.assertEqual(find_duplicates(self.report(
+            title='Basura acumulada', description='Nadie recoge la basura del parque central'
+        )), [])
+
+    def test_lookup_does_not_scan_open_requests(self):
+        for index in range(30):
+            self.create_request(title=f'Bache número {index}', description=f'Bache profundo en la calle {index}')
+        with CaptureQueriesContext(connection) as queries:
+            find_duplicates(self.report())
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('requests_servicerequest"."title', queries.captured_queries[0]['sql'])
+
+    def test_create_view_shows_candidates_before_creating(self):
+        self.client.force_login(self.citizen)
+        data = {
+            'service_type': self.service_type.pk, 'request_type': 'REPAIR', 'priority': 'MEDIUM',
+            'title': 'Fuga de agua en la tubería principal',
+            'description': 'Tuberia principal rota frente a la escuela del barrio El Centro, sale agua',
+            'address': 'Barrio El Centro', 'latitude': '14.635200', 'longitude': '-90.506900',
+        }
+        response = self.client.post(reverse('requests:create'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([candidate.request for candidate in response.context['duplicates']], [self.original])
+        self.assertEqual(ServiceRequest.objects.count(), 2)
+
+        response = self.client.post(reverse('requests:create'), dict(data, ignore_duplicates='True'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ServiceRequest.objects.count(), 3)
+
+    def test_merge_moves_activity_to_survivor(self):
+        duplicate = self.create_request(title='Fuga de agua', description='Tubería rota')
+        RequestComment.objects.create(request=duplicate, user=self.citizen, comment='Sigue saliendo agua')
+
+        self.client.force_login(self.manager)
+        response = self.client.post(
+            reverse('requests:merge', args=[duplicate.ticket_number]),
+            {'survivor': self.original.ticket_number},
+        )
+        self.assertRedirects(response, reverse('requests:detail', args=[self.original.ticket_number]))
+
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.status, 'CANCELLED')
+        self.assertEqual(RequestMerge.objects.get(duplicate=duplicate).survivor, self.original)
+        self.assertTrue(self.original.comments.filter(comment='Sigue saliendo agua').exists())
+        self.assertEqual(self.original.status_history.filter(reason='Solicitud creada').count(), 2)
+        cancelled = duplicate.status_history.get(to_status='CANCELLED')
+        self.assertEqual(cancelled.changed_by, self.manager)
+        self.assertEqual(cancelled.reason, f'Duplicada de {self.original.ticket_number}')
+        self.assertFalse(RequestSignature.objects.filter(pk=duplicate.pk).exists())
+
+        response = self.client.get(reverse('requests:detail', args=[duplicate.ticket_number]))
+        self.assertContains(response, 'Esta solicitud se fusionó con el ticket')
+
+    def test_merge_rejects_closed_requests(self):
+        self.other.status = 'COMPLETED'
+        self.other.save()
+        with self.assertRaises(ValueError):
+            merge_requests(self.original, self.other, self.manager)
+        with self.assertRaises(ValueError):
+            merge_requests(self.original, self.original, self.manager)
+
+
+class RequestTimelineTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.technician = User.objects.create_user(
+            username='tecnico', password='municipal2024', role='TECHNICIAN'
+        )
+        cls.service_request = cls.create_request()
+        assignment = TaskAssignment.objects.create(
+            request=cls.service_request, assigned_by=cls.manager, assigned_to=cls.technician
+        )
+        start = timezone.now() - timedelta(hours=1)
+
+        def at(model, pk, minutes, field='created_at'):
+            model.objects.filter(pk=pk).update(**{field: start + timedelta(minutes=minutes)})
+
+        at(RequestStatusHistory, cls.service_request.status_history.get().pk, 0)
+        cls.public = RequestComment.objects.create(request=cls.service_request, user=cls.citizen, comment='¿Hay avances?')
+        at(RequestComment, cls.public.pk, 10)
+        cls.internal = RequestComment.objects.create(
+            request=cls.service_request, user=cls.manager, comment='Revisar presupuesto', is_internal=True
+        )
+        at(RequestComment, cls.internal.pk, 20)
+        cls.update = TaskUpdate.objects.create(
+            assignment=assignment, updated_by=cls.technician, status='IN_PROGRESS',
+            progress_percentage=50, description='Se cambió el tramo de tubería',
+        )
+        at(TaskUpdate, cls.update.pk, 20)
+
+    def kinds(self, page):
+        return [(entry.kind, entry.pk) for entry in page]
+
+    def test_merged_stream_is_chronological(self):
+        page = build_timeline(self.service_request, self.manager)
+        self.assertEqual(self.kinds(page), [
+            ('task_update', self.update.pk),
+            ('comment', self.internal.pk),
+            ('comment', self.public.pk),
+            ('status', self.service_request.status_history.get().pk),
+        ])
+        self.assertEqual(page.entries[0].item.description, 'Se cambió el tramo de tubería')
+        self.assertIsNone(page.next_cursor)
+
+    def test_citizen_does_not_see_internal_activity(self):
+        page = build_timeline(self.service_request, self.citizen)
+        self.assertEqual([entry.kind for entry in page], ['comment', 'status'])
+        self.assertEqual(page.entries[0].item, self.public)
+
+    def test_pages_continue_with_cursor(self):
+        first = build_timeline(self.service_request, self.manager, page_size=1)
+        second = build_timeline(self.service_request, self.manager, first.next_cursor, page_size=2)
+        third = build_timeline(self.service_request, self.manager, second.next_cursor, page_size=2)
+        self.assertEqual(
+            self.kinds(first) + self.kinds(second) + self.kinds(third),
+            self.kinds(build_timeline(self.service_request, self.manager)),
+        )
+        self.assertIsNone(third.next_cursor)
+
+    def test_query_count_does_not_grow_with_activity(self):
+        with CaptureQueriesContext(connection) as small:
+            build_timeline(self.service_request, self.manager)
+        for index in range(30):
+            RequestComment.objects.create(request=self.service_request, user=self.citizen, comment=f'Comentario {index}')
+        with CaptureQueriesContext(connection) as busy:
+            page = build_timeline(self.service_request, self.manager)
+        self.assertEqual(len(page), 20)
+        self.assertIsNotNone(page.next_cursor)
+        self.assertLessEqual(len(busy), 5)
+        self.assertLessEqual(len(busy), len(small) + 1)
+
+    def test_detail_and_load_older_views(self):
+        for index in range(25):
+            RequestComment.objects.create(request=self.service_request, user=self.citizen, comment=f'Comentario {index}')
+        self.client.force_login(self.citizen)
+        response = self.client.get(reverse('requests:detail', args=[self.service_request.ticket_number]))
+        self.assertContains(response, 'Cargar anteriores')
+        self.assertNotContains(response, 'Revisar presupuesto')
+
+        cursor = response.context['timeline'].next_cursor
+        response = self.client.get(
+            reverse('requests:timeline', args=[self.service_request.ticket_number]), {'cursor': cursor}
+        )
+        self.assertContains(response, '¿Hay avances?')
+        self.assertNotContains(response, 'Se cambió el tramo')
+
+
+class ConditionalGetTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.service_request = cls.create_request()
+        cls.url = reverse('requests:detail', args=[cls.service_request.ticket_number])
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def login(self, user):
+        # La primera visita fija la cookie CSRF, que forma parte del ETag
+        self.client.force_login(user)
+        self.client.get(self.url)
+
+    def test_detail_not_modified_without_rendering(self):
+        self.login(self.citizen)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+        # Sesión, usuario y la consulta de validadores
+        with self.assertNumQueries(3):
+            response = self.revalidate(self.url, response)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_detail_changes_with_activity_and_viewer(self):
+        self.login(self.citizen)
+        first = self.client.get(self.url)
+
+        RequestComment.objects.create(request=self.service_request, user=self.manager, comment='En camino')
+        self.assertEqual(self.revalidate(self.url, first).status_code, 200)
+
+        second = self.client.get(self.url)
+        self.login(self.manager)
+        self.assertEqual(self.revalidate(self.url, second).status_code, 200)
+
+    def test_detail_changes_with_new_duplicate_candidate(self):
+        self.login(self.manager)
+        response = self.client.get(self.url)
+        self.assertEqual(self.revalidate(self.url, response).status_code, 304)
+
+        duplicate = self.create_request()
+        response = self.revalidate(self.url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'Fusionar esta solicitud en {duplicate.ticket_number}')
+
+    def test_pending_messages_render_full_page(self):
+        self.login(self.citizen)
+        # Un aviso que no cambia la solicitud (no se puede cancelar)
+        self.service_request.status = 'IN_PROGRESS'
+        self.service_request.save()
+        response = self.client.get(self.url)
+        self.client.post(reverse('requests:cancel', args=[self.service_request.ticket_number]))
+        response = self.revalidate(self.url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'no puede ser cancelada')
+
+    def test_stats_api_revalidates_with_counter_version(self):
+        self.client.force_login(self.manager)
+        url = reverse('requests:stats_api')
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        self.create_request()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 2)
+
+
+class RequestListFragmentCacheTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.service_request = cls.create_request()
+
+    def setUp(self):
+        caches['fragments'].clear()
+        self.url = reverse('requests:list')
+
+    def test_row_is_reused_until_request_is_saved(self):
+        self.client.force_login(self.manager)
+        self.assertContains(self.client.get(self.url), 'Fuga de agua')
+
+        # Sin pasar por save() updated_at no cambia: la fila sale de la caché
+        ServiceRequest.objects.filter(pk=self.service_request.pk).update(title='Bache profundo')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Fuga de agua')
+        self.assertNotContains(response, 'Bache profundo')
+
+        self.service_request.refresh_from_db()
+        self.service_request.save()
+        self.assertContains(self.client.get(self.url), 'Bache profundo')
+
+    def test_row_follows_related_labels(self):
+        self.client.force_login(self.manager)
+        self.client.get(self.url)
+
+        self.service_type.name = 'Agua potable'
+        self.service_type.save()
+        self.citizen.first_name, self.citizen.last_name = 'Ana', 'López'
+        self.citizen.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Agua potable')
+        self.assertContains(response, 'Ana López')
+
+    def test_row_varies_by_role(self):
+        self.client.force_login(self.manager)
+        self.assertContains(self.client.get(self.url), 'bi-person"></i> ciudadano')
+
+        # El ciudadano no ve la fila que se guardó para el personal
+        self.client.force_login(self.citizen)
+        self.assertNotContains(self.client.get(self.url), 'bi-person"></i> ciudadano')
+
+
+POLICY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'views': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-politicas'},
+}
+
+
+class CachePolicyTests(ServiceRequestTestMixin, TestCase):
+
+    @override_settings(CACHES=POLICY_CACHES)
+    def test_tags_invalidate_policy_entries(self):
+        policy = get_policy('lookups')
+        policy.cache.clear()
+        self.assertEqual(policy.get_or_set(lambda: ['uno'], 'clave'), ['uno'])
+        self.assertEqual(policy.get_or_set(lambda: ['dos'], 'clave'), ['uno'])
+
+        invalidate_tags('lookups')
+        self.assertEqual(policy.get_or_set(lambda: ['dos'], 'clave'), ['dos'])
+
+    def test_lookup_choices_come_from_cache(self):
+        ServiceArea.objects.create(name='Zona 1')
+        str(RequestSearchForm()['service_area'])
+        with self.assertNumQueries(0):
+            form = RequestSearchForm()
+            self.assertIn('Zona 1', str(form['service_area']))
+
+        # Guardar un catálogo invalida la etiqueta 'lookups'
+        ServiceArea.objects.create(name='Zona 2')
+        self.assertIn('Zona 2', str(RequestSearchForm()['service_area']))
+
+
+class LookupTableTests(ServiceRequestTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.area = ServiceArea.objects.create(name='Zona 1')
+        cls.inactive_area = ServiceArea.objects.create(name='Zona 2', is_active=False)
+
+    def test_process_copy_reloaded_when_version_changes(self):
+        rows = service_areas.all()
+        self.assertIs(service_areas.all(), rows)
+
+        ServiceArea.objects.create(name='Zona 3')
+        self.assertEqual([area.name for area in service_areas.active()], ['Zona 1', 'Zona 3'])
+
+    def test_search_form_validates_without_queries(self):
+        service_areas.all()
+        with self.assertNumQueries(0):
+            form = RequestSearchForm({'service_area': self.area.pk})
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['service_area'], self.area)
+        # Cada formulario recibe su propia instancia, no la copia del proceso
+        self.assertFalse(any(row is form.cleaned_data['service_area'] for row in service_areas.all()))
+
+        form = RequestSearchForm({'service_area': self.inactive_area.pk})
+        self.assertIn('service_area', form.errors)
+
+    def test_list_view_builds_search_form_once(self):
+        self.client.force_login(self.manager)
+        with mock.patch('apps.requests.views.RequestSearchForm', wraps=RequestSearchForm) as form_class:
+            response = self.client.get(reverse('requests:list'), {'service_area': self.area.pk})
+        self.assertEqual(form_class.call_count, 1)
+        self.assertIn('selected', str(response.context['search_form']['service_area']))
 
-# Create your tests here.
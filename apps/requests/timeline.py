@@ -0,0 +1,160 @@
+"""
+Línea de tiempo de una solicitud: comentarios, cambios de estado, imágenes
+y actualizaciones de la tarea asignada en un solo flujo cronológico.
+
+Una consulta UNION ALL trae (tipo, id, fecha) de la página pedida ya
+ordenada y luego se carga cada tipo con una consulta propia, de modo que
+una página cuesta como máximo cinco consultas sin importar cuánta actividad
+tenga el ticket. La paginación es por cursor (fecha, tipo, id) hacia atrás.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.db.models import CharField, F, Q, Value
+from django.utils.dateparse import parse_datetime
+
+from apps.assignments.models import TaskUpdate
+from .models import RequestComment, RequestImage, RequestStatusHistory
+
+TIMELINE_PAGE_SIZE = 20
+
+STAFF_ROLES = ['ADMIN', 'MANAGER', 'TECHNICIAN']
+
+
+@dataclass
+class TimelineEntry:
+    kind: str
+    pk: int
+    created_at: object
+    item: object = None
+
+    @property
+    def template(self):
+        return f'requests/timeline/{self.kind}.html'
+
+
+@dataclass
+class TimelinePage:
+    entries: list
+    next_cursor: str = None
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def encode_timeline_cursor(entry):
+    payload = json.dumps([entry.created_at.isoformat(), entry.kind, entry.pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_timeline_cursor(token):
+    """Returns: tuple (created_at, kind, pk) o None si el cursor no es válido"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, kind, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if created_at is None or kind not in SOURCES:
+        return None
+    return created_at, kind, pk
+
+
+def _comments(service_request, user):
+    queryset = RequestComment.objects.filter(request=service_request)
+    if user.role not in STAFF_ROLES:
+        queryset = queryset.filter(is_internal=False)
+    return queryset, 'created_at', lambda ids: RequestComment.objects.select_related('user').in_bulk(ids)
+
+
+def _status_changes(service_request, user):
+    return (
+        RequestStatusHistory.objects.filter(request=service_request), 'created_at',
+        lambda ids: RequestStatusHistory.objects.select_related('changed_by').in_bulk(ids),
+    )
+
+
+def _images(service_request, user):
+    return (
+        RequestImage.objects.filter(request=service_request), 'uploaded_at',
+        lambda ids: RequestImage.objects.select_related('uploaded_by').in_bulk(ids),
+    )
+
+
+def _task_updates(service_request, user):
+    # El avance de la tarea es información interna del personal
+    queryset = TaskUpdate.objects.filter(assignment__request=service_request)
+    if user.role not in STAFF_ROLES:
+        queryset = queryset.none()
+    return queryset, 'created_at', lambda ids: TaskUpdate.objects.select_related('updated_by').in_bulk(ids)
+
+
+# Con la misma fecha, las filas se desempatan por tipo (orden alfabético) e id
+SOURCES = {
+    'comment': _comments,
+    'image': _images,
+    'status': _status_changes,
+    'task_update': _task_updates,
+}
+
+
+def _after_cursor(kind, date_field, cursor):
+    """Condición para las filas de un tipo anteriores al cursor"""
+    created_at, cursor_kind, pk = cursor
+    older = Q(**{f'{date_field}__lt': created_at})
+    if kind < cursor_kind:
+        return older | Q(**{date_field: created_at})
+    if kind == cursor_kind:
+        return older | Q(**{date_field: created_at, 'pk__lt': pk})
+    return older
+
+
+def build_timeline(service_request, user, cursor=None, page_size=TIMELINE_PAGE_SIZE):
+    """
+    Página de la línea de tiempo, de lo más reciente a lo más antiguo.
+
+    Args:
+        service_request: Solicitud
+        user: Usuario que consulta (los ciudadanos no ven comentarios
+            internos ni el avance de la tarea)
+        cursor: Cursor de la página anterior (next_cursor) o None
+    """
+    cursor = decode_timeline_cursor(cursor) if isinstance(cursor, str) else cursor
+
+    parts = []
+    loaders = {}
+    for kind, source in SOURCES.items():
+        queryset, date_field, loader = source(service_request, user)
+        if cursor is not None:
+            queryset = queryset.filter(_after_cursor(kind, date_field, cursor))
+        parts.append(
+            queryset.order_by().annotate(
+                entry_kind=Value(kind, output_field=CharField()),
+                entry_at=F(date_field),
+            ).values_list('entry_kind', 'pk', 'entry_at')
+        )
+        loaders[kind] = loader
+
+    rows = list(
+        parts[0].union(*parts[1:], all=True).order_by('-entry_at', '-entry_kind', '-pk')[:page_size + 1]
+    )
+    has_more = len(rows) > page_size
+    entries = [TimelineEntry(kind, pk, created_at) for kind, pk, created_at in rows[:page_size]]
+
+    for kind, loader in loaders.items():
+        ids = [entry.pk for entry in entries if entry.kind == kind]
+        if ids:
+            items = loader(ids)
+            for entry in entries:
+                if entry.kind == kind:
+                    entry.item = items[entry.pk]
+
+    return TimelinePage(entries, encode_timeline_cursor(entries[-1]) if has_more else None)
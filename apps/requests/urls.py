@@ -3,11 +3,15 @@ from .views import (
     ServiceRequestListView,
     ServiceRequestDetailView,
     ServiceRequestCreateView,
+    request_timeline,
     add_request_image,
     add_request_comment,
     update_request_status,
     cancel_request,
+    merge_request,
     dashboard_stats_api,
+    dashboard_stats_stream,
+    nearby_requests_api,
 )
 
 app_name = 'requests'
@@ -19,11 +23,15 @@ urlpatterns = [
     path('<str:ticket_number>/', ServiceRequestDetailView.as_view(), name='detail'),
     
     # Acciones en solicitudes
+    path('<str:ticket_number>/actividad/', request_timeline, name='timeline'),
     path('<str:ticket_number>/imagen/', add_request_image, name='add_image'),
     path('<str:ticket_number>/comentario/', add_request_comment, name='add_comment'),
     path('<str:ticket_number>/estado/', update_request_status, name='update_status'),
     path('<str:ticket_number>/cancelar/', cancel_request, name='cancel'),
+    path('<str:ticket_number>/fusionar/', merge_request, name='merge'),
     
     # API
     path('api/stats/', dashboard_stats_api, name='stats_api'),
+    path('api/stats/stream/', dashboard_stats_stream, name='stats_stream'),
+    path('api/cercanas/', nearby_requests_api, name='nearby_api'),
 ]
\ No newline at end of file
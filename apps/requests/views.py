@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -6,11 +8,23 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.urls import reverse_lazy, reverse
 from django.http import JsonResponse, HttpResponseForbidden
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Max, OuterRef, Subquery
+from django.conf import settings
 from django.utils import timezone
-from .models import ServiceRequest, RequestImage, ServiceType, ServiceArea, RequestComment, RequestStatusHistory
+from django.utils.decorators import method_decorator
+from .models import ServiceRequest, RequestImage, ServiceType, ServiceArea, RequestComment, RequestStatusHistory, RequestStatusCounter, RequestSignature
 from .forms import ServiceRequestForm, RequestImageForm, RequestCommentForm, RequestStatusForm, RequestSearchForm
 from apps.authentication.decorators import role_required
+from apps.core.utils.pagination import paginate_by_cursor, estimate_count
+from apps.core.utils.params import coordinate_params, float_param
+from apps.core.utils.events import event_stream_response
+from apps.core.utils.cache import cache_policy
+from apps.core.utils.conditional import conditional_view
+from apps.assignments.models import TaskAssignment, TaskUpdate
+from .search import search_requests
+from .nearby import nearby_requests
+from .duplicates import find_duplicates, merge_requests
+from .timeline import build_timeline
 
 class ServiceRequestListView(LoginRequiredMixin, ListView):
     """Vista para listar solicitudes"""
@@ -29,15 +43,16 @@ class ServiceRequestListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(citizen=self.request.user)
         
         # Aplicar filtros de búsqueda
-        form = RequestSearchForm(self.request.GET)
+        ordering = ['-created_at', '-id']
+        self.ranked = False
+        # El mismo formulario se muestra en la plantilla
+        form = self.search_form = RequestSearchForm(self.request.GET)
         if form.is_valid():
             search_term = form.cleaned_data.get('search_term')
             if search_term:
-                queryset = queryset.filter(
-                    Q(ticket_number__icontains=search_term) |
-                    Q(title__icontains=search_term) |
-                    Q(description__icontains=search_term)
-                )
+                queryset = search_requests(queryset, search_term)
+                ordering = ['-search_rank'] + ordering
+                self.ranked = True
             
             status = form.cleaned_data.get('status')
             if status:
@@ -59,34 +74,108 @@ class ServiceRequestListView(LoginRequiredMixin, ListView):
             if date_to:
                 queryset = queryset.filter(created_at__date__lte=date_to)
         
-        return queryset.order_by('-created_at')
-    
+        return queryset.order_by(*ordering)
+
+    def use_cursor_pagination(self):
+        """
+        Paginación por cursor: activada por configuración o con
+        ?paginacion=cursor. El cursor sigue (-created_at, -id), así que los
+        resultados de una búsqueda, ordenados por relevancia, usan páginas
+        numeradas.
+        """
+        if self.ranked:
+            return False
+        return (
+            getattr(settings, 'REQUEST_LIST_CURSOR_PAGINATION', False)
+            or self.request.GET.get('paginacion') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        page = paginate_by_cursor(queryset, self.request.GET.get('cursor'), page_size)
+        return None, page, page.object_list, page.has_next or page.has_previous
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = RequestSearchForm(self.request.GET)
-        context['total_requests'] = self.get_queryset().count()
+        context['search_form'] = self.search_form
+
+        if context['paginator'] is not None:
+            context['total_requests'] = context['paginator'].count
+        else:
+            # Modo cursor: sin COUNT exacto, solo un estimado para la tabla completa
+            context['cursor_pagination'] = True
+            filters = self.request.GET.copy()
+            for param in ('cursor', 'page', 'paginacion'):
+                filters.pop(param, None)
+            has_filters = any(filters.values())
+            if self.request.user.role != 'CITIZEN' and not has_filters:
+                context['total_requests'] = estimate_count(ServiceRequest)
+            filters['paginacion'] = 'cursor'
+            context['pagination_querystring'] = filters.urlencode()
         
-        # Estadísticas básicas
+        # Estadísticas básicas (contadores materializados)
         if self.request.user.role == 'CITIZEN':
-            user_requests = ServiceRequest.objects.filter(citizen=self.request.user)
+            counter = RequestStatusCounter.get_for(RequestStatusCounter.citizen_key(self.request.user.pk))
             context['stats'] = {
-                'pending': user_requests.filter(status='PENDING').count(),
-                'in_progress': user_requests.filter(status='IN_PROGRESS').count(),
-                'completed': user_requests.filter(status='COMPLETED').count(),
+                'pending': counter.pending,
+                'in_progress': counter.in_progress,
+                'completed': counter.completed,
             }
         else:
             # Estadísticas para personal municipal
+            counter = RequestStatusCounter.get_for(RequestStatusCounter.global_key())
             context['stats'] = {
-                'pending': ServiceRequest.objects.filter(status='PENDING').count(),
-                'in_progress': ServiceRequest.objects.filter(status='IN_PROGRESS').count(),
-                'overdue': ServiceRequest.objects.filter(
-                    expected_completion__lt=timezone.now().date(),
-                    status__in=['PENDING', 'IN_PROGRESS']
-                ).count(),
+                'pending': counter.pending,
+                'in_progress': counter.in_progress,
+                'overdue': counter.overdue,
             }
         
         return context
 
+def _latest(model, field, lookup='request'):
+    """Subconsulta con la fecha más reciente de un modelo relacionado"""
+    return Subquery(
+        model.objects.filter(**{lookup: OuterRef('pk')}).order_by(f'-{field}').values(field)[:1]
+    )
+
+
+def _request_detail_validators(request, ticket_number):
+    """
+    Validadores del detalle: fecha de la solicitud y de su última actividad
+    (y, para quien ve posibles duplicados, de las firmas del mismo tipo), en
+    una sola consulta por el índice único del ticket.
+    """
+    queryset = ServiceRequest.objects.filter(ticket_number=ticket_number)
+    if request.user.role == 'CITIZEN':
+        queryset = queryset.filter(citizen=request.user)
+    fields = ['updated_at', 'last_comment', 'last_status', 'last_image', 'last_task_update', 'assignment_updated']
+    queryset = queryset.annotate(
+        last_comment=_latest(RequestComment, 'created_at'),
+        last_status=_latest(RequestStatusHistory, 'created_at'),
+        last_image=_latest(RequestImage, 'uploaded_at'),
+        last_task_update=_latest(TaskUpdate, 'created_at', 'assignment__request'),
+        assignment_updated=_latest(TaskAssignment, 'updated_at'),
+    )
+    if request.user.role in ['ADMIN', 'MANAGER']:
+        # Los posibles duplicados dependen de las firmas abiertas del mismo tipo:
+        # una nueva, editada o retirada cambia la última fecha o el total
+        signatures = RequestSignature.objects.filter(
+            request__service_type=OuterRef('service_type')
+        ).order_by().values('request__service_type')
+        queryset = queryset.annotate(
+            last_signature=Subquery(signatures.annotate(latest=Max('updated_at')).values('latest')),
+            signature_count=Subquery(signatures.annotate(total=Count('pk')).values('total')),
+        )
+        fields += ['last_signature', 'signature_count']
+    row = queryset.values_list(*fields).first()
+    if row is None:
+        return None
+    return row, max(value for value in row if isinstance(value, datetime))
+
+
+@method_decorator(conditional_view(_request_detail_validators), name='dispatch')
 class ServiceRequestDetailView(LoginRequiredMixin, DetailView):
     """Vista para ver detalles de una solicitud"""
     model = ServiceRequest
@@ -97,10 +186,9 @@ class ServiceRequestDetailView(LoginRequiredMixin, DetailView):
     
     def get_queryset(self):
         queryset = ServiceRequest.objects.select_related(
-            'citizen', 'service_type', 'service_area', 'assigned_to', 'reviewed_by'
-        ).prefetch_related(
-            'images', 'comments__user', 'status_history__changed_by'
-        )
+            'citizen', 'service_type', 'service_area', 'assigned_to', 'reviewed_by',
+            'merged_into__survivor', 'assignment'
+        ).prefetch_related('images__uploaded_by')
         
         # Los ciudadanos solo pueden ver sus propias solicitudes
         if self.request.user.role == 'CITIZEN':
@@ -127,12 +215,13 @@ class ServiceRequestDetailView(LoginRequiredMixin, DetailView):
                 user=self.request.user,
                 instance=self.object
             )
+
+        # Posibles duplicados para fusionar (encargados y administradores)
+        if self.request.user.role in ['ADMIN', 'MANAGER']:
+            context['duplicate_candidates'] = find_duplicates(self.object)
         
-        # Comentarios (filtrar internos para ciudadanos)
-        comments = self.object.comments.select_related('user')
-        if self.request.user.role == 'CITIZEN':
-            comments = comments.filter(is_internal=False)
-        context['comments'] = comments.order_by('created_at')
+        # Actividad: comentarios, estados, imágenes y avance de la tarea
+        context['timeline'] = build_timeline(self.object, self.request.user)
         
         return context
 
@@ -148,6 +237,15 @@ class ServiceRequestCreateView(LoginRequiredMixin, CreateView):
         return kwargs
     
     def form_valid(self, form):
+        if not form.cleaned_data.get('ignore_duplicates'):
+            duplicates = find_duplicates(form.instance)
+            if duplicates:
+                # Se muestran los posibles duplicados; el segundo envío crea la solicitud
+                data = form.data.copy()
+                data['ignore_duplicates'] = 'True'
+                form.data = data
+                return self.render_to_response(self.get_context_data(form=form, duplicates=duplicates))
+
         response = super().form_valid(form)
         messages.success(
             self.request,
@@ -158,6 +256,20 @@ class ServiceRequestCreateView(LoginRequiredMixin, CreateView):
     def get_success_url(self):
         return reverse('requests:detail', kwargs={'ticket_number': self.object.ticket_number})
 
+@login_required
+def request_timeline(request, ticket_number):
+    """Entradas anteriores de la línea de tiempo (botón "Cargar anteriores")"""
+    queryset = ServiceRequest.objects.all()
+    if request.user.role == 'CITIZEN':
+        queryset = queryset.filter(citizen=request.user)
+    service_request = get_object_or_404(queryset, ticket_number=ticket_number)
+
+    timeline = build_timeline(service_request, request.user, cursor=request.GET.get('cursor'))
+    return render(request, 'requests/timeline/entries.html', {
+        'request': service_request,
+        'timeline': timeline,
+    })
+
 @login_required
 def add_request_image(request, ticket_number):
     """Vista para agregar imágenes a una solicitud"""
@@ -268,27 +380,144 @@ def cancel_request(request, ticket_number):
     return redirect('requests:detail', ticket_number=ticket_number)
 
 @login_required
+@role_required(['ADMIN', 'MANAGER'])
+def merge_request(request, ticket_number):
+    """Vista para fusionar una solicitud duplicada en otra"""
+    duplicate = get_object_or_404(ServiceRequest, ticket_number=ticket_number)
+
+    if request.method == 'POST':
+        survivor_ticket = request.POST.get('survivor', '').strip().upper()
+        survivor = ServiceRequest.objects.filter(ticket_number=survivor_ticket).first()
+        if survivor is None:
+            messages.error(request, f'No existe la solicitud {survivor_ticket}.')
+        else:
+            try:
+                merge_requests(duplicate, survivor, request.user)
+            except ValueError as error:
+                messages.error(request, str(error))
+            else:
+                messages.success(
+                    request,
+                    f'La solicitud {duplicate.ticket_number} se fusionó en {survivor.ticket_number}.'
+                )
+                return redirect('requests:detail', ticket_number=survivor.ticket_number)
+
+    return redirect('requests:detail', ticket_number=ticket_number)
+
+CITIZEN_STATS_FIELDS = ('total', 'pending', 'in_progress', 'completed')
+STAFF_STATS_FIELDS = CITIZEN_STATS_FIELDS + ('overdue',)
+
+
+def _dashboard_stats_scope(request):
+    """Alcance de contadores y campos visibles para el usuario"""
+    if request.user.role == 'CITIZEN':
+        return RequestStatusCounter.citizen_key(request.user.pk), CITIZEN_STATS_FIELDS
+
+    # Personal municipal: global u, opcionalmente, de un área
+    area_id = request.GET.get('area')
+    if area_id and area_id.isdigit():
+        return RequestStatusCounter.area_key(int(area_id)), STAFF_STATS_FIELDS
+    return RequestStatusCounter.global_key(), STAFF_STATS_FIELDS
+
+
+def _dashboard_stats(key, fields, counter=None):
+    if counter is None or counter.overdue_date != timezone.localdate():
+        counter = RequestStatusCounter.get_for(key)
+    return {field: getattr(counter, field) for field in fields}
+
+
+def _dashboard_stats_validators(request):
+    """Validadores de las estadísticas: versión del contador del alcance"""
+    key, fields = _dashboard_stats_scope(request)
+    # La vista reutiliza la fila si tiene que responder completo
+    counter = request._stats_counter = RequestStatusCounter.objects.filter(key=key).first()
+    # Primera lectura del día: get_for recalcula las vencidas
+    if counter is None or counter.overdue_date != timezone.localdate():
+        return None
+    return (key, counter.version, counter.overdue_date, *fields), None
+
+
+@login_required
+@conditional_view(_dashboard_stats_validators)
+@cache_policy('requests.stats_api')
 def dashboard_stats_api(request):
     """API para obtener estadísticas del dashboard"""
-    if request.user.role == 'CITIZEN':
-        user_requests = ServiceRequest.objects.filter(citizen=request.user)
-        stats = {
-            'total': user_requests.count(),
-            'pending': user_requests.filter(status='PENDING').count(),
-            'in_progress': user_requests.filter(status='IN_PROGRESS').count(),
-            'completed': user_requests.filter(status='COMPLETED').count(),
-        }
+    key, fields = _dashboard_stats_scope(request)
+    return JsonResponse(_dashboard_stats(key, fields, getattr(request, '_stats_counter', None)))
+
+
+@login_required
+def dashboard_stats_stream(request):
+    """
+    Estadísticas del dashboard en vivo (Server-Sent Events).
+
+    Envía el estado completo al conectar y luego solo las diferencias cuando
+    cambia alguna solicitud del alcance. dashboard_stats_api queda como
+    alternativa para navegadores sin EventSource.
+    """
+    key, fields = _dashboard_stats_scope(request)
+
+    def visible_changes(channel, event):
+        return {field: event[field] for field in fields if event.get(field)}
+
+    return event_stream_response(
+        [f'stats:{key}'],
+        snapshot=lambda: _dashboard_stats(key, fields),
+        event_filter=visible_changes,
+    )
+
+
+NEARBY_DEFAULT_RADIUS_KM = 1.0
+NEARBY_MAX_RADIUS_KM = 20.0
+NEARBY_MAX_LIMIT = 100
+
+
+@login_required
+@role_required(['ADMIN', 'MANAGER', 'TECHNICIAN'])
+def nearby_requests_api(request):
+    """
+    Solicitudes abiertas cercanas a una coordenada (?lat=&lon=) o a otra
+    solicitud (?ticket=), ordenadas por distancia.
+    """
+    exclude = None
+    ticket_number = request.GET.get('ticket')
+    if ticket_number:
+        origin = get_object_or_404(ServiceRequest, ticket_number=ticket_number)
+        if origin.latitude is None or origin.longitude is None:
+            return JsonResponse({'error': 'La solicitud no tiene ubicación.'}, status=400)
+        latitude, longitude = float(origin.latitude), float(origin.longitude)
+        exclude = origin.pk
     else:
-        # Estadísticas para personal municipal
-        stats = {
-            'total': ServiceRequest.objects.count(),
-            'pending': ServiceRequest.objects.filter(status='PENDING').count(),
-            'in_progress': ServiceRequest.objects.filter(status='IN_PROGRESS').count(),
-            'completed': ServiceRequest.objects.filter(status='COMPLETED').count(),
-            'overdue': ServiceRequest.objects.filter(
-                expected_completion__lt=timezone.now().date(),
-                status__in=['PENDING', 'IN_PROGRESS']
-            ).count(),
-        }
-    
-    return JsonResponse(stats)
\ No newline at end of file
+        coordinates = coordinate_params(request.GET)
+        if coordinates is None:
+            return JsonResponse({'error': 'Coordenadas inválidas.'}, status=400)
+        latitude, longitude = coordinates
+
+    try:
+        radius = float_param(request.GET.get('radio'), NEARBY_DEFAULT_RADIUS_KM)
+    except ValueError:
+        return JsonResponse({'error': 'Radio inválido.'}, status=400)
+    radius = min(max(radius, 0.01), NEARBY_MAX_RADIUS_KM)
+    limit = request.GET.get('limite', '')
+    limit = min(int(limit), NEARBY_MAX_LIMIT) if limit.isdigit() and int(limit) > 0 else 20
+
+    queryset = ServiceRequest.objects.exclude(pk=exclude) if exclude else None
+    results = nearby_requests(latitude, longitude, radius, limit, queryset=queryset)
+
+    return JsonResponse({
+        'radius_km': radius,
+        'results': [
+            {
+                'ticket': service_request.ticket_number,
+                'title': service_request.title,
+                'service_type': service_request.service_type.name,
+                'status': service_request.status,
+                'status_display': service_request.get_status_display(),
+                'distance_km': round(distance, 3),
+                'latitude': float(service_request.latitude),
+                'longitude': float(service_request.longitude),
+                'url': reverse('requests:detail', args=[service_request.ticket_number]),
+            }
+            for service_request, distance in results
+        ],
+    })
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.tasks'
+    verbose_name = 'Tareas en Segundo Plano'
+
+    def ready(self):
+        # Registra las tareas declaradas en el módulo tasks de cada aplicación
+        autodiscover_modules('tasks')
@@ -0,0 +1,106 @@
+"""
+Declaración y encolado de tareas en segundo plano.
+
+    @task(priority=10, max_attempts=5)
+    def enviar_reporte(report_id):
+        ...
+
+    enviar_reporte.delay(report.pk)   # la ejecuta `manage.py runworker`
+    enviar_reporte(report.pk)         # se sigue pudiendo llamar directamente
+
+Los argumentos se guardan como JSON, así que deben ser valores simples (ids,
+textos, números), no instancias de modelos.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import BackgroundTask
+
+registry = {}
+
+
+class Task:
+    """Función registrada como tarea con sus opciones de ejecución"""
+
+    def __init__(self, func, name=None, priority=0, max_attempts=None, retry_delay=None,
+                 visibility_timeout=None, unique=False):
+        self.func = func
+        self.name = name or f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts or settings.TASKS_MAX_ATTEMPTS
+        self.retry_delay = retry_delay or settings.TASKS_RETRY_DELAY
+        self.visibility_timeout = visibility_timeout or settings.TASKS_VISIBILITY_TIMEOUT
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        """Encola la tarea con las opciones por defecto"""
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, priority=None, countdown=0):
+        """
+        Encola la tarea en la transacción actual: el worker la ve al
+        confirmarse y se descarta si se revierte.
+
+        Con unique=True, si ya hay una pendiente con los mismos argumentos no
+        se agrega otra (un solo INSERT, sin consultar antes).
+
+        Args:
+            countdown: Segundos antes de que pueda ejecutarse
+        """
+        kwargs = kwargs or {}
+        job = BackgroundTask(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            visibility_timeout=self.visibility_timeout,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+        )
+        if not self.unique:
+            job.save()
+            return job
+
+        payload = json.dumps([job.args, kwargs], sort_keys=True, default=str)
+        job.dedupe_key = f'{self.name}:{hashlib.md5(payload.encode()).hexdigest()}'
+        BackgroundTask.objects.bulk_create([job], ignore_conflicts=True)
+        return job
+
+    def next_retry_delay(self, attempts):
+        """Espera antes del siguiente intento (exponencial, con tope)"""
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        return timedelta(seconds=min(delay, settings.TASKS_MAX_RETRY_DELAY))
+
+
+def task(func=None, **options):
+    """
+    Registra una función como tarea. Se usa como @task o @task(opciones).
+
+    Args:
+        name: Nombre con el que se guarda (por defecto módulo.función)
+        priority: Mayor se ejecuta primero
+        max_attempts: Intentos antes de marcarla como fallida
+        retry_delay: Segundos antes del primer reintento (se duplica en cada uno)
+        visibility_timeout: Segundos que puede tardar una ejecución antes de
+            que otro worker la vuelva a tomar
+        unique: No encolar si ya hay una pendiente con los mismos argumentos
+    """
+    def decorator(func):
+        definition = Task(func, **options)
+        registry[definition.name] = definition
+        return definition
+
+    if func is not None:
+        return decorator(func)
+    return decorator
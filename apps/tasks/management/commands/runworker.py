@@ -0,0 +1,73 @@
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apps.tasks.worker import Worker
+
+
+def _run_process(threads, poll_interval, drain):
+    """Punto de entrada de cada proceso del pool"""
+    django.setup()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *args: stop_event.set())
+    Worker(threads=threads, poll_interval=poll_interval, stop_event=stop_event).run(drain=drain)
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano (BackgroundTask) con un pool de procesos e hilos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Procesos del pool')
+        parser.add_argument('--threads', type=int, default=4, help='Hilos por proceso')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Segundos de espera cuando la cola está vacía'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Terminar cuando la cola se vacía en lugar de seguir esperando tareas'
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            self._run_in_process(options)
+            return
+
+        # Cada proceso abre sus propias conexiones
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=_run_process,
+                args=(options['threads'], options['interval'], options['once']),
+                daemon=False,
+            )
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Worker iniciado: {options['processes']} procesos x {options['threads']} hilos")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Worker detenido'))
+
+    def _run_in_process(self, options):
+        worker = Worker(threads=options['threads'], poll_interval=options['interval'])
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        try:
+            worker.run(drain=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(f'Tareas completadas: {worker.done}, fallidas: {worker.failed}')
+        )
@@ -0,0 +1,118 @@
+from django.db import models
+from django.utils import timezone
+
+
+class BackgroundTask(models.Model):
+    """
+    Tarea en cola para ejecutarse fuera de la petición web (manage.py
+    runworker). Se escribe en la transacción de quien la encola, así que el
+    worker solo la ve cuando esa transacción se confirma y nunca si se
+    revierte.
+
+    Al tomarla, el worker la deja en RUNNING hasta run_at (ahora más
+    visibility_timeout); si el worker se detiene sin terminarla, otro la
+    vuelve a tomar cuando vence ese plazo.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('RUNNING', 'En Ejecución'),
+        ('DONE', 'Completada'),
+        ('FAILED', 'Fallida'),
+    ]
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Tarea'
+    )
+
+    args = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Argumentos'
+    )
+
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Argumentos con Nombre'
+    )
+
+    # Mayor prioridad se ejecuta primero
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name='Prioridad'
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='PENDING',
+        verbose_name='Estado'
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+
+    max_attempts = models.PositiveIntegerField(
+        default=3,
+        verbose_name='Máximo de Intentos'
+    )
+
+    visibility_timeout = models.PositiveIntegerField(
+        default=300,
+        verbose_name='Tiempo de Visibilidad (segundos)'
+    )
+
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Ejecutar Desde'
+    )
+
+    # Tareas únicas: solo una pendiente por llave
+    dedupe_key = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Llave de Agrupación'
+    )
+
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Worker'
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Último Error'
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Finalización'
+    )
+
+    class Meta:
+        verbose_name = 'Tarea en Segundo Plano'
+        verbose_name_plural = 'Tareas en Segundo Plano'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status='PENDING') & ~models.Q(dedupe_key=''),
+                name='unique_pending_task_dedupe_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from .decorators import task
+from .models import BackgroundTask
+from .worker import Worker, claim_task, run_pending, run_task
+
+executed = []
+
+
+@task(name='tests.record')
+def record(value):
+    executed.append(value)
+
+
+@task(name='tests.urgent', priority=10)
+def urgent(value):
+    executed.append(value)
+
+
+@task(name='tests.flaky', max_attempts=2, retry_delay=60)
+def flaky():
+    raise RuntimeError('Servicio no disponible')
+
+
+@task(name='tests.unique', unique=True)
+def unique(value):
+    executed.append(value)
+
+
+@task(name='tests.unique_flaky', unique=True, max_attempts=3)
+def unique_flaky():
+    raise RuntimeError('Servicio no disponible')
+
+
+class BackgroundTaskTests(TestCase):
+
+    def setUp(self):
+        executed.clear()
+
+    def test_enqueue_follows_the_transaction(self):
+        with transaction.atomic():
+            record.delay('revertida')
+            transaction.set_rollback(True)
+        self.assertFalse(BackgroundTask.objects.exists())
+
+        record.delay('confirmada')
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(executed, ['confirmada'])
+        self.assertEqual(BackgroundTask.objects.get().status, 'DONE')
+
+    def test_higher_priority_runs_first(self):
+        record.delay('normal')
+        urgent.delay('urgente')
+        record.enqueue(['baja'], priority=-5)
+
+        run_pending()
+        self.assertEqual(executed, ['urgente', 'normal', 'baja'])
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        flaky.delay()
+        self.assertEqual(run_pending(), (0, 1))
+        job = BackgroundTask.objects.get()
+        self.assertEqual((job.status, job.attempts), ('PENDING', 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(run_pending(), (0, 0))
+
+        BackgroundTask.objects.update(run_at=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('Servicio no disponible', job.last_error)
+
+    def test_expired_lease_is_taken_by_another_worker(self):
+        record.delay('valor')
+        lost = claim_task('worker-a')
+        self.assertIsNone(claim_task('worker-b'))
+
+        # Venció el tiempo de visibilidad sin que worker-a terminara
+        BackgroundTask.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        retaken = claim_task('worker-b')
+        self.assertEqual((retaken.pk, retaken.attempts), (lost.pk, 2))
+
+        self.assertTrue(run_task(lost, 'worker-a'))
+        self.assertEqual(BackgroundTask.objects.get().status, 'RUNNING')
+        self.assertTrue(run_task(retaken, 'worker-b'))
+        self.assertEqual(BackgroundTask.objects.get().status, 'DONE')
+
+    def test_unique_task_is_queued_once(self):
+        with self.assertNumQueries(1):
+            unique.delay('a')
+        unique.delay('a')
+        unique.delay('b')
+        self.assertEqual(BackgroundTask.objects.filter(status='PENDING').count(), 2)
+
+    def test_failed_unique_task_yields_to_pending_duplicate(self):
+        unique_flaky.delay()
+        job = claim_task('worker-a')
+        # Mientras se ejecuta se vuelve a encolar con los mismos argumentos
+        unique_flaky.delay()
+
+        self.assertFalse(run_task(job, 'worker-a'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('Reemplazada', job.last_error)
+        self.assertEqual(BackgroundTask.objects.filter(status='PENDING').count(), 1)
+
+    def test_worker_survives_errors_recording_results(self):
+        record.delay('valor')
+        worker = Worker()
+        with mock.patch('apps.tasks.worker.run_task', side_effect=DatabaseError('sin conexión')), \
+                self.assertLogs('apps.tasks.worker', 'ERROR'):
+            worker.run(drain=True)
+        self.assertEqual((worker.done, worker.failed), (0, 1))
+
+    def test_unregistered_task_fails_without_retry(self):
+        BackgroundTask.objects.create(name='tests.desconocida')
+        self.assertEqual(run_pending(), (0, 1))
+        self.assertEqual(BackgroundTask.objects.get().status, 'FAILED')
+
+    def test_runworker_once_drains_queue(self):
+        record.delay('comando')
+        out = StringIO()
+        call_command('runworker', threads=1, once=True, stdout=out)
+        self.assertEqual(executed, ['comando'])
+        self.assertIn('Tareas completadas: 1', out.getvalue())
+
+    def test_purge_removes_only_old_finished_tasks(self):
+        old = timezone.now() - timedelta(days=30)
+        for status in ['DONE', 'FAILED', 'PENDING']:
+            BackgroundTask.objects.create(name='tests.record', status=status, finished_at=old)
+        recent = BackgroundTask.objects.create(name='tests.record', status='DONE', finished_at=timezone.now())
+
+        out = StringIO()
+        call_command('purge_tasks', days=14, dry_run=True, stdout=out)
+        self.assertIn('Tareas a eliminar: 2', out.getvalue())
+
+        call_command('purge_tasks', days=14, batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            sorted(BackgroundTask.objects.values_list('status', flat=True)), ['DONE', 'PENDING']
+        )
+        self.assertTrue(BackgroundTask.objects.filter(pk=recent.pk).exists())
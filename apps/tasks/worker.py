@@ -0,0 +1,193 @@
+"""
+Ejecución de las tareas en cola (BackgroundTask).
+
+Un worker toma una tarea a la vez con un UPDATE condicional sobre (id,
+intentos): si dos workers eligen la misma, solo uno logra actualizarla. No
+requiere SELECT ... FOR UPDATE, por lo que funciona igual en PostgreSQL y
+SQLite. Las tareas se eligen por prioridad y luego por antigüedad.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .decorators import registry
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Candidatas que se revisan en cada intento de tomar una tarea
+CLAIM_CANDIDATES = 10
+
+
+def make_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim_task(worker_id):
+    """Toma la siguiente tarea lista o retorna None si no hay"""
+    now = timezone.now()
+    candidates = BackgroundTask.objects.filter(
+        status__in=['PENDING', 'RUNNING'], run_at__lte=now,
+    ).order_by('-priority', 'run_at', 'id').values_list(
+        'id', 'status', 'attempts', 'max_attempts', 'visibility_timeout'
+    )[:CLAIM_CANDIDATES]
+
+    for pk, status, attempts, max_attempts, visibility_timeout in candidates:
+        current = BackgroundTask.objects.filter(pk=pk, status=status, attempts=attempts, run_at__lte=now)
+
+        if status == 'RUNNING' and attempts >= max_attempts:
+            # El último intento no terminó dentro del tiempo de visibilidad
+            current.update(
+                status='FAILED', finished_at=now,
+                last_error='Se agotó el tiempo de visibilidad sin terminar la tarea',
+            )
+            continue
+
+        claimed = current.update(
+            status='RUNNING',
+            attempts=attempts + 1,
+            locked_by=worker_id,
+            run_at=now + timedelta(seconds=visibility_timeout),
+        )
+        if claimed:
+            return BackgroundTask.objects.get(pk=pk)
+    return None
+
+
+def run_task(job, worker_id):
+    """
+    Ejecuta una tarea tomada y registra el resultado. Si el worker perdió la
+    tarea (venció su tiempo de visibilidad y otro la tomó) el resultado no se
+    guarda.
+
+    Returns:
+        bool: True si terminó sin errores
+    """
+    owned = BackgroundTask.objects.filter(pk=job.pk, locked_by=worker_id, attempts=job.attempts)
+    definition = registry.get(job.name)
+    try:
+        if definition is None:
+            raise LookupError(f'Tarea no registrada: {job.name}')
+        definition.func(*job.args, **job.kwargs)
+    except Exception as error:
+        logger.exception('Falló la tarea %s (%s), intento %s', job.pk, job.name, job.attempts)
+        if definition is None or job.attempts >= job.max_attempts:
+            owned.update(status='FAILED', finished_at=timezone.now(), last_error=str(error)[:1000])
+        else:
+            try:
+                with transaction.atomic():
+                    owned.update(
+                        status='PENDING',
+                        run_at=timezone.now() + definition.next_retry_delay(job.attempts),
+                        last_error=str(error)[:1000],
+                    )
+            except IntegrityError:
+                # Tarea única: ya hay otra pendiente con los mismos argumentos
+                # que hará el trabajo, así que esta no se reintenta
+                owned.update(
+                    status='FAILED', finished_at=timezone.now(),
+                    last_error=f'Reemplazada por una tarea pendiente igual. {error}'[:1000],
+                )
+        return False
+
+    owned.update(status='DONE', finished_at=timezone.now(), last_error='')
+    return True
+
+
+def run_pending(worker_id=None, limit=None):
+    """
+    Ejecuta en el hilo actual las tareas listas hasta vaciar la cola.
+
+    Returns:
+        tuple: (completadas, fallidas)
+    """
+    worker_id = worker_id or make_worker_id()
+    done = failed = 0
+    while limit is None or done + failed < limit:
+        job = claim_task(worker_id)
+        if job is None:
+            break
+        if run_task(job, worker_id):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+class Worker:
+    """
+    Ejecuta tareas con varios hilos; cada hilo toma y ejecuta una tarea a la
+    vez con su propia conexión a la base de datos.
+
+    Args:
+        threads: Cantidad de hilos (con 1 se ejecuta en el hilo actual)
+        poll_interval: Segundos de espera cuando la cola está vacía
+        stop_event: threading.Event para detenerlo desde afuera
+    """
+
+    def __init__(self, threads=1, poll_interval=1.0, stop_event=None):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.stop_event = stop_event or threading.Event()
+        self.worker_id = make_worker_id()
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def run(self, drain=False):
+        """Procesa tareas hasta stop(); con drain=True termina al vaciarse la cola"""
+        if self.threads <= 1:
+            self._loop(f'{self.worker_id}:0', drain)
+            return
+        threads = [
+            threading.Thread(target=self._loop, args=(f'{self.worker_id}:{index}', drain), daemon=True)
+            for index in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            # Cada hilo termina la tarea en curso antes de salir
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _loop(self, worker_id, drain):
+        try:
+            while not self.stop_event.is_set():
+                if not connection.in_atomic_block:
+                    # Conexiones caídas o vencidas entre tareas
+                    close_old_connections()
+                job = claim_task(worker_id)
+                if job is None:
+                    if drain:
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                try:
+                    succeeded = run_task(job, worker_id)
+                except Exception:
+                    # Un error al registrar el resultado no detiene el worker;
+                    # la tarea se retoma al vencer su tiempo de visibilidad
+                    logger.exception('No se pudo registrar el resultado de la tarea %s', job.pk)
+                    succeeded = False
+                with self._lock:
+                    if succeeded:
+                        self.done += 1
+                    else:
+                        self.failed += 1
+        finally:
+            # Los hilos adicionales abren su propia conexión
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
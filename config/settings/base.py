@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -30,6 +30,7 @@ LOCAL_APPS = [
     'apps.requests',
     'apps.assignments',
     'apps.reports',
+    'apps.tasks',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -58,6 +59,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'apps.core.context_processors.site_settings',
+                'apps.assignments.context_processors.notifications',
             ],
         },
     },
@@ -129,6 +131,113 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'Sistema Municipal <noreply@municipalidad.gt>'
 
+# Cola de correos (EmailOutbox): los envía la tarea deliver_queued_emails
+# (`manage.py runworker`); `manage.py send_queued_emails --loop` reintenta
+# los que fallaron cuando les toca
+STAFF_NOTIFICATION_EMAILS = config('STAFF_NOTIFICATION_EMAILS', default='', cast=Csv())
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60  # segundos; se duplica en cada intento
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 3600
+EMAIL_OUTBOX_LEASE_SECONDS = 300  # tiempo antes de volver a tomar un correo en envío
+
+# Tareas en segundo plano (apps.tasks): las ejecuta `manage.py runworker`
+# desde la base de datos, sin broker externo. Valores por defecto de @task
+TASKS_MAX_ATTEMPTS = 3
+TASKS_RETRY_DELAY = 30  # segundos; se duplica en cada intento
+TASKS_MAX_RETRY_DELAY = 3600
+TASKS_VISIBILITY_TIMEOUT = 300  # segundos antes de volver a tomar una tarea en ejecución
+# Tareas completadas o fallidas con más días que estos se eliminan con
+# `manage.py purge_tasks`
+TASKS_RETENTION_DAYS = config('TASKS_RETENTION_DAYS', default=14, cast=int)
+
 # Logos del sistema (Footer)
 LOGO_MUNICIPALIDAD_URL = config('LOGO_MUNICIPALIDAD_URL', default='')
-LOGO_UNIVERSIDAD_URL = config('LOGO_UNIVERSIDAD_URL', default='')
\ No newline at end of file
+LOGO_UNIVERSIDAD_URL = config('LOGO_UNIVERSIDAD_URL', default='')
+# Reportes: leer del resumen diario (RequestDailyStat) en lugar de recorrer
+# todas las solicitudes. `manage.py rebuild_request_stats` lo reconstruye si
+# se modifican solicitudes sin pasar por las señales (p. ej. queryset.update).
+REPORTS_USE_DAILY_STATS = config('REPORTS_USE_DAILY_STATS', default=True, cast=bool)
+
+# Lista de solicitudes: paginación por cursor (sin COUNT ni OFFSET) para
+# todos los usuarios. También se activa por petición con ?paginacion=cursor
+REQUEST_LIST_CURSOR_PAGINATION = config('REQUEST_LIST_CURSOR_PAGINATION', default=False, cast=bool)
+
+# Estadísticas en vivo (Server-Sent Events). El broker en memoria solo
+# comunica hilos del mismo proceso: gunicorn debe correr con un solo worker
+# (--worker-class gthread, sin --workers) o se debe indicar una clase
+# compatible con LocalEventBroker sobre un broker compartido.
+EVENT_BROKER = config('EVENT_BROKER', default='apps.core.utils.events.LocalEventBroker')
+EVENT_STREAM_HEARTBEAT = 15  # segundos entre comentarios keep-alive
+EVENT_STREAM_MAX_DURATION = 300  # segundos; luego el navegador se reconecta
+EVENT_STREAM_RETRY_MS = 3000
+# Streams abiertos a la vez por proceso; cada uno ocupa un hilo de gunicorn
+# (--threads 16 en el Procfile), el resto queda para las demás peticiones.
+# Por encima del límite el navegador consulta la API JSON periódicamente
+EVENT_STREAM_MAX_CONNECTIONS = config('EVENT_STREAM_MAX_CONNECTIONS', default=4, cast=int)
+
+# Recomendación de técnicos: segundos antes de recargar por completo el
+# índice de carga de trabajo (se actualiza por asignación entre recargas)
+WORKLOAD_INDEX_TTL = 300
+
+# Caché. Cada alias se configura con una URL:
+#   locmem://<nombre>       memoria del proceso (por defecto)
+#   file:///ruta/absoluta   archivos, compartida por los procesos del servidor
+#   redis://host:6379/0     Redis (django.core.cache.backends.redis)
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+}
+
+
+def cache_from_url(url, **params):
+    scheme, _, location = url.partition('://')
+    params['BACKEND'] = CACHE_BACKENDS[scheme]
+    params['LOCATION'] = url if scheme in ('redis', 'rediss') else location
+    if scheme in ('locmem', 'file'):
+        params.setdefault('OPTIONS', {'MAX_ENTRIES': 10000})
+    return params
+
+
+# Caché de fragmentos: HTML de cada fila de los listados de solicitudes y
+# asignaciones. La clave incluye updated_at, de modo que una fila modificada
+# se vuelve a renderizar y la versión anterior simplemente expira.
+FRAGMENT_CACHE_ALIAS = 'fragments'
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+CACHES = {
+    'default': cache_from_url(config('CACHE_URL', default='locmem://gsp-default')),
+    # Respuestas y datos de las políticas de CACHE_POLICIES
+    'views': cache_from_url(config('VIEW_CACHE_URL', default='locmem://gsp-views')),
+    FRAGMENT_CACHE_ALIAS: cache_from_url(
+        config('FRAGMENT_CACHE_URL', default='locmem://gsp-fragments'), TIMEOUT=FRAGMENT_CACHE_TIMEOUT
+    ),
+}
+
+# Políticas de caché por vista (apps.core.utils.cache). Las etiquetas se
+# invalidan desde las señales de los modelos; {user} es el id del usuario.
+CACHE_POLICIES = {
+    'requests.stats_api': {
+        'alias': 'views', 'timeout': 60, 'vary_on': ['role', 'user', 'date'], 'tags': ['requests'],
+    },
+    'assignments.technician_stats_api': {
+        'alias': 'views', 'timeout': 300, 'vary_on': ['user'], 'tags': ['assignments:technician:{user}'],
+    },
+    'reports.dashboard': {
+        'alias': 'views', 'timeout': 300, 'vary_on': ['date'], 'tags': ['requests', 'assignments', 'satisfaction'],
+    },
+    'lookups': {
+        'alias': 'views', 'timeout': 3600, 'tags': ['lookups'],
+    },
+    'notifications.unread': {
+        'alias': 'default', 'timeout': 600, 'vary_on': ['user'], 'tags': ['notifications:{user}'],
+    },
+}
+
+# Notificaciones leídas con más días que estos se eliminan con
+# `manage.py purge_notifications`
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+# Eventos de una misma solicitud para un destinatario dentro de esta ventana
+# (segundos) se acumulan en una sola notificación; 0 los guarda por separado
+NOTIFICATION_DIGEST_WINDOW = config('NOTIFICATION_DIGEST_WINDOW', default=3600, cast=int)
@@ -23,6 +23,11 @@ DATABASES = {
     )
 }
 
+# Caché compartida entre los workers de gunicorn: la invalidación por
+# etiquetas debe llegar a todos (archivos locales o, si existe, Redis)
+CACHES['default'] = cache_from_url(config('CACHE_URL', default='file:///tmp/gsp-cache/default'))
+CACHES['views'] = cache_from_url(config('VIEW_CACHE_URL', default='file:///tmp/gsp-cache/views'))
+
 # Security Settings
 SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=False, cast=bool)
 SESSION_COOKIE_SECURE = True
@@ -69,6 +69,82 @@ function mostrarToast(mensaje, tipo = 'info') {
     });
 }
 
+// ========================================
+// ESTADÍSTICAS EN VIVO
+// ========================================
+/**
+ * Escuchar estadísticas en vivo (Server-Sent Events)
+ *
+ * El servidor envía 'snapshot' con el estado completo al conectar y 'delta'
+ * con las diferencias cuando algo cambia; 'invalidate' pide volver a
+ * consultar la API. Si el navegador no soporta EventSource se consulta una
+ * vez la API JSON (urlRespaldo); si el servidor rechaza el stream (límite de
+ * conexiones en vivo) se consulta la API cada SONDEO_ESTADISTICAS_MS.
+ */
+const SONDEO_ESTADISTICAS_MS = 30000;
+
+function escucharEstadisticas(urlStream, urlRespaldo, alActualizar, alInvalidar) {
+    let estado = null;
+    let respaldoUsado = false;
+
+    const consultarRespaldo = (animar = true) => {
+        return fetch(urlRespaldo)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Error al cargar estadísticas');
+                }
+                return response.json();
+            })
+            .then(data => {
+                estado = data;
+                alActualizar(estado, animar);
+            });
+    };
+
+    if (typeof EventSource === 'undefined') {
+        return consultarRespaldo();
+    }
+
+    const fuente = new EventSource(urlStream);
+    let primeraCarga = true;
+
+    fuente.addEventListener('snapshot', e => {
+        estado = JSON.parse(e.data);
+        alActualizar(estado, primeraCarga);
+        primeraCarga = false;
+    });
+
+    fuente.addEventListener('delta', e => {
+        if (!estado) {
+            return;
+        }
+        const cambios = JSON.parse(e.data);
+        Object.keys(cambios).forEach(campo => {
+            estado[campo] = (estado[campo] || 0) + cambios[campo];
+        });
+        alActualizar(estado, false);
+    });
+
+    fuente.addEventListener('invalidate', () => {
+        if (typeof alInvalidar === 'function') {
+            alInvalidar();
+        }
+    });
+
+    fuente.addEventListener('error', () => {
+        // CLOSED: el servidor rechazó el stream; se consulta la API JSON
+        // periódicamente (responde 304 mientras no haya cambios)
+        if (fuente.readyState === EventSource.CLOSED && !respaldoUsado) {
+            respaldoUsado = true;
+            const alFallar = error => console.error('Error al cargar estadísticas:', error);
+            consultarRespaldo(primeraCarga).catch(alFallar);
+            setInterval(() => consultarRespaldo(false).catch(alFallar), SONDEO_ESTADISTICAS_MS);
+        }
+    });
+
+    return Promise.resolve(fuente);
+}
+
 // ========================================
 // CONFIRMACIONES DE FORMULARIOS
 // ========================================
@@ -117,5 +193,6 @@ console.log('✅ Sistema Municipal - JavaScript cargado correctamente');
 window.municipalApp = {
     confirmarAccion,
     mostrarToast,
-    animarContador
+    animarContador,
+    escucharEstadisticas
 };
\ No newline at end of file